@@ -0,0 +1,471 @@
+"""Stand-in Docker Engine for offline benchmarks of the connector.
+
+Serves canned answers for the endpoints the connector uses over TCP or a Unix
+socket with HTTP/1.1 keep-alive: JSON listings and inspects, NDJSON pull/push/
+build and event streams, raw-stream (multiplexed) logs, attach and exec output,
+and tar bodies of any size generated on the fly (multi-GB bodies never sit in
+memory). Uploads are read and discarded. Latency and error injection apply to
+every request.
+
+Run standalone:  python benchmarks/fake_engine.py --port 23750 [--unix /tmp/docker.sock]
+"""
+import argparse
+import collections
+import json
+import os
+import random
+import re
+import socketserver
+import struct
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+API_VERSION = '1.47'
+CHUNK = 1024 * 1024
+# Pending connections per listener; concurrent runs (e.g. stats_snapshot) open many at once
+LISTEN_BACKLOG = 128
+VERSION_PREFIX = re.compile(r'^/v\d+\.\d+(?=/)')
+
+
+class EngineSettings(object):
+    """Knobs shared by all handlers of one fake engine"""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, containers=50, images=20,
+                 binary_size=64 * 1024 * 1024, log_lines=1000, pull_layers=5, events=100):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.containers = containers
+        self.images = images
+        self.binary_size = binary_size
+        self.log_lines = log_lines
+        self.pull_layers = pull_layers
+        self.events = events
+        self.requests = 0
+        self.connections = 0
+        self.routes = collections.Counter()
+        self.errors_injected = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.lock = threading.Lock()
+        self._bodies = {}
+
+    def canned_body(self, key, factory):
+        """Encode a large static body once, so the engine's own JSON work does not skew client timings"""
+        body = self._bodies.get(key)
+        if body is None:
+            body = self._bodies.setdefault(key, json.dumps(factory()).encode('utf-8'))
+        return body
+
+
+def _container(i):
+    return {
+        'Id': '{0:064x}'.format(i + 1),
+        'Names': ['/app-{0}'.format(i)],
+        'Image': 'registry.local/app:{0}'.format(i % 5),
+        'ImageID': 'sha256:{0:064x}'.format(i % 5 + 1),
+        'Command': 'run',
+        'Created': 1700000000 + i,
+        'State': 'running',
+        'Status': 'Up 2 hours',
+        'Ports': [],
+        'Labels': {'app': 'app-{0}'.format(i % 3), 'tier': 'web'},
+        'NetworkSettings': {'Networks': {'bridge': {'NetworkID': 'n1'}}},
+        'Mounts': [{'Type': 'volume', 'Name': 'data-{0}'.format(i % 4), 'Destination': '/data'}]
+    }
+
+
+def _image(i):
+    return {
+        'Id': 'sha256:{0:064x}'.format(i + 1),
+        'RepoTags': ['registry.local/app:{0}'.format(i)],
+        'RepoDigests': [],
+        'Created': 1690000000 + i,
+        'Size': 50000000 + i,
+        'Labels': {},
+        'Containers': -1
+    }
+
+
+def _stats(i, tick):
+    return {
+        'read': time.strftime('%Y-%m-%dT%H:%M:%S.000000000Z', time.gmtime()),
+        'name': '/app-{0}'.format(i),
+        'pids_stats': {'current': 4},
+        'cpu_stats': {'cpu_usage': {'total_usage': 1000000 * tick}, 'system_cpu_usage': 10000000 * tick,
+                      'online_cpus': 4},
+        'precpu_stats': {'cpu_usage': {'total_usage': 1000000 * (tick - 1)},
+                         'system_cpu_usage': 10000000 * (tick - 1)},
+        'memory_stats': {'usage': 64 << 20, 'limit': 1 << 30, 'stats': {'inactive_file': 8 << 20}},
+        'networks': {'eth0': {'rx_bytes': 1000 * tick, 'tx_bytes': 500 * tick}},
+        'blkio_stats': {'io_service_bytes_recursive': [{'op': 'read', 'value': 4096 * tick},
+                                                       {'op': 'write', 'value': 8192 * tick}]}
+    }
+
+
+class FakeEngineHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'FakeDocker/1.0'
+    # Without TCP_NODELAY, Nagle plus the client's delayed ACK add ~40 ms to every small TCP response
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def settings(self):
+        return self.server.settings
+
+    def setup(self):
+        super(FakeEngineHandler, self).setup()
+        with self.settings.lock:
+            self.settings.connections += 1
+
+    # Plumbing
+
+    def _begin(self):
+        settings = self.settings
+        with settings.lock:
+            settings.requests += 1
+        delay = settings.latency_ms + (random.uniform(0, settings.jitter_ms) if settings.jitter_ms else 0)
+        if delay:
+            time.sleep(delay / 1000.0)
+        parsed = urlparse(self.path)
+        self.query = parse_qs(parsed.query)
+        self.route = VERSION_PREFIX.sub('', parsed.path)
+        with settings.lock:
+            settings.routes[self.route] += 1
+        self._drain_body()
+        if settings.error_rate and self.route != '/_ping' and random.random() < settings.error_rate:
+            with settings.lock:
+                settings.errors_injected += 1
+            self._json({'message': 'injected failure'}, 500)
+            return False
+        return True
+
+    def _drain_body(self):
+        received = 0
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            while True:
+                size = int(self.rfile.readline().split(b';')[0].strip() or b'0', 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                remaining = size
+                while remaining:
+                    data = self.rfile.read(min(CHUNK, remaining))
+                    if not data:
+                        break
+                    remaining -= len(data)
+                self.rfile.readline()
+                received += size
+        else:
+            remaining = int(self.headers.get('Content-Length') or 0)
+            while remaining:
+                data = self.rfile.read(min(CHUNK, remaining))
+                if not data:
+                    break
+                remaining -= len(data)
+                received += len(data)
+        with self.settings.lock:
+            self.settings.bytes_received += received
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Api-Version', API_VERSION)
+        self.end_headers()
+        self.wfile.write(body)
+        with self.settings.lock:
+            self.settings.bytes_sent += len(body)
+
+    def _json(self, obj, status=200):
+        self._send(status, 'application/json', json.dumps(obj).encode('utf-8'))
+
+    def _canned_json(self, key, factory):
+        self._send(200, 'application/json', self.settings.canned_body(key, factory))
+
+    def _empty(self, status=204):
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def _chunked(self, content_type, chunks):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        sent = 0
+        try:
+            for chunk in chunks:
+                if chunk:
+                    self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+                    sent += len(chunk)
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading (bounded follow, size cap): drop the connection
+            self.close_connection = True
+        with self.settings.lock:
+            self.settings.bytes_sent += sent
+
+    def _ndjson(self, messages):
+        self._chunked('application/json', (json.dumps(m).encode('utf-8') + b'\r\n' for m in messages))
+
+    def _raw_stream(self, lines, multiplexed=True):
+        def frames():
+            batch = bytearray()
+            for i in range(lines):
+                payload = b'2024-01-01T00:00:00.%09dZ line %d of the fake container output\n' % (i, i)
+                if multiplexed:
+                    batch += struct.pack('>BxxxI', 1 if i % 4 else 2, len(payload))
+                batch += payload
+                if len(batch) >= 64 * 1024:
+                    yield bytes(batch)
+                    batch.clear()
+            yield bytes(batch)
+        content_type = 'application/vnd.docker.multiplexed-stream' if multiplexed else 'application/vnd.docker.raw-stream'
+        self._chunked(content_type, frames())
+
+    def _tar(self, size):
+        """A tar-shaped body of `size` bytes produced chunk by chunk"""
+        block = (b'fake-layer-data-' * (CHUNK // 16))[:CHUNK]
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-tar')
+        self.send_header('Content-Length', str(size))
+        self.end_headers()
+        remaining = size
+        try:
+            while remaining > 0:
+                n = min(CHUNK, remaining)
+                self.wfile.write(block[:n] if n < CHUNK else block)
+                remaining -= n
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        with self.settings.lock:
+            self.settings.bytes_sent += size - remaining
+
+    # Routes
+
+    def do_HEAD(self):
+        if self._begin():
+            self._empty(200)
+
+    def do_GET(self):
+        if not self._begin():
+            return
+        settings = self.settings
+        route = self.route
+        if route == '/_ping':
+            return self._send(200, 'text/plain', b'OK')
+        if route == '/version':
+            return self._json({'Version': '27.3.1', 'ApiVersion': API_VERSION, 'MinAPIVersion': '1.24',
+                               'Os': 'linux', 'Arch': 'amd64', 'KernelVersion': '6.1.0'})
+        if route == '/info':
+            return self._json({'ID': 'fake', 'Containers': settings.containers, 'ContainersRunning': settings.containers,
+                               'Images': settings.images, 'Driver': 'overlay2', 'NCPU': 4, 'MemTotal': 8 << 30})
+        if route == '/system/df':
+            return self._canned_json('df', lambda: {
+                'LayersSize': 1 << 30, 'Images': [_image(i) for i in range(settings.images)],
+                'Containers': [_container(i) for i in range(settings.containers)], 'Volumes': [], 'BuildCache': []})
+        if route == '/events':
+            return self._ndjson({'Type': 'container', 'Action': ('start', 'die', 'exec_start: sh')[i % 3],
+                                 'Actor': {'ID': '{0:064x}'.format(i % 5 + 1), 'Attributes': {}},
+                                 'time': 1700000000 + i, 'timeNano': (1700000000 + i) * 1000000000}
+                                for i in range(settings.events))
+        if route == '/containers/json':
+            return self._canned_json('containers', lambda: [_container(i) for i in range(settings.containers)])
+        if route == '/images/json':
+            return self._canned_json('images', lambda: [_image(i) for i in range(settings.images)])
+        if route == '/images/search':
+            return self._json([{'name': 'library/app', 'description': 'fake', 'star_count': 1,
+                                'is_official': False, 'is_automated': False}])
+        if route == '/networks':
+            return self._json([{'Name': 'bridge', 'Id': 'n1', 'Driver': 'bridge', 'Scope': 'local'},
+                               {'Name': 'host', 'Id': 'n2', 'Driver': 'host', 'Scope': 'local'}])
+        if route == '/volumes':
+            return self._json({'Volumes': [{'Name': 'data-{0}'.format(i), 'Driver': 'local',
+                                            'Mountpoint': '/var/lib/docker/volumes/data-{0}'.format(i)}
+                                           for i in range(4)], 'Warnings': None})
+        if route == '/images/get':
+            return self._tar(settings.binary_size)
+        parts = route.strip('/').split('/')
+        if parts[0] == 'containers' and len(parts) == 3:
+            action = parts[2]
+            if action == 'json':
+                return self._json(dict(_container(0), Id=parts[1], Config={'Image': 'app'}, HostConfig={}))
+            if action == 'logs':
+                lines = settings.log_lines
+                if self.query.get('tail', ['all'])[0].isdigit():
+                    lines = min(lines, int(self.query['tail'][0]))
+                return self._raw_stream(lines)
+            if action == 'stats':
+                if self.query.get('stream', ['1'])[0] in ('0', 'false'):
+                    return self._json(_stats(0, int(time.time())))
+                return self._ndjson(_stats(0, tick) for tick in range(1, 6))
+            if action in ('export', 'archive'):
+                return self._tar(settings.binary_size)
+            if action == 'top':
+                return self._json({'Titles': ['PID', 'CMD'], 'Processes': [['1', 'run']]})
+            if action == 'changes':
+                return self._json([])
+        if parts[0] == 'images' and len(parts) >= 3:
+            action = parts[-1]
+            if action == 'json':
+                return self._json(dict(_image(0), RepoTags=['/'.join(parts[1:-1])]))
+            if action == 'history':
+                return self._json([{'Id': _image(0)['Id'], 'CreatedBy': 'RUN make', 'Size': 100}])
+            if action == 'get':
+                return self._tar(settings.binary_size)
+        if parts[0] == 'networks' and len(parts) == 2:
+            return self._json({'Name': parts[1], 'Id': 'n1', 'Driver': 'bridge', 'Containers': {}})
+        if parts[0] == 'volumes' and len(parts) == 2:
+            return self._json({'Name': parts[1], 'Driver': 'local', 'Mountpoint': '/var/lib/docker/volumes/x'})
+        if parts[0] == 'exec' and len(parts) == 3:
+            return self._json({'ID': parts[1], 'Running': False, 'ExitCode': 0})
+        return self._json({'message': 'page not found'}, 404)
+
+    def do_POST(self):
+        if not self._begin():
+            return
+        settings = self.settings
+        route = self.route
+        parts = route.strip('/').split('/')
+        if route == '/images/create' or (parts[0] == 'images' and parts[-1] == 'push'):
+            return self._ndjson(self._transfer_progress(parts[-1] == 'push'))
+        if route == '/build':
+            return self._ndjson([{'stream': 'Step 1/2 : FROM scratch\n'}, {'stream': ' ---> Running\n'},
+                                 {'aux': {'ID': 'sha256:' + 'b' * 64}},
+                                 {'stream': 'Successfully built bbbbbbbbbbbb\n'}])
+        if route == '/images/load':
+            return self._ndjson([{'stream': 'Loaded image: registry.local/app:loaded\n'}])
+        if route == '/auth':
+            return self._json({'Status': 'Login Succeeded', 'IdentityToken': ''})
+        if route == '/commit':
+            return self._json({'Id': 'sha256:' + 'c' * 64}, 201)
+        if route.endswith('/prune'):
+            return self._json({'ContainersDeleted': [], 'ImagesDeleted': [], 'NetworksDeleted': [],
+                               'VolumesDeleted': [], 'SpaceReclaimed': 0})
+        if route == '/containers/create':
+            return self._json({'Id': 'f' * 64, 'Warnings': []}, 201)
+        if route == '/networks/create':
+            return self._json({'Id': 'n' * 12, 'Warning': ''}, 201)
+        if route == '/volumes/create':
+            return self._json({'Name': 'created', 'Driver': 'local', 'Mountpoint': '/var/lib/docker/volumes/created'}, 201)
+        if parts[0] == 'containers' and len(parts) == 3:
+            action = parts[2]
+            if action == 'exec':
+                return self._json({'Id': 'e' * 64}, 201)
+            if action == 'wait':
+                return self._json({'StatusCode': 0})
+            if action == 'update':
+                return self._json({'Warnings': []})
+            if action == 'attach':
+                return self._raw_stream(min(settings.log_lines, 100))
+            return self._empty()
+        if parts[0] == 'exec' and len(parts) == 3 and parts[2] == 'start':
+            return self._raw_stream(min(settings.log_lines, 100))
+        if parts[0] == 'images' and parts[-1] == 'tag':
+            return self._empty(201)
+        if parts[0] == 'networks' and parts[-1] in ('connect', 'disconnect'):
+            return self._empty(200)
+        return self._empty()
+
+    def do_PUT(self):
+        if self._begin():
+            self._empty(200)
+
+    def do_DELETE(self):
+        if not self._begin():
+            return
+        if self.route.startswith('/images/'):
+            return self._json([{'Untagged': self.route.split('/', 2)[2]}])
+        self._empty()
+
+    def _transfer_progress(self, push):
+        layers = ['{0:012x}'.format(0xabc000 + i) for i in range(self.settings.pull_layers)]
+        yield {'status': 'The push refers to repository [registry.local/app]'} if push else \
+            {'status': 'Pulling from registry.local/app', 'id': 'latest'}
+        for layer in layers:
+            yield {'status': 'Preparing' if push else 'Pulling fs layer', 'progressDetail': {}, 'id': layer}
+        for layer in layers:
+            for current in range(0, 10485761, 1048576):
+                yield {'status': 'Pushing' if push else 'Downloading', 'id': layer,
+                       'progressDetail': {'current': current, 'total': 10485760},
+                       'progress': '[==>      ] {0}/10.49MB'.format(current)}
+            yield {'status': 'Pushed' if push else 'Pull complete', 'progressDetail': {}, 'id': layer}
+        digest = 'sha256:' + 'd' * 64
+        if push:
+            yield {'status': 'latest: digest: {0} size: 1234'.format(digest)}
+            yield {'progressDetail': {}, 'aux': {'Tag': 'latest', 'Digest': digest, 'Size': 1234}}
+        else:
+            yield {'status': 'Digest: {0}'.format(digest)}
+            yield {'status': 'Status: Downloaded newer image for registry.local/app:latest'}
+
+
+class _UnixHandler(FakeEngineHandler):
+    # TCP_NODELAY does not apply to Unix sockets
+    disable_nagle_algorithm = False
+
+    def address_string(self):
+        return 'unix'
+
+
+class _QuietErrorsMixin(object):
+    """Clients that hang up early (limits, timeouts, failed attempts) are expected; report anything else"""
+
+    def handle_error(self, request, client_address):
+        if isinstance(sys.exc_info()[1], (ConnectionError, TimeoutError)):
+            return
+        super(_QuietErrorsMixin, self).handle_error(request, client_address)
+
+
+class _ThreadingUnixServer(_QuietErrorsMixin, socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = LISTEN_BACKLOG
+
+
+class _ThreadingTCPServer(_QuietErrorsMixin, ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = LISTEN_BACKLOG
+
+
+def start_engine(settings=None, port=0, unix_socket=None):
+    """Start a fake engine on a background thread; returns the server (call shutdown() to stop it)"""
+    settings = settings or EngineSettings()
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.unlink(unix_socket)
+        server = _ThreadingUnixServer(unix_socket, _UnixHandler)
+    else:
+        server = _ThreadingTCPServer(('127.0.0.1', port), FakeEngineHandler)
+    server.settings = settings
+    threading.Thread(target=server.serve_forever, name='fake-docker-engine', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--port', type=int, default=23750)
+    parser.add_argument('--unix', help='Serve on this Unix socket path instead of TCP')
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--binary-size', type=int, default=64 * 1024 * 1024)
+    args = parser.parse_args()
+    settings = EngineSettings(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                              binary_size=args.binary_size)
+    server = start_engine(settings, port=args.port, unix_socket=args.unix)
+    print('Fake Docker Engine listening on {0}'.format(args.unix or '127.0.0.1:{0}'.format(server.server_address[1])))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
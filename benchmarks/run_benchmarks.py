@@ -0,0 +1,335 @@
+"""Offline benchmark of the connector against the fake Docker Engine.
+
+Drives DockerConnector.execute for every entry of builtins.supported_operations
+(plus file-output variants of the binary downloads) over TCP and/or a Unix
+socket, with configurable concurrency, latency and error injection, and
+reports p50/p99 latency, requests per second, error counts and, for binary
+operations, the peak RSS growth while the operation ran.
+
+Runs inside the FortiSOAR connector environment (the connectors SDK must be
+importable), from the connector directory:
+
+    python benchmarks/run_benchmarks.py --transport both --concurrency 8 --iterations 50
+    python benchmarks/run_benchmarks.py --only container_export,save_image --binary-size 2147483648
+    python benchmarks/run_benchmarks.py --transport unix --containers 5000 --images 5000 --json-backend both \
+        --only list_containers,list_images,inspect_container
+"""
+import argparse
+import contextlib
+import importlib
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_engine import EngineSettings, start_engine
+
+CONNECTOR_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONTAINER_ID = '{0:064x}'.format(1)
+IMAGE = 'registry.local/app:1'
+
+# Operations that move tar bodies; their report includes peak RSS growth
+BINARY_OPERATIONS = ('container_export', 'copy_from_container', 'save_image', 'load_image', 'copy_to_container',
+                     'build_image')
+# Large JSON listings; their report includes peak RSS growth too, to compare buffered and incremental decoding
+LISTING_OPERATIONS = ('list_containers', 'list_images', 'system_df')
+
+
+def load_connector():
+    """Import the connector package that contains this benchmarks directory"""
+    sys.path.insert(0, os.path.dirname(CONNECTOR_DIR))
+    package = os.path.basename(CONNECTOR_DIR)
+    try:
+        connector = importlib.import_module(package + '.connector')
+    except ImportError as e:
+        sys.exit('Cannot import the connector ({0}); run this inside the FortiSOAR connector environment'.format(e))
+    return (connector.DockerConnector(), importlib.import_module(package + '.builtins'),
+            importlib.import_module(package + '.utils'), importlib.import_module(package + '.codec'))
+
+
+def operation_params(fixtures):
+    """Parameters for each operation; operations missing here run with {}"""
+    return {
+        'get_version': {}, 'get_info': {}, 'system_df': {}, 'ping': {},
+        'system_events': {'since': '1700000000'},
+        'inventory_snapshot': {},
+        'get_cache_stats': {},
+        'system_prune': {},
+        'auth': {'username': 'bench', 'password': 'bench'},
+        'list_containers': {'all': True},
+        'inspect_container': {'id': CONTAINER_ID},
+        'start_container': {'id': CONTAINER_ID},
+        'stop_container': {'id': CONTAINER_ID, 't': 1},
+        'remove_container': {'id': CONTAINER_ID},
+        'create_container': {'image': IMAGE, 'name': 'bench'},
+        'restart_container': {'id': CONTAINER_ID, 't': 1},
+        'kill_container': {'id': CONTAINER_ID},
+        'container_logs': {'id': CONTAINER_ID, 'stdout': True, 'stderr': True, 'tail': '1000'},
+        'rename_container': {'id': CONTAINER_ID, 'name': 'renamed'},
+        'prune_containers': {},
+        'exec_container': {'id': CONTAINER_ID, 'Cmd': ['true']},
+        'pause_container': {'id': CONTAINER_ID},
+        'unpause_container': {'id': CONTAINER_ID},
+        'container_stats': {'id': CONTAINER_ID},
+        'stats_snapshot': {'mode': 'One-Shot', 'max_workers': 10},
+        'bulk_container_action': {'action': 'Restart', 'label': 'tier=web', 't': 1},
+        'container_export': {'id': CONTAINER_ID},
+        'container_commit': {'id': CONTAINER_ID, 'repo': 'bench'},
+        'update_container': {'id': CONTAINER_ID, 'Memory': 268435456},
+        'wait_container': {'id': CONTAINER_ID},
+        'attach_container': {'id': CONTAINER_ID, 'logs': True, 'stream': False},
+        'resize_container': {'id': CONTAINER_ID, 'h': 40, 'w': 120},
+        'copy_from_container': {'id': CONTAINER_ID, 'path': '/data'},
+        'copy_to_container': {'id': CONTAINER_ID, 'path': '/data', 'file_path': fixtures['upload_name']},
+        'list_images': {},
+        'pull_image': {'fromImage': IMAGE},
+        'inspect_image': {'id': IMAGE},
+        'remove_image': {'id': IMAGE},
+        'tag_image': {'id': IMAGE, 'repo': 'registry.local/app', 'tag': 'bench'},
+        'prune_images': {},
+        'build_image': {'context_path': fixtures['context_name'], 't': 'bench:latest'},
+        'search_images': {'term': 'app'},
+        'image_history': {'id': IMAGE},
+        'push_image': {'name': IMAGE},
+        'get_image_job': {'job_id': fixtures.get('job_id')},
+        'load_image': {'file_path': fixtures['upload_name']},
+        'save_image': {'name': IMAGE},
+        'list_networks': {}, 'inspect_network': {'id': 'bridge'},
+        'create_network': {'Name': 'bench'},
+        'connect_network': {'id': 'bridge', 'Container': CONTAINER_ID},
+        'disconnect_network': {'id': 'bridge', 'Container': CONTAINER_ID},
+        'remove_network': {'id': 'bench'}, 'prune_networks': {},
+        'list_volumes': {}, 'inspect_volume': {'name': 'data-1'},
+        'create_volume': {'Name': 'bench'}, 'remove_volume': {'name': 'bench'}, 'prune_volumes': {},
+        'fleet_execute': {'operation': 'list_containers', 'hosts': fixtures['fleet_hosts']}
+    }
+
+
+def file_variants():
+    """Binary downloads are also measured streaming to a temp file instead of returning base64"""
+    return {
+        'container_export[file]': ('container_export', {'id': CONTAINER_ID, 'output_mode': 'File'}),
+        'copy_from_container[file]': ('copy_from_container', {'id': CONTAINER_ID, 'path': '/data', 'output_mode': 'File'}),
+        'save_image[file]': ('save_image', {'name': IMAGE, 'output_mode': 'File'})
+    }
+
+
+def projection_variants():
+    """Large listings filtered and projected while the JSON array is decoded"""
+    return {
+        'list_containers[fields]': ('list_containers', {'all': True, 'fields': 'Id,Names,State',
+                                                        'where': '{"State": "running"}'}),
+        'list_images[fields]': ('list_images', {'fields': 'Id,RepoTags,Size'})
+    }
+
+
+def make_fixtures(tmp_dir, upload_size):
+    """Upload archive and build context inside the connector temp directory"""
+    work_dir = tempfile.mkdtemp(prefix='docker-bench-', dir=tmp_dir)
+    upload = os.path.join(work_dir, 'upload.tar')
+    block = b'\0' * (1024 * 1024)
+    with open(upload, 'wb') as f:
+        remaining = upload_size
+        while remaining > 0:
+            f.write(block[:min(len(block), remaining)])
+            remaining -= len(block)
+    context = os.path.join(work_dir, 'context')
+    os.makedirs(os.path.join(context, 'src'))
+    with open(os.path.join(context, 'Dockerfile'), 'w') as f:
+        f.write('FROM scratch\nCOPY src /src\n')
+    for i in range(50):
+        with open(os.path.join(context, 'src', 'file{0}.txt'.format(i)), 'wb') as f:
+            f.write(os.urandom(16 * 1024))
+    return work_dir, {'upload_name': os.path.relpath(upload, tmp_dir),
+                      'context_name': os.path.relpath(context, tmp_dir)}
+
+
+def current_rss():
+    """Resident set size in bytes (Linux /proc; ru_maxrss elsewhere)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        scale = 1 if platform.system() == 'Darwin' else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+class RssSampler(object):
+    """Track the peak RSS while a block runs by sampling it on a background thread"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self.baseline = current_rss()
+        self.peak = self.baseline
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, current_rss())
+            self._stop.wait(self.interval)
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def run_operation(connector, config, operation, params, iterations, concurrency, measure_rss):
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def call(_):
+        started = time.perf_counter()
+        try:
+            result = connector.execute(config, operation, dict(params))
+            if isinstance(result, dict) and result.get('file_path'):
+                os.remove(result['file_path'])
+        except Exception as e:
+            with lock:
+                errors.append(str(e))
+        with lock:
+            latencies.append(time.perf_counter() - started)
+
+    sampler = RssSampler() if measure_rss else None
+    with sampler or contextlib.nullcontext():
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(call, range(iterations)))
+        wall = time.perf_counter() - started
+    latencies.sort()
+    row = {
+        'operation': operation,
+        'calls': iterations,
+        'errors': len(errors),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'rps': round(iterations / wall, 1) if wall else None,
+        'peak_rss_mb': round((sampler.peak - sampler.baseline) / 1048576.0, 1) if sampler else None
+    }
+    if errors:
+        row['first_error'] = errors[0][:200]
+    return row
+
+
+def print_table(transport, rows):
+    print('\n== {0} =='.format(transport))
+    header = '{0:<32} {1:>6} {2:>6} {3:>10} {4:>10} {5:>9} {6:>12}'.format(
+        'operation', 'calls', 'errors', 'p50 ms', 'p99 ms', 'rps', 'peak RSS MB')
+    print(header)
+    print('-' * len(header))
+    for row in rows:
+        print('{0:<32} {1:>6} {2:>6} {3:>10} {4:>10} {5:>9} {6:>12}'.format(
+            row['operation'], row['calls'], row['errors'], row['p50_ms'], row['p99_ms'], row['rps'],
+            '' if row['peak_rss_mb'] is None else row['peak_rss_mb']))
+    for row in rows:
+        if row.get('first_error'):
+            print('  {0}: {1}'.format(row['operation'], row['first_error']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline connector benchmark against a fake Docker Engine')
+    parser.add_argument('--transport', choices=('tcp', 'unix', 'both'), default='both')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--iterations', type=int, default=20, help='Calls per operation')
+    parser.add_argument('--binary-iterations', type=int, default=3, help='Calls per binary operation')
+    parser.add_argument('--binary-size', type=int, default=64 * 1024 * 1024, help='Bytes per tar body and upload')
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with HTTP 500')
+    parser.add_argument('--containers', type=int, default=50)
+    parser.add_argument('--images', type=int, default=20)
+    parser.add_argument('--only', help='Comma-separated operations to run')
+    parser.add_argument('--config', help='JSON with extra connector config (e.g. {"response_cache": true})')
+    parser.add_argument('--json-backend', choices=('auto', 'orjson', 'json', 'both'), default='auto',
+                        help='JSON codec of the connector; both runs every operation with orjson and the stdlib')
+    parser.add_argument('--json', dest='json_path', help='Also write the report as JSON to this file')
+    args = parser.parse_args()
+
+    connector, builtins, utils, codec = load_connector()
+    backends = ('orjson', 'json') if args.json_backend == 'both' else (args.json_backend,)
+    if 'orjson' in backends and codec.orjson is None:
+        sys.exit('orjson is not installed')
+    settings = EngineSettings(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                              containers=args.containers, images=args.images, binary_size=args.binary_size)
+    work_dir, fixtures = make_fixtures(utils.get_tmp_dir(), args.binary_size)
+    socket_dir = tempfile.mkdtemp(prefix='docker-bench-sock-')
+    extra_config = json.loads(args.config) if args.config else {}
+    only = set(args.only.split(',')) if args.only else None
+    report = {'settings': vars(args), 'python': sys.version.split()[0], 'transports': {}}
+
+    try:
+        for transport in (('tcp', 'unix') if args.transport == 'both' else (args.transport,)):
+            if transport == 'unix':
+                server = start_engine(settings, unix_socket=os.path.join(socket_dir, 'docker.sock'))
+                config = {'server_address': server.server_address, 'protocol': 'UNIX'}
+                fleet_hosts = ['unix://' + server.server_address]
+            else:
+                server = start_engine(settings)
+                config = {'server_address': '127.0.0.1', 'port': server.server_address[1], 'protocol': 'HTTP'}
+                fleet_hosts = ['127.0.0.1:{0}'.format(server.server_address[1])]
+            config.update({'verify_ssl': False, 'api_version': 'Auto', 'timeout': 60, 'rate_limit': 0,
+                           'heavy_rate_limit': 0, 'retry_attempts': 3, 'retry_delay': 0.05,
+                           'pool_maxsize': max(10, args.concurrency)})
+            config.update(extra_config)
+            fixtures['fleet_hosts'] = fleet_hosts * 2 if transport == 'unix' else \
+                fleet_hosts + ['localhost:{0}'.format(server.server_address[1])]
+            # A background pull whose job get_image_job polls
+            fixtures['job_id'] = connector.execute(config, 'pull_image', {'fromImage': IMAGE, 'wait': False})['job_id']
+
+            params = operation_params(fixtures)
+            plan = [(name, name, params.get(name, {})) for name in builtins.supported_operations]
+            plan += [(label, op, op_params) for label, (op, op_params) in file_variants().items()]
+            plan += [(label, op, op_params) for label, (op, op_params) in projection_variants().items()]
+            for backend in backends:
+                codec.use_json_backend(backend)
+                rows = []
+                for label, operation, op_params in plan:
+                    if only and label not in only and operation not in only:
+                        continue
+                    binary = operation in BINARY_OPERATIONS
+                    row = run_operation(connector, config, operation, op_params,
+                                        args.binary_iterations if binary else args.iterations,
+                                        1 if binary else args.concurrency,
+                                        binary or operation in LISTING_OPERATIONS)
+                    row['operation'] = label
+                    rows.append(row)
+                name = '{0} / {1}'.format(transport, codec.get_json_backend())
+                print_table(name, rows)
+                report['transports'][name] = rows
+            server.shutdown()
+            server.server_close()
+            utils.close_transports()
+        report['engine'] = {'requests': settings.requests, 'errors_injected': settings.errors_injected,
+                            'bytes_sent': settings.bytes_sent, 'bytes_received': settings.bytes_received}
+        print('\nFake engine: {requests} requests, {errors_injected} injected errors, {bytes_sent} bytes sent, '
+              '{bytes_received} bytes received'.format(**report['engine']))
+        if args.json_path:
+            with open(args.json_path, 'w') as f:
+                json.dump(report, f, indent=2)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        shutil.rmtree(socket_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+import os
+import re
+import stat
+import hashlib
+import tarfile
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+from connectors.core.connector import get_logger, ConnectorError
+from .utils import get_tmp_dir
+from .constants import LOGGER_NAME
+
+logger = get_logger(LOGGER_NAME)
+
+# Archived build contexts keyed by context fingerprint (thread-safe, LRU)
+_context_cache_lock = threading.Lock()
+_context_cache = OrderedDict()
+
+BUILD_CONTEXT_CACHE_SIZE = 8
+TAR_BLOCK_SIZE = 512
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+
+def _compile_ignore_pattern(pattern):
+    """Translate a .dockerignore pattern (Go filepath.Match syntax plus '**') to a regex"""
+    regex = ''
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '*':
+            if pattern[i:i + 2] == '**':
+                i += 1
+                if pattern[i + 1:i + 2] == '/':
+                    # '**/' matches zero or more directories
+                    i += 1
+                    regex += '(?:.*/)?'
+                else:
+                    regex += '.*'
+            else:
+                regex += '[^/]*'
+        elif char == '?':
+            regex += '[^/]'
+        elif char == '[':
+            end = pattern.find(']', i + 1)
+            if end == -1:
+                regex += re.escape(char)
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith('^') or body.startswith('!'):
+                    body = '^' + body[1:]
+                regex += '[' + body.replace('\\', '\\\\') + ']'
+                i = end
+        elif char == '\\' and i + 1 < len(pattern):
+            i += 1
+            regex += re.escape(pattern[i])
+        else:
+            regex += re.escape(char)
+        i += 1
+    return re.compile('^' + regex + '$')
+
+
+def _read_dockerignore(context_dir):
+    """Return the compiled (regex, is_exception) patterns of the context's .dockerignore"""
+    path = os.path.join(context_dir, '.dockerignore')
+    if not os.path.isfile(path):
+        return [], ''
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        content = f.read()
+    patterns = []
+    for line in content.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        exception = line.startswith('!')
+        if exception:
+            line = line[1:].strip()
+        line = os.path.normpath(line).replace(os.sep, '/').lstrip('/')
+        if line in ('', '.'):
+            continue
+        patterns.append((_compile_ignore_pattern(line), exception))
+    return patterns, content
+
+
+def _is_ignored(rel_path, patterns):
+    """A path is ignored when the last pattern matching it (or one of its parents) is not an exception"""
+    parts = rel_path.split('/')
+    candidates = ['/'.join(parts[:i]) for i in range(1, len(parts) + 1)]
+    ignored = False
+    for regex, exception in patterns:
+        if any(regex.match(candidate) for candidate in candidates):
+            ignored = not exception
+    return ignored
+
+
+def _scan_context(context_dir, dockerfile, patterns):
+    """Walk the context in a stable order and return the entries to archive as (rel_path, abs_path, lstat)"""
+    has_exceptions = any(exception for _, exception in patterns)
+    always_included = {'.dockerignore', os.path.normpath(dockerfile).replace(os.sep, '/')}
+    entries = []
+    for root, dirs, files in os.walk(context_dir):
+        dirs.sort()
+        rel_root = os.path.relpath(root, context_dir).replace(os.sep, '/')
+        rel_root = '' if rel_root == '.' else rel_root + '/'
+        kept_dirs = []
+        for name in dirs:
+            rel_path = rel_root + name
+            path = os.path.join(root, name)
+            if _is_ignored(rel_path, patterns):
+                # Descend only when a later exception could re-include something below it
+                if has_exceptions and not os.path.islink(path):
+                    kept_dirs.append(name)
+                continue
+            entries.append((rel_path, path, os.lstat(path)))
+            if not os.path.islink(path):
+                kept_dirs.append(name)
+        dirs[:] = kept_dirs
+        for name in sorted(files):
+            rel_path = rel_root + name
+            if rel_path in always_included or not _is_ignored(rel_path, patterns):
+                path = os.path.join(root, name)
+                entries.append((rel_path, path, os.lstat(path)))
+    return entries
+
+
+def _fingerprint(entries, ignore_content, dockerfile, gzip):
+    """Hash of the archive inputs: names, types, sizes, modes and mtimes of all entries"""
+    digest = hashlib.sha256()
+    digest.update('{0}\0{1}\0{2}\0'.format(ignore_content, dockerfile, int(bool(gzip))).encode('utf-8', 'surrogateescape'))
+    for rel_path, path, st in entries:
+        link = os.readlink(path) if stat.S_ISLNK(st.st_mode) else ''
+        digest.update('{0}\0{1}\0{2}\0{3}\0{4}\n'.format(
+            rel_path, st.st_mode, st.st_size, st.st_mtime_ns, link).encode('utf-8', 'surrogateescape'))
+    return digest.hexdigest()
+
+
+def _tar_header(rel_path, path, st):
+    info = tarfile.TarInfo(rel_path)
+    info.mode = stat.S_IMODE(st.st_mode)
+    info.mtime = int(st.st_mtime)
+    if stat.S_ISDIR(st.st_mode):
+        info.type = tarfile.DIRTYPE
+    elif stat.S_ISLNK(st.st_mode):
+        info.type = tarfile.SYMTYPE
+        info.linkname = os.readlink(path)
+    elif stat.S_ISREG(st.st_mode):
+        info.type = tarfile.REGTYPE
+        info.size = st.st_size
+    else:
+        return None
+    return info.tobuf(tarfile.PAX_FORMAT, 'utf-8', 'surrogateescape')
+
+
+def _iter_tar(entries):
+    """Yield a tar stream of the entries without holding any file in memory"""
+    for rel_path, path, st in entries:
+        header = _tar_header(rel_path, path, st)
+        if header is None:
+            logger.warning('Skipping special file in build context: {0}'.format(rel_path))
+            continue
+        yield header
+        if not stat.S_ISREG(st.st_mode):
+            continue
+        remaining = st.st_size
+        with open(path, 'rb') as source:
+            while remaining > 0:
+                chunk = source.read(min(STREAM_CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise ConnectorError('Build context file changed while archiving: {0}'.format(rel_path))
+                remaining -= len(chunk)
+                yield chunk
+        padding = (TAR_BLOCK_SIZE - st.st_size % TAR_BLOCK_SIZE) % TAR_BLOCK_SIZE
+        if padding:
+            yield b'\0' * padding
+    # End-of-archive marker: two zero blocks
+    yield b'\0' * (TAR_BLOCK_SIZE * 2)
+
+
+def _iter_compressed(chunks, gzip):
+    """Optionally gzip the tar stream and coalesce small pieces into larger chunks"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += compressor.compress(chunk) if compressor else chunk
+        if len(buffer) >= STREAM_CHUNK_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+    if compressor:
+        buffer += compressor.flush()
+    if buffer:
+        yield bytes(buffer)
+
+
+def _cache_get(key):
+    with _context_cache_lock:
+        entry = _context_cache.get(key)
+        if entry is None:
+            return None
+        if not os.path.isfile(entry['path']):
+            del _context_cache[key]
+            return None
+        _context_cache.move_to_end(key)
+        return entry
+
+
+def _cache_put(key, entry):
+    evicted = []
+    with _context_cache_lock:
+        previous = _context_cache.pop(key, None)
+        if previous and previous['path'] != entry['path']:
+            evicted.append(previous)
+        _context_cache[key] = entry
+        while len(_context_cache) > BUILD_CONTEXT_CACHE_SIZE:
+            evicted.append(_context_cache.popitem(last=False)[1])
+    for old in evicted:
+        try:
+            os.remove(old['path'])
+        except OSError:
+            pass
+
+
+class BuildContext(object):
+    """Re-iterable build context body for POST /build.
+
+    The first iteration archives the context directory (honouring
+    .dockerignore) while streaming it and stores the archive in the context
+    cache; later builds of an unchanged context stream the cached archive
+    instead of re-archiving it.
+    """
+
+    def __init__(self, context_dir, dockerfile='Dockerfile', gzip=False, use_cache=True):
+        self.context_dir = context_dir
+        self.dockerfile = dockerfile or 'Dockerfile'
+        self.gzip = gzip
+        self.use_cache = use_cache
+        patterns, ignore_content = _read_dockerignore(context_dir)
+        self.entries = _scan_context(context_dir, self.dockerfile, patterns)
+        self.key = _fingerprint(self.entries, ignore_content, self.dockerfile, gzip)
+        self.cached = False
+        self.size = None
+        self.sha256 = None
+        entry = _cache_get(self.key) if use_cache else None
+        if entry:
+            self.cached = True
+            self.size = entry['size']
+            self.sha256 = entry['sha256']
+
+    def __iter__(self):
+        entry = _cache_get(self.key) if self.use_cache else None
+        if entry:
+            return self._iter_cached(entry['path'])
+        return self._iter_archive()
+
+    def _iter_cached(self, path):
+        with open(path, 'rb') as source:
+            while True:
+                chunk = source.read(STREAM_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+    def _iter_archive(self):
+        digest = hashlib.sha256()
+        size = 0
+        cache_file = None
+        cache_path = None
+        if self.use_cache:
+            fd, cache_path = tempfile.mkstemp(prefix='docker-build-context-', suffix='.tar', dir=get_tmp_dir())
+            cache_file = os.fdopen(fd, 'wb')
+        completed = False
+        try:
+            for chunk in _iter_compressed(_iter_tar(self.entries), self.gzip):
+                digest.update(chunk)
+                size += len(chunk)
+                if cache_file:
+                    cache_file.write(chunk)
+                yield chunk
+            completed = True
+        finally:
+            if cache_file:
+                cache_file.close()
+                if completed:
+                    _cache_put(self.key, {'path': cache_path, 'size': size, 'sha256': digest.hexdigest()})
+                else:
+                    os.remove(cache_path)
+        self.size = size
+        self.sha256 = digest.hexdigest()
+
+    def summary(self):
+        return {'files': len(self.entries), 'size': self.size, 'sha256': self.sha256,
+                'gzip': bool(self.gzip), 'cached': self.cached}
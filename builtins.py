@@ -1,12 +1,14 @@
-from .system_ops import get_version, get_info, system_df, system_events, system_prune, ping, auth
-from .containers import list_containers, inspect_container, start_container, stop_container, remove_container, create_container, restart_container, kill_container, container_logs, rename_container, prune_containers, exec_container, pause_container, unpause_container, container_stats, container_export, container_commit, update_container, wait_container, attach_container, resize_container, copy_from_container, copy_to_container
-from .images import list_images, pull_image, inspect_image, remove_image, tag_image, prune_images, build_image, search_images, image_history, push_image, load_image, save_image
+from .system_ops import get_version, get_info, system_df, system_events, inventory_snapshot, get_cache_stats, get_connector_metrics, system_prune, ping, auth
+from .containers import list_containers, inspect_container, start_container, stop_container, remove_container, create_container, restart_container, kill_container, container_logs, rename_container, prune_containers, exec_container, pause_container, unpause_container, container_stats, stats_snapshot, bulk_container_action, container_export, container_commit, update_container, wait_container, attach_container, resize_container, copy_from_container, copy_to_container
+from .images import list_images, pull_image, inspect_image, remove_image, tag_image, prune_images, build_image, search_images, image_history, push_image, get_image_job, load_image, save_image
 from .networks import list_networks, inspect_network, create_network, connect_network, disconnect_network, remove_network, prune_networks
 from .volumes import list_volumes, inspect_volume, create_volume, remove_volume, prune_volumes
+from .fleet import fleet_execute
  
 supported_operations = {
     # System operations
     'get_version': get_version, 'get_info': get_info, 'system_df': system_df, 'system_events': system_events, 
+    'inventory_snapshot': inventory_snapshot, 'get_cache_stats': get_cache_stats, 'get_connector_metrics': get_connector_metrics,
     'system_prune': system_prune, 'ping': ping, 'auth': auth,
     
     # Container operations
@@ -15,6 +17,7 @@ supported_operations = {
     'restart_container': restart_container, 'kill_container': kill_container, 'container_logs': container_logs, 
     'rename_container': rename_container, 'prune_containers': prune_containers, 'exec_container': exec_container, 
     'pause_container': pause_container, 'unpause_container': unpause_container, 'container_stats': container_stats, 
+    'stats_snapshot': stats_snapshot, 'bulk_container_action': bulk_container_action,
     'container_export': container_export, 'container_commit': container_commit, 'update_container': update_container,
     'wait_container': wait_container, 'attach_container': attach_container, 'resize_container': resize_container,
     'copy_from_container': copy_from_container, 'copy_to_container': copy_to_container,
@@ -22,7 +25,7 @@ supported_operations = {
     # Image operations
     'list_images': list_images, 'pull_image': pull_image, 'inspect_image': inspect_image, 'remove_image': remove_image, 
     'tag_image': tag_image, 'prune_images': prune_images, 'build_image': build_image, 'search_images': search_images, 
-    'image_history': image_history, 'push_image': push_image, 'load_image': load_image, 'save_image': save_image,
+    'image_history': image_history, 'push_image': push_image, 'get_image_job': get_image_job, 'load_image': load_image, 'save_image': save_image,
     
     # Network operations
     'list_networks': list_networks, 'inspect_network': inspect_network, 'create_network': create_network, 
@@ -31,5 +34,8 @@ supported_operations = {
     
     # Volume operations
     'list_volumes': list_volumes, 'inspect_volume': inspect_volume, 'create_volume': create_volume, 
-    'remove_volume': remove_volume, 'prune_volumes': prune_volumes
+    'remove_volume': remove_volume, 'prune_volumes': prune_volumes,
+    
+    # Fleet operations
+    'fleet_execute': fleet_execute
 }
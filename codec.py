@@ -0,0 +1,134 @@
+import re
+import json
+import codecs
+from connectors.core.connector import get_logger, ConnectorError
+from .constants import LOGGER_NAME
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = get_logger(LOGGER_NAME)
+
+JSON_BACKENDS = ('orjson', 'json')
+WHITESPACE_PATTERN = re.compile(r'[ \t\n\r]*')
+NUMBER_START = '-0123456789'
+NUMBER_END = ' \t\n\r,]'
+
+# C scanner behind JSONDecoder.raw_decode: (value, end) from an index, StopIteration/ValueError when incomplete
+_scan_once = json.JSONDecoder().scan_once
+
+
+def _std_loads(data):
+    return json.loads(data)
+
+
+def _std_dumps(obj):
+    return json.dumps(obj)
+
+
+def _orjson_loads(data):
+    return orjson.loads(data)
+
+
+def _orjson_dumps(obj):
+    try:
+        return orjson.dumps(obj).decode('utf-8')
+    except TypeError:
+        # Types orjson refuses (e.g. non-string keys, big ints) keep the stdlib behaviour
+        return json.dumps(obj)
+
+
+_codec = {'name': 'json', 'loads': _std_loads, 'dumps': _std_dumps}
+
+
+def use_json_backend(name='auto'):
+    """Select the JSON backend for API bodies: 'orjson', 'json' (standard library) or 'auto' (orjson when installed)"""
+    name = str(name or 'auto').lower()
+    if name == 'auto':
+        name = 'orjson' if orjson is not None else 'json'
+    if name not in JSON_BACKENDS:
+        raise ConnectorError('Unknown JSON backend: {0}. Must be one of: auto, {1}'.format(name, ', '.join(JSON_BACKENDS)))
+    if name == 'orjson' and orjson is None:
+        raise ConnectorError('JSON backend orjson is not installed')
+    if name == 'orjson':
+        _codec.update(name='orjson', loads=_orjson_loads, dumps=_orjson_dumps)
+    else:
+        _codec.update(name='json', loads=_std_loads, dumps=_std_dumps)
+    return name
+
+
+def get_json_backend():
+    return _codec['name']
+
+
+def loads(data):
+    """Decode JSON text or bytes; raises ValueError on invalid input with either backend"""
+    return _codec['loads'](data)
+
+
+def dumps(obj):
+    """Encode compact-or-standard JSON text (the exact spacing depends on the backend)"""
+    return _codec['dumps'](obj)
+
+
+def iter_json_array(chunks):
+    """Decode a top-level JSON array from byte chunks, yielding each element as soon as it is complete.
+
+    Only the element being received is buffered, so a large listing never sits
+    in memory both as text and as decoded objects. An element split across
+    chunks is retried once the pending text has doubled, which keeps the work
+    linear for elements larger than a chunk.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    text = ''
+    state = 'start'
+    retry_at = 0
+    iterator = iter(chunks)
+    final = False
+    while not final:
+        chunk = next(iterator, None)
+        final = chunk is None
+        text += decoder.decode(chunk or b'', final=final)
+        if len(text) < retry_at and not final:
+            continue
+        retry_at = 0
+        pos = 0
+        while True:
+            pos = WHITESPACE_PATTERN.match(text, pos).end()
+            if pos >= len(text):
+                break
+            char = text[pos]
+            if state == 'start':
+                if char != '[':
+                    raise ValueError('Expected a JSON array, got {0!r}'.format(text[pos:pos + 50]))
+                pos += 1
+                state = 'first'
+            elif char == ']' and state in ('first', 'after'):
+                return
+            elif state == 'after':
+                if char != ',':
+                    raise ValueError('Expected , or ] in JSON array, got {0!r}'.format(text[pos:pos + 50]))
+                pos += 1
+                state = 'item'
+            else:
+                try:
+                    value, end = _scan_once(text, pos)
+                except (StopIteration, ValueError):
+                    if final:
+                        raise ValueError('Invalid JSON array element at {0!r}'.format(text[pos:pos + 50]))
+                    retry_at = 2 * (len(text) - pos)
+                    break
+                if not final and char in NUMBER_START and (end == len(text) or text[end] not in NUMBER_END):
+                    # A number may continue in the next chunk (e.g. '2' of '2.5')
+                    break
+                yield value
+                pos = end
+                state = 'after'
+        text = text[pos:]
+    raise ValueError('Unterminated JSON array')
+
+
+# orjson when it is installed, else the standard library
+use_json_backend('auto')
@@ -4,6 +4,9 @@ from django.utils.module_loading import import_string
 from .builtins import *
 from .constants import LOGGER_NAME
 from .health_check import health_check
+from .metrics import operation_scope
+from .tracing import operation_span
+from .profiling import profile_mode, profile_call
 logger = get_logger(LOGGER_NAME)
 
 
@@ -13,7 +16,15 @@ class DockerConnector(Connector):
         operation_callable = supported_operations.get(operation)
         if not operation_callable:
             raise ConnectorError('Unsupported operation: {0}'.format(operation))
-        return operation_callable(config, params)
+        mode = profile_mode(config, params or {})
+        if params and 'profile' in params:
+            # Connector-level flag; operations never see it
+            params = {key: value for key, value in params.items() if key != 'profile'}
+        with operation_scope(operation), operation_span(config, operation):
+            if mode:
+                return profile_call(operation, mode, lambda: operation_callable(config, params))
+            return operation_callable(config, params)
 
     def check_health(self, config=None, *args, **kwargs):
-        return health_check(config, *args, **kwargs)
+        with operation_scope('check_health'), operation_span(config, 'check_health'):
+            return health_check(config, *args, **kwargs)
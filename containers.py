@@ -1,10 +1,26 @@
 from connectors.core.connector import get_logger, ConnectorError
-from .utils import invoke_rest_endpoint, invoke_binary_endpoint, validate_required_params, validate_container_id, validate_image_name, validate_positive_integer, validate_boolean_param, validate_json_param
-import base64
+from .utils import invoke_rest_endpoint, invoke_binary_endpoint, validate_required_params, validate_container_id, validate_image_name, validate_positive_integer, validate_boolean_param, validate_json_param, validate_list_param, validate_output_mode, build_upload_body, get_cursor, set_cursor, iter_json_lines, run_concurrently, supports_api_feature, json_array_handler, DEFAULT_MAX_WORKERS
+from .projection import shape_result, item_shaper
+from .pagination import paginate, is_paginated
+from .streams import demux_response_handler, validate_demux_mode, next_log_cursor, strip_log_timestamps, rfc3339_to_unix
 from .constants import LOGGER_NAME
+import itertools
+import time
 
 logger = get_logger(LOGGER_NAME)
 
+# Follow window used by container_logs when follow=true and no max_duration is given (seconds)
+DEFAULT_FOLLOW_DURATION = 10
+
+# Samples read by container_stats when stream=true
+DEFAULT_STATS_SAMPLES = 2
+STATS_MODES = ('window', 'standard', 'one-shot')
+# Longest sampling window accepted by stats_snapshot (seconds)
+MAX_STATS_WINDOW = 300
+
+# Actions accepted by bulk_container_action
+BULK_ACTIONS = ('start', 'stop', 'restart', 'kill', 'pause', 'unpause', 'remove')
+
 
 def list_containers(config, params, *args, **kwargs):
     """List Docker containers"""
@@ -27,6 +43,14 @@ def list_containers(config, params, *args, **kwargs):
     if filters:
         query_params['filters'] = filters
     
+    if is_paginated(params):
+        return paginate(config, params, 'list_containers',
+                        lambda: invoke_rest_endpoint(config, '/containers/json', 'GET', query_params=query_params))
+    shaper = item_shaper(params, 'list_containers')
+    if shaper is not None:
+        # Filter and project each container while the array is decoded
+        return invoke_rest_endpoint(config, '/containers/json', 'GET', query_params=query_params,
+                                    response_handler=json_array_handler(shaper))
     return invoke_rest_endpoint(config, '/containers/json', 'GET', query_params=query_params)
 
 
@@ -34,7 +58,8 @@ def inspect_container(config, params, *args, **kwargs):
     validate_required_params(params, ['id'], 'inspect_container')
     container_id = params.get('id')
     validate_container_id(container_id, 'inspect_container')
-    return invoke_rest_endpoint(config, '/containers/{0}/json'.format(container_id), 'GET')
+    result = invoke_rest_endpoint(config, '/containers/{0}/json'.format(container_id), 'GET')
+    return shape_result(result, params, 'inspect_container')
 
 
 def start_container(config, params, *args, **kwargs):
@@ -49,7 +74,13 @@ def stop_container(config, params, *args, **kwargs):
     container_id = params.get('id')
     validate_container_id(container_id, 'stop_container')
     timeout = validate_positive_integer(params.get('t'), 'timeout', 'stop_container')
-    return invoke_rest_endpoint(config, '/containers/{0}/stop'.format(container_id), 'POST', query_params={'t': timeout})
+    signal = params.get('signal')
+    if signal and not supports_api_feature(config, 'container_stop_signal'):
+        raise ConnectorError('The Docker daemon does not support a stop signal for stop_container (API 1.42 or later required)')
+    # The daemon answers only after the grace period, so wait for it on top of the request timeout
+    return invoke_rest_endpoint(config, '/containers/{0}/stop'.format(container_id), 'POST',
+                                query_params={'t': timeout, 'signal': signal or None},
+                                timeout=_grace_timeout(config, timeout))
 
 
 def remove_container(config, params, *args, **kwargs):
@@ -78,7 +109,9 @@ def restart_container(config, params, *args, **kwargs):
     container_id = params.get('id')
     validate_container_id(container_id, 'restart_container')
     timeout = validate_positive_integer(params.get('t'), 'timeout', 'restart_container')
-    return invoke_rest_endpoint(config, '/containers/{0}/restart'.format(container_id), 'POST', query_params={'t': timeout})
+    # The daemon answers only after the grace period, so wait for it on top of the request timeout
+    return invoke_rest_endpoint(config, '/containers/{0}/restart'.format(container_id), 'POST', query_params={'t': timeout},
+                                timeout=_grace_timeout(config, timeout))
 
 
 def kill_container(config, params, *args, **kwargs):
@@ -91,7 +124,14 @@ def kill_container(config, params, *args, **kwargs):
 
 
 def container_logs(config, params, *args, **kwargs):
-    """Fetch container logs"""
+    """Fetch container logs.
+    
+    With follow=true the log stream is read for at most max_duration seconds
+    (or until max_bytes/max_lines were collected) and what was collected is
+    returned. With incremental=true the newest timestamp seen is stored per
+    container and daemon and used as `since` on the next call, so repeated
+    polls only return new lines.
+    """
     validate_required_params(params, ['id'], 'container_logs')
     container_id = params.get('id')
     validate_container_id(container_id, 'container_logs')
@@ -103,6 +143,16 @@ def container_logs(config, params, *args, **kwargs):
     timestamps = validate_boolean_param(params.get('timestamps', False), 'timestamps', 'container_logs', False)
     follow = validate_boolean_param(params.get('follow', False), 'follow', 'container_logs', False)
     details = validate_boolean_param(params.get('details', False), 'details', 'container_logs', False)
+    demux = validate_demux_mode(params.get('demux'), 'container_logs')
+    incremental = validate_boolean_param(params.get('incremental', False), 'incremental', 'container_logs', False)
+    max_duration = validate_positive_integer(params.get('max_duration'), 'max_duration', 'container_logs')
+    max_bytes = validate_positive_integer(params.get('max_bytes'), 'max_bytes', 'container_logs')
+    max_lines = validate_positive_integer(params.get('max_lines'), 'max_lines', 'container_logs')
+    if follow and not max_duration:
+        max_duration = DEFAULT_FOLLOW_DURATION
+    
+    if incremental and not since:
+        since = get_cursor(config, 'container_logs', container_id)
     
     query_params = {'stdout': int(bool(stdout)), 'stderr': int(bool(stderr))}
     if tail:
@@ -111,16 +161,30 @@ def container_logs(config, params, *args, **kwargs):
         query_params['since'] = since
     if until:
         query_params['until'] = until
-    if timestamps:
-        query_params['timestamps'] = int(bool(timestamps))
+    if timestamps or incremental:
+        # The incremental cursor is taken from the timestamp of the last line
+        query_params['timestamps'] = 1
     if follow:
         query_params['follow'] = int(bool(follow))
     if details:
         query_params['details'] = int(bool(details))
     
-    return invoke_rest_endpoint(config, '/containers/{0}/logs'.format(container_id), 'GET',
-                                headers={'accept': 'text/plain'},
-                                query_params=query_params)
+    # Strip the stdout/stderr frame headers of non-TTY containers while streaming
+    result = invoke_rest_endpoint(config, '/containers/{0}/logs'.format(container_id), 'GET',
+                                  headers={'accept': 'text/plain'},
+                                  query_params=query_params,
+                                  timeout=max_duration if follow else None,
+                                  response_handler=demux_response_handler(demux, max_bytes=max_bytes,
+                                                                          max_lines=max_lines,
+                                                                          max_duration=max_duration))
+    if incremental:
+        cursor = next_log_cursor(result)
+        if cursor:
+            set_cursor(config, 'container_logs', container_id, cursor)
+        result['next_since'] = cursor or since
+        if not timestamps:
+            strip_log_timestamps(result)
+    return result
 
 
 def rename_container(config, params, *args, **kwargs):
@@ -176,10 +240,12 @@ def exec_container(config, params, *args, **kwargs):
     
     # Exec start parameters
     detach = validate_boolean_param(params.get('Detach', False), 'Detach', 'exec_container', False)
+    demux = validate_demux_mode(params.get('demux'), 'exec_container')
     
-    # Start exec
+    # Start exec; attached output is framed per stream unless a TTY was allocated
     started = invoke_rest_endpoint(config, '/exec/{0}/start'.format(exec_id), 'POST', 
-                                    data={'Detach': detach, 'Tty': tty})
+                                    data={'Detach': detach, 'Tty': tty},
+                                    response_handler=None if detach else demux_response_handler(demux, multiplexed=not tty))
     return {'exec_id': exec_id, 'output': started}
 
 
@@ -197,25 +263,284 @@ def unpause_container(config, params, *args, **kwargs):
     return invoke_rest_endpoint(config, '/containers/{0}/unpause'.format(container_id), 'POST')
 
 
+def _grace_timeout(config, grace_period):
+    """Request timeout for calls that block for a stop grace period of `grace_period` seconds"""
+    if not grace_period:
+        return None
+    return float(config.get('timeout') or 60) + grace_period
+
+
+def bulk_container_action(config, params, *args, **kwargs):
+    """Start, stop, restart, kill, pause, unpause or remove many containers concurrently.
+    
+    Targets are the given IDs or the containers matching filters/label/name,
+    resolved once through list_containers. Items of a JSON `ids` array may be
+    objects with their own stop timeout, e.g. {"id": "web", "t": 30}. Calls run
+    on a bounded thread pool (still subject to the rate limit), so grace periods
+    overlap instead of adding up. Every item reports its status, timing and
+    error; a failing item does not fail the batch.
+    """
+    action = str(params.get('action') or '').strip().lower()
+    if action not in BULK_ACTIONS:
+        raise ConnectorError('Invalid action for bulk_container_action: {0}. Must be one of: {1}'.format(
+            params.get('action'), ', '.join(BULK_ACTIONS)))
+    timeout = validate_positive_integer(params.get('t'), 't', 'bulk_container_action')
+    force = validate_boolean_param(params.get('force', False), 'force', 'bulk_container_action', False)
+    volumes = validate_boolean_param(params.get('v', False), 'v', 'bulk_container_action', False)
+    signal = params.get('signal')
+    max_workers = validate_positive_integer(params.get('max_workers'), 'max_workers', 'bulk_container_action') or DEFAULT_MAX_WORKERS
+    targets = _resolve_bulk_targets(config, params, timeout)
+    
+    def run(target):
+        container_id = target['id']
+        endpoint = '/containers/{0}'.format(container_id)
+        if action == 'remove':
+            return invoke_rest_endpoint(config, endpoint, 'DELETE',
+                                        query_params={'force': int(bool(force)), 'v': int(bool(volumes))})
+        if action in ('stop', 'restart'):
+            return invoke_rest_endpoint(config, '{0}/{1}'.format(endpoint, action), 'POST',
+                                        query_params={'t': target.get('t')},
+                                        timeout=_grace_timeout(config, target.get('t')))
+        if action == 'kill':
+            return invoke_rest_endpoint(config, endpoint + '/kill', 'POST',
+                                        query_params={'signal': signal} if signal else None)
+        return invoke_rest_endpoint(config, '{0}/{1}'.format(endpoint, action), 'POST')
+    
+    started = time.monotonic()
+    items = []
+    for outcome in run_concurrently(run, targets, max_workers):
+        target = outcome['item']
+        items.append({
+            'id': target['id'],
+            'name': target.get('name'),
+            'status': 'failed' if outcome['error'] else 'succeeded',
+            'error': outcome['error'],
+            'elapsed': outcome['elapsed']
+        })
+    failed = sum(1 for item in items if item['error'])
+    return {
+        'action': action,
+        'total': len(items),
+        'succeeded': len(items) - failed,
+        'failed': failed,
+        'elapsed': round(time.monotonic() - started, 3),
+        'items': items
+    }
+
+
+def _resolve_bulk_targets(config, params, default_timeout=None):
+    """Return [{'id', 'name', 't'}] from the ids parameter or from a list_containers query"""
+    ids = params.get('ids')
+    if isinstance(ids, str) and ids.strip().startswith('['):
+        ids = validate_json_param(ids, 'ids', 'bulk_container_action')
+    targets = []
+    if isinstance(ids, list):
+        for item in ids:
+            target = dict(item) if isinstance(item, dict) else {'id': str(item).strip()}
+            if not target.get('id'):
+                continue
+            target['t'] = validate_positive_integer(target.get('t', default_timeout), 't', 'bulk_container_action')
+            targets.append(target)
+    else:
+        targets = [{'id': container_id, 't': default_timeout}
+                   for container_id in validate_list_param(ids, 'ids', 'bulk_container_action')]
+    for target in targets:
+        validate_container_id(target['id'], 'bulk_container_action')
+    if targets:
+        return targets
+    
+    filters = validate_json_param(params.get('filters'), 'filters', 'bulk_container_action') or {}
+    for key in ('label', 'name'):
+        values = validate_list_param(params.get(key), key, 'bulk_container_action')
+        if values:
+            filters = dict(filters, **{key: values})
+    if not filters:
+        # Refuse to act on every container of the host by accident
+        raise ConnectorError('Missing required parameters for bulk_container_action: ids, filters, label or name')
+    listed = list_containers(config, {'all': True, 'filters': filters})
+    return [{'id': c.get('Id'), 'name': (c.get('Names') or [''])[0].lstrip('/'), 't': default_timeout}
+            for c in listed]
+
+
 def container_stats(config, params, *args, **kwargs):
     validate_required_params(params, ['id'], 'container_stats')
     container_id = params.get('id')
     validate_container_id(container_id, 'container_stats')
     stream = validate_boolean_param(params.get('stream', False), 'stream', 'container_stats', False)
+    if not stream:
+        return invoke_rest_endpoint(config, '/containers/{0}/stats'.format(container_id), 'GET',
+                                    query_params={'stream': 0})
+    
+    # The stream never ends: read a bounded number of NDJSON samples and close it
+    samples = validate_positive_integer(params.get('samples'), 'samples', 'container_stats') or DEFAULT_STATS_SAMPLES
     return invoke_rest_endpoint(config, '/containers/{0}/stats'.format(container_id), 'GET',
-                                query_params={'stream': int(bool(stream))})
+                                query_params={'stream': 1},
+                                response_handler=lambda response: {
+                                    'samples': list(itertools.islice(iter_json_lines(response), samples))})
+
+
+def stats_snapshot(config, params, *args, **kwargs):
+    """Sample resource usage of all running (or filtered) containers concurrently.
+    
+    Modes:
+    - window: two one-shot samples `window` seconds apart; CPU % and network/block I/O rates
+    - standard: one stream=false sample per container (the daemon waits for the CPU delta); CPU %
+    - one-shot: one stream=false&one-shot=true sample; fastest, no CPU % or rates
+    """
+    ids = validate_list_param(params.get('ids'), 'ids', 'stats_snapshot')
+    filters = validate_json_param(params.get('filters'), 'filters', 'stats_snapshot')
+    mode = str(params.get('mode') or 'window').strip().lower()
+    if mode not in STATS_MODES:
+        raise ConnectorError('Invalid mode for stats_snapshot: {0}. Must be one of: {1}'.format(
+            params.get('mode'), ', '.join(STATS_MODES)))
+    window = params.get('window')
+    try:
+        window = 1.0 if window is None or window == '' else float(window)
+    except (TypeError, ValueError):
+        raise ConnectorError('window must be a number for stats_snapshot')
+    if not 0 < window <= MAX_STATS_WINDOW:
+        # Also rejects NaN; zero would divide the rates by zero, negatives would fail time.sleep
+        raise ConnectorError('window must be a positive number for stats_snapshot (at most {0} seconds)'.format(
+            MAX_STATS_WINDOW))
+    max_workers = validate_positive_integer(params.get('max_workers'), 'max_workers', 'stats_snapshot') or DEFAULT_MAX_WORKERS
+    started = time.monotonic()
+    
+    # Resolve the target set once through list_containers
+    if ids:
+        for container_id in ids:
+            validate_container_id(container_id, 'stats_snapshot')
+        names = dict((container_id, container_id) for container_id in ids)
+    else:
+        filters = filters or {'status': ['running']}
+        listed = list_containers(config, {'filters': filters})
+        ids = [c.get('Id') for c in listed]
+        names = dict((c.get('Id'), (c.get('Names') or [''])[0].lstrip('/')) for c in listed)
+    
+    # one-shot skips the daemon's 1 s CPU pre-sample (API 1.41+); older daemons get a plain stream=false
+    one_shot = mode != 'standard' and supports_api_feature(config, 'stats_one_shot')
+    
+    def sample(container_id):
+        query_params = {'stream': 0}
+        if one_shot:
+            query_params['one-shot'] = 1
+        return invoke_rest_endpoint(config, '/containers/{0}/stats'.format(container_id), 'GET',
+                                    query_params=query_params)
+    
+    first = run_concurrently(sample, ids, max_workers)
+    second = None
+    if mode == 'window':
+        time.sleep(window)
+        second = run_concurrently(sample, ids, max_workers)
+    
+    rows = []
+    errors = []
+    for index, container_id in enumerate(ids):
+        outcome = second[index] if second else first[index]
+        if outcome['error'] or first[index]['error']:
+            errors.append({'id': container_id, 'error': outcome['error'] or first[index]['error']})
+            continue
+        previous = first[index]['result'] if second else None
+        rows.append(_summarize_stats(container_id, names.get(container_id), outcome['result'], previous, window))
+    
+    return {
+        'mode': mode,
+        'sampled': len(rows),
+        'failed': len(errors),
+        'elapsed': round(time.monotonic() - started, 3),
+        'containers': rows,
+        'errors': errors
+    }
+
+
+def _stats_time(stats):
+    """Sample time of a stats object in seconds since the epoch (None when unset)"""
+    parsed = rfc3339_to_unix(stats.get('read'))
+    return parsed[0] + parsed[1] / 1e9 if parsed else None
+
+
+def _cpu_percent(current, previous_cpu):
+    """CPU % as computed by `docker stats`: container CPU delta over system CPU delta times online CPUs"""
+    cpu = current.get('cpu_stats') or {}
+    usage = (cpu.get('cpu_usage') or {}).get('total_usage')
+    system = cpu.get('system_cpu_usage')
+    previous_usage = (previous_cpu.get('cpu_usage') or {}).get('total_usage')
+    previous_system = previous_cpu.get('system_cpu_usage')
+    if None in (usage, system, previous_usage, previous_system):
+        return None
+    cpu_delta = usage - previous_usage
+    system_delta = system - previous_system
+    if cpu_delta < 0 or system_delta <= 0:
+        return None
+    online_cpus = cpu.get('online_cpus') or len((cpu.get('cpu_usage') or {}).get('percpu_usage') or []) or 1
+    return round(cpu_delta / float(system_delta) * online_cpus * 100.0, 2)
+
+
+def _io_totals(stats):
+    """Total network rx/tx and block read/write bytes of a stats sample"""
+    rx = tx = read = write = 0
+    for network in (stats.get('networks') or {}).values():
+        rx += network.get('rx_bytes', 0)
+        tx += network.get('tx_bytes', 0)
+    for entry in (stats.get('blkio_stats') or {}).get('io_service_bytes_recursive') or []:
+        op = str(entry.get('op', '')).lower()
+        if op == 'read':
+            read += entry.get('value', 0)
+        elif op == 'write':
+            write += entry.get('value', 0)
+    return rx, tx, read, write
+
+
+def _summarize_stats(container_id, name, stats, previous=None, window=None):
+    """Reduce a raw stats sample (and optionally an earlier one) to one compact row"""
+    memory = stats.get('memory_stats') or {}
+    usage = memory.get('usage')
+    limit = memory.get('limit')
+    details = memory.get('stats') or {}
+    # Exclude page cache like `docker stats` (cgroup v1: total_inactive_file, v2: inactive_file)
+    cache = details.get('inactive_file', details.get('total_inactive_file', 0))
+    if usage is not None and cache and cache < usage:
+        usage -= cache
+    rx, tx, read, write = _io_totals(stats)
+    row = {
+        'id': container_id[:12],
+        'name': name or stats.get('name', '').lstrip('/'),
+        'cpu_percent': _cpu_percent(stats, (previous or {}).get('cpu_stats') or stats.get('precpu_stats') or {}),
+        'memory_usage': usage,
+        'memory_limit': limit,
+        'memory_percent': round(usage / float(limit) * 100.0, 2) if usage is not None and limit else None,
+        'net_rx_bytes': rx,
+        'net_tx_bytes': tx,
+        'block_read_bytes': read,
+        'block_write_bytes': write,
+        'pids': (stats.get('pids_stats') or {}).get('current')
+    }
+    if previous:
+        elapsed = None
+        now, before = _stats_time(stats), _stats_time(previous)
+        if now and before and now > before:
+            elapsed = now - before
+        elapsed = elapsed or window
+        prev_rx, prev_tx, prev_read, prev_write = _io_totals(previous)
+        row['net_rx_rate'] = round(max(0, rx - prev_rx) / elapsed, 1)
+        row['net_tx_rate'] = round(max(0, tx - prev_tx) / elapsed, 1)
+        row['block_read_rate'] = round(max(0, read - prev_read) / elapsed, 1)
+        row['block_write_rate'] = round(max(0, write - prev_write) / elapsed, 1)
+    return row
 
 
 def container_export(config, params, *args, **kwargs):
     validate_required_params(params, ['id'], 'container_export')
     container_id = params.get('id')
     validate_container_id(container_id, 'container_export')
-    # Return base64-encoded tar archive for FortiSOAR-friendly handling
+    output_mode = validate_output_mode(params.get('output_mode'), 'container_export')
+    # Return the tar archive base64-encoded, or streamed to a file/attachment for large exports
     return invoke_binary_endpoint(
         config,
         '/containers/{0}/export'.format(container_id),
         'GET',
-        headers={'accept': 'application/octet-stream'}
+        headers={'accept': 'application/octet-stream'},
+        output_mode=output_mode,
+        file_name=params.get('file_name') or '{0}.tar'.format(container_id)
     )
 
 
@@ -286,6 +611,7 @@ def attach_container(config, params, *args, **kwargs):
     stderr = validate_boolean_param(params.get('stderr', True), 'stderr', 'attach_container', True)
     stream = validate_boolean_param(params.get('stream', True), 'stream', 'attach_container', True)
     logs = validate_boolean_param(params.get('logs', False), 'logs', 'attach_container', False)
+    demux = validate_demux_mode(params.get('demux'), 'attach_container')
     
     query_params = {
         'stdout': int(bool(stdout)),
@@ -296,7 +622,8 @@ def attach_container(config, params, *args, **kwargs):
     
     return invoke_rest_endpoint(config, '/containers/{0}/attach'.format(container_id), 'POST',
                                 query_params=query_params,
-                                headers={'accept': 'application/vnd.docker.raw-stream'})
+                                headers={'accept': 'application/vnd.docker.raw-stream'},
+                                response_handler=demux_response_handler(demux))
 
 
 def resize_container(config, params, *args, **kwargs):
@@ -320,48 +647,44 @@ def copy_from_container(config, params, *args, **kwargs):
     validate_container_id(container_id, 'copy_from_container')
     
     path = params.get('path')
+    output_mode = validate_output_mode(params.get('output_mode'), 'copy_from_container')
     
     # Use /archive endpoint instead of deprecated /copy (since API v1.20+).
-    # Returns a base64-encoded tar archive.
+    # Returns a base64-encoded tar archive, or a file/attachment reference.
     return invoke_binary_endpoint(
         config,
         '/containers/{0}/archive'.format(container_id),
         'GET',
         query_params={'path': path},
-        headers={'accept': 'application/x-tar'}
+        headers={'accept': 'application/x-tar'},
+        output_mode=output_mode,
+        file_name=params.get('file_name') or '{0}-archive.tar'.format(container_id)
     )
 
 
 def copy_to_container(config, params, *args, **kwargs):
     """Copy files/folders to a container.
     
-    Expects a base64-encoded tar archive in the 'archive' parameter and the
-    target container path in 'path'. This aligns with Docker's
-    PUT /containers/{id}/archive API, which expects a tar stream body.
+    The tar archive is read from 'file_path' (in the FortiSOAR temp directory),
+    from a FortiSOAR attachment in 'attachment_iri', or from base64 text in
+    'archive', and streamed to the target container path in 'path'. This
+    aligns with Docker's PUT /containers/{id}/archive API, which expects a
+    tar stream body.
     """
-    validate_required_params(params, ['id', 'path', 'archive'], 'copy_to_container')
+    validate_required_params(params, ['id', 'path'], 'copy_to_container')
     container_id = params.get('id')
     validate_container_id(container_id, 'copy_to_container')
     
     path = params.get('path')
-    archive_b64 = params.get('archive')
-    if not archive_b64:
-        raise ConnectorError('archive (base64-encoded tar) is required for copy_to_container')
-    
-    try:
-        archive_bytes = base64.b64decode(archive_b64)
-    except Exception as e:
-        raise ConnectorError('Invalid base64 archive for copy_to_container: {0}'.format(str(e)))
+    archive_body = build_upload_body(params, 'archive', 'copy_to_container')
     
     # Upload tar archive to the container at the specified path
     return invoke_binary_endpoint(
         config,
         '/containers/{0}/archive'.format(container_id),
         'PUT',
-        body=archive_bytes,
+        body=archive_body,
         query_params={'path': path},
         headers={'Content-Type': 'application/x-tar', 'accept': 'application/json'},
         expect_json_response=True
     )
-
-
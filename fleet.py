@@ -0,0 +1,167 @@
+import re
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from connectors.core.connector import get_logger, ConnectorError
+from .utils import validate_required_params, validate_json_param, validate_positive_integer, DEFAULT_MAX_WORKERS
+from .constants import LOGGER_NAME
+
+logger = get_logger(LOGGER_NAME)
+
+# Overall time budget of one host in fleet_execute unless host_timeout is given (seconds)
+DEFAULT_HOST_TIMEOUT = 120
+# Config keys a host entry given as a JSON object may override
+FLEET_HOST_KEYS = ('server_address', 'port', 'protocol', 'verify_ssl', 'cert_path', 'key_path', 'ca_cert_path',
+                   'username', 'password', 'access_token', 'api_version', 'timeout', 'name')
+HOST_URL_PATTERN = re.compile(r'^(?:(tcp|https?|unix)://)?(.*?)(?::(\d+))?$', re.IGNORECASE)
+# Config keys whose presence means TCP hosts without an explicit scheme speak TLS
+TLS_CONFIG_KEYS = ('cert_path', 'key_path', 'ca_cert_path')
+
+
+def _tcp_protocol(config):
+    """Protocol of a host given without http(s)://: HTTPS with TLS material or an HTTPS base config, else HTTP"""
+    if str(config.get('protocol', '')).lower() == 'https' or any(config.get(key) for key in TLS_CONFIG_KEYS):
+        return 'HTTPS'
+    return 'HTTP'
+
+
+def _parse_host(entry, config):
+    """Turn a host entry ('host', 'host:port', 'https://host:port', 'unix:///path' or a JSON object) into config overrides"""
+    if isinstance(entry, dict):
+        unknown = set(entry) - set(FLEET_HOST_KEYS)
+        if unknown:
+            raise ConnectorError('Unsupported keys in fleet host {0}: {1}'.format(entry, ', '.join(sorted(unknown))))
+        if not entry.get('server_address'):
+            raise ConnectorError('Missing server_address in fleet host: {0}'.format(entry))
+        overrides = dict(entry)
+        if not overrides.get('protocol'):
+            # Never inherit UNIX from the base config for a host given by address
+            overrides['protocol'] = _tcp_protocol(dict(config, **overrides))
+        label = overrides.pop('name', None) or _host_label(overrides)
+        return label, overrides
+    text = str(entry).strip()
+    if text.lower().startswith('unix://'):
+        path = text[len('unix://'):]
+        return text, {'server_address': path, 'protocol': 'UNIX'}
+    scheme, address, port = HOST_URL_PATTERN.match(text).groups()
+    if not address:
+        raise ConnectorError('Invalid fleet host: {0}'.format(entry))
+    overrides = {'server_address': address}
+    if port:
+        overrides['port'] = port
+    if scheme and scheme.lower() in ('http', 'https'):
+        overrides['protocol'] = scheme.upper()
+    else:
+        # No scheme or tcp://: never inherit UNIX from the base config
+        overrides['protocol'] = _tcp_protocol(config)
+    return text, overrides
+
+
+def _host_label(overrides):
+    if str(overrides.get('protocol', '')).lower() == 'unix':
+        return 'unix://' + overrides['server_address']
+    if overrides.get('port'):
+        return '{0}:{1}'.format(overrides['server_address'], overrides['port'])
+    return overrides['server_address']
+
+
+def fleet_execute(config, params, *args, **kwargs):
+    """Run one operation against many daemons concurrently and return the results keyed by host.
+
+    Hosts come from the `hosts` parameter or the fleet_hosts config. Each host
+    inherits the connector config (credentials, TLS, retries, rate limits) with
+    its own address, and reuses its pooled transport and circuit breaker. A
+    host that does not finish within host_timeout is reported as timed out
+    without holding up the others.
+    """
+    from .builtins import supported_operations
+
+    validate_required_params(params, ['operation'], 'fleet_execute')
+    operation = params.get('operation')
+    if operation == 'fleet_execute' or operation not in supported_operations:
+        raise ConnectorError('Unsupported operation for fleet_execute: {0}'.format(operation))
+    operation_params = validate_json_param(params.get('operation_params'), 'operation_params', 'fleet_execute') or {}
+    hosts = _parse_hosts(params.get('hosts') or config.get('fleet_hosts'), config)
+    if not hosts:
+        raise ConnectorError('Missing required parameters for fleet_execute: hosts (or Fleet Hosts in the configuration)')
+    max_workers = validate_positive_integer(params.get('max_workers'), 'max_workers', 'fleet_execute') or DEFAULT_MAX_WORKERS
+    host_timeout = validate_positive_integer(params.get('host_timeout'), 'host_timeout', 'fleet_execute') or DEFAULT_HOST_TIMEOUT
+    func = supported_operations[operation]
+
+    starts = {}
+
+    def run(label, host_config):
+        started = starts[label] = time.monotonic()
+        try:
+            return {'status': 'succeeded', 'result': func(host_config, dict(operation_params)), 'error': None,
+                    'elapsed': round(time.monotonic() - started, 3)}
+        except Exception as e:
+            return {'status': 'failed', 'result': None, 'error': str(e),
+                    'elapsed': round(time.monotonic() - started, 3)}
+
+    started = time.monotonic()
+    workers = max(1, min(max_workers, len(hosts)))
+    # Backstop for hosts still queued behind hosts that were abandoned but keep their worker busy
+    deadline = started + host_timeout * -(-len(hosts) // workers)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    futures = {}
+    try:
+        for label, overrides in hosts:
+            host_config = dict(config, **overrides)
+            # Individual requests must not outlive the host's time budget
+            host_config['timeout'] = min(float(host_config.get('timeout') or 60), host_timeout)
+            futures[label] = executor.submit(contextvars.copy_context().run, run, label, host_config)
+        # Each host gets host_timeout from the moment its call starts
+        pending = set(futures)
+        while pending:
+            now = time.monotonic()
+            pending = {label for label in pending if not futures[label].done()
+                       and not (label in starts and now - starts[label] >= host_timeout)}
+            if not pending or now >= deadline:
+                break
+            host_deadlines = [starts[label] + host_timeout for label in pending if label in starts]
+            wait([futures[label] for label in pending], return_when=FIRST_COMPLETED,
+                 timeout=max(0.01, min(host_deadlines + [deadline]) - now))
+    finally:
+        # Hosts that are still running are abandoned, not waited for
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    results = {}
+    for label, future in futures.items():
+        if future.done() and not future.cancelled():
+            results[label] = future.result()
+        else:
+            results[label] = {'status': 'timeout', 'result': None, 'elapsed': None,
+                              'error': 'No result within {0} seconds'.format(host_timeout)}
+    counts = {status: sum(1 for r in results.values() if r['status'] == status)
+              for status in ('succeeded', 'failed', 'timeout')}
+    return {
+        'operation': operation,
+        'total': len(results),
+        'succeeded': counts['succeeded'],
+        'failed': counts['failed'],
+        'timed_out': counts['timeout'],
+        'elapsed': round(time.monotonic() - started, 3),
+        'hosts': results
+    }
+
+
+def _parse_hosts(value, config):
+    """Parse hosts given as a list, a JSON array or a comma/newline separated string, without duplicates"""
+    if isinstance(value, str) and not value.strip().startswith('['):
+        value = [line for line in re.split(r'[,\n]', value)]
+    elif isinstance(value, str):
+        value = validate_json_param(value, 'hosts', 'fleet_execute')
+    if isinstance(value, dict):
+        value = [value]
+    hosts = []
+    seen = set()
+    for entry in value or []:
+        if isinstance(entry, str) and not entry.strip():
+            continue
+        label, overrides = _parse_host(entry, config)
+        if label in seen:
+            continue
+        seen.add(label)
+        hosts.append((label, overrides))
+    return hosts
@@ -1,4 +1,4 @@
-from .utils import invoke_rest_endpoint
+from .utils import invoke_rest_endpoint, get_circuit_breaker_state
 from connectors.core.connector import get_logger, ConnectorError
 from .constants import LOGGER_NAME
 
@@ -16,6 +16,12 @@ def health_check(config=None, *args, **kwargs):
         if not server_address:
             return 'Connector is Not Available - Server address not configured'
         
+        # Report an open circuit breaker instead of waiting on a daemon known to be down
+        breaker = get_circuit_breaker_state(config)
+        if breaker.get('state') == 'open':
+            return 'Connector is Not Available - Circuit breaker open for {0} after {1} consecutive failures, retry in {2} seconds'.format(
+                breaker.get('daemon'), breaker.get('consecutive_failures'), breaker.get('retry_in_seconds'))
+        
         # Test actual connectivity using the ping endpoint (version-less /_ping)
         try:
             result = invoke_rest_endpoint(config, '/_ping', 'GET', timeout=10, use_api_version=False)
@@ -1,10 +1,22 @@
 from connectors.core.connector import get_logger, ConnectorError
-from .utils import invoke_rest_endpoint, invoke_binary_endpoint, validate_required_params, validate_image_name, validate_boolean_param, validate_json_param, validate_positive_integer
-import base64
+from .utils import invoke_rest_endpoint, invoke_binary_endpoint, validate_required_params, validate_image_name, validate_boolean_param, validate_json_param, validate_positive_integer, validate_output_mode, build_upload_body, resolve_tmp_path, iter_json_lines, validate_list_param, supports_api_feature, json_array_handler
+from .build_context import BuildContext
+from .projection import shape_result, item_shaper
+from .pagination import paginate, is_paginated
+from .jobs import start_job, get_job
 from .constants import LOGGER_NAME
+import re
+import time
+from collections import deque, OrderedDict
 
 logger = get_logger(LOGGER_NAME)
 
+# Number of build output lines returned by build_image
+BUILD_LOG_TAIL = 50
+
+# Layer statuses that end a layer's progress in pull/push streams
+LAYER_DONE_STATUSES = ('pull complete', 'already exists', 'pushed', 'layer already exists', 'mounted from')
+
 
 def list_images(config, params, *args, **kwargs):
     """List Docker images"""
@@ -18,16 +30,114 @@ def list_images(config, params, *args, **kwargs):
         query_params['digests'] = int(bool(digests))
     if filters:
         query_params['filters'] = filters
+    if is_paginated(params):
+        return paginate(config, params, 'list_images', lambda: invoke_rest_endpoint(
+            config, '/images/json', 'GET', query_params=query_params if query_params else None))
+    shaper = item_shaper(params, 'list_images')
+    if shaper is not None:
+        # Filter and project each image while the array is decoded
+        return invoke_rest_endpoint(config, '/images/json', 'GET', query_params=query_params if query_params else None,
+                                    response_handler=json_array_handler(shaper))
     return invoke_rest_endpoint(config, '/images/json', 'GET', query_params=query_params if query_params else None)
 
 
 def pull_image(config, params, *args, **kwargs):
+    """Pull an image, parsing the progress stream into per-layer state, digest and totals.
+    
+    With wait=false the pull runs in the background and a job ID is returned
+    for get_image_job.
+    """
     validate_required_params(params, ['fromImage'], 'pull_image')
     from_image = params.get('fromImage')
     validate_image_name(from_image, 'pull_image')
-    # Docker pulls via POST /images/create?fromImage=xxx
-    return invoke_rest_endpoint(config, '/images/create', 'POST', query_params={'fromImage': from_image},
-                                headers={'accept': 'application/json'}, use_registry_auth=True)
+    wait = validate_boolean_param(params.get('wait', True), 'wait', 'pull_image', True)
+    query_params = {'fromImage': from_image}
+    if params.get('tag'):
+        query_params['tag'] = params.get('tag')
+    if params.get('platform'):
+        if not supports_api_feature(config, 'image_pull_platform'):
+            raise ConnectorError('The Docker daemon does not support the platform parameter for pull_image (API 1.32 or later required)')
+        query_params['platform'] = params.get('platform')
+    
+    def run(job=None):
+        # Docker pulls via POST /images/create?fromImage=xxx
+        return _run_transfer(config, '/images/create', query_params, 'pull_image', from_image, job)
+    return _run_or_start(run, wait, 'pull', from_image)
+
+
+def _run_or_start(run, wait, kind, target):
+    if wait:
+        return run()
+    job = start_job(kind, target, run)
+    return job.snapshot()
+
+
+def _run_transfer(config, endpoint, query_params, operation_name, target, job=None):
+    """POST a pull/push request and raise when the progress stream reports an error"""
+    started = time.monotonic()
+    on_progress = job.update if job is not None else None
+    result = invoke_rest_endpoint(config, endpoint, 'POST', query_params=query_params,
+                                  headers={'accept': 'application/json'}, use_registry_auth=True,
+                                  response_handler=lambda response: _parse_transfer_progress(response, on_progress))
+    result['elapsed'] = round(time.monotonic() - started, 3)
+    if result['error']:
+        raise ConnectorError('{0} of {1} failed: {2}'.format(operation_name, target, result['error']))
+    return result
+
+
+def _parse_transfer_progress(response, on_progress=None):
+    """Consume an NDJSON pull/push stream, keeping only per-layer final state, the digest, errors and totals"""
+    layers = OrderedDict()
+    digest = None
+    status = None
+    error = None
+    for message in iter_json_lines(response):
+        if message.get('error') or message.get('errorDetail'):
+            error = message.get('error') or message['errorDetail'].get('message')
+            continue
+        aux = message.get('aux')
+        if isinstance(aux, dict) and aux.get('Digest'):
+            digest = aux['Digest']
+        text = message.get('status') or ''
+        layer_id = message.get('id')
+        if layer_id and text and not text.startswith(('Pulling from', 'The push refers to')):
+            layer = layers.setdefault(layer_id, {'status': None, 'total': 0, 'current': 0})
+            detail = message.get('progressDetail') or {}
+            if detail.get('total'):
+                layer['total'] = max(layer['total'], detail['total'])
+            if detail.get('current'):
+                layer['current'] = max(layer['current'], detail['current'])
+            layer['status'] = text
+            if text.lower().startswith(LAYER_DONE_STATUSES) and layer['total']:
+                layer['current'] = layer['total']
+            if on_progress is not None:
+                on_progress(_transfer_summary(layers, digest, text, None))
+            continue
+        match = re.search(r'(?:^|\s)[Dd]igest: (sha256:[0-9a-f]{64})', text)
+        if match:
+            digest = match.group(1)
+        if text:
+            status = text
+    return _transfer_summary(layers, digest, status, error)
+
+
+def _transfer_summary(layers, digest, status, error):
+    completed = sum(1 for layer in layers.values() if (layer['status'] or '').lower().startswith(LAYER_DONE_STATUSES))
+    return {
+        'status': status,
+        'digest': digest,
+        'error': error,
+        'layers': [dict(id=layer_id, **layer) for layer_id, layer in layers.items()],
+        'layers_completed': completed,
+        'total_bytes': sum(layer['total'] for layer in layers.values()),
+        'transferred_bytes': sum(layer['current'] for layer in layers.values())
+    }
+
+
+def get_image_job(config, params, *args, **kwargs):
+    """Poll a pull_image or push_image started with wait=false"""
+    validate_required_params(params, ['job_id'], 'get_image_job')
+    return get_job(params.get('job_id'))
 
 
 def inspect_image(config, params, *args, **kwargs):
@@ -40,7 +150,8 @@ def inspect_image(config, params, *args, **kwargs):
         image_id = params.get('name')
     validate_required_params({'id': image_id}, ['id'], 'inspect_image')
     validate_image_name(image_id, 'inspect_image')
-    return invoke_rest_endpoint(config, '/images/{0}/json'.format(image_id), 'GET')
+    result = invoke_rest_endpoint(config, '/images/{0}/json'.format(image_id), 'GET')
+    return shape_result(result, params, 'inspect_image')
 
 
 def remove_image(config, params, *args, **kwargs):
@@ -81,14 +192,20 @@ def build_image(config, params, *args, **kwargs):
     """
     Build image from Dockerfile.
     
-    NOTE: This is a simplified implementation.
-    Full implementation requires tar stream upload of build context.
-    
-    For complete functionality, use Docker CLI or docker-py library.
+    The build context is either a `remote` URL (Git repository or tarball)
+    fetched by the daemon, or a local `context_path` directory in the
+    FortiSOAR temp directory. A local context is archived on the fly
+    (honouring .dockerignore, optionally gzip-compressed) and streamed to
+    POST /build; unchanged contexts are served from the build context cache
+    instead of being re-archived. Build progress is parsed incrementally and
+    only the image ID, the last log lines and any error are returned.
     """
     remote = params.get('remote')  # Build context URL
+    context_path = params.get('context_path')
     dockerfile = params.get('dockerfile', 'Dockerfile')
     tag = params.get('t') or params.get('tag')
+    if not remote and not context_path:
+        raise ConnectorError('Missing required parameters for build_image: remote or context_path')
     
     # Build parameters
     nocache = validate_boolean_param(params.get('nocache', False), 'nocache', 'build_image', False)
@@ -96,9 +213,11 @@ def build_image(config, params, *args, **kwargs):
     rm = validate_boolean_param(params.get('rm', True), 'rm', 'build_image', True)
     forcerm = validate_boolean_param(params.get('forcerm', False), 'forcerm', 'build_image', False)
     q = validate_boolean_param(params.get('q', False), 'q', 'build_image', False)
+    gzip = validate_boolean_param(params.get('gzip', False), 'gzip', 'build_image', False)
+    use_cache = validate_boolean_param(params.get('context_cache', True), 'context_cache', 'build_image', True)
     
     query_params = {}
-    if remote:
+    if remote and not context_path:
         query_params['remote'] = remote
     if dockerfile:
         query_params['dockerfile'] = dockerfile
@@ -115,17 +234,62 @@ def build_image(config, params, *args, **kwargs):
     if q:
         query_params['q'] = int(bool(q))
     
-    # Additional build parameters (can be added as JSON in body)
+    # Additional build parameters (JSON-encoded query parameters in the Docker API)
     buildargs = validate_json_param(params.get('buildargs'), 'buildargs', 'build_image')
     labels = validate_json_param(params.get('labels'), 'labels', 'build_image')
     networkmode = params.get('networkmode')
     platform = params.get('platform')
+    if buildargs:
+        query_params['buildargs'] = buildargs
+    if labels:
+        query_params['labels'] = labels
+    if networkmode:
+        query_params['networkmode'] = networkmode
+    if platform:
+        query_params['platform'] = platform
+    
+    context = None
+    if context_path:
+        context_dir = resolve_tmp_path(context_path, 'build_image', 'context_path', directory=True)
+        context = BuildContext(context_dir, dockerfile=dockerfile, gzip=gzip, use_cache=use_cache)
     
-    # Note: Real implementation would require tar stream upload
-    # This simplified version only works with remote URLs
-    return invoke_rest_endpoint(config, '/build', 'POST', 
-                                query_params=query_params if query_params else None,
-                                data={'buildargs': buildargs, 'labels': labels, 'networkmode': networkmode, 'platform': platform} if (buildargs or labels or networkmode or platform) else None)
+    result = invoke_binary_endpoint(config, '/build', 'POST',
+                                    body=context,
+                                    headers={'Content-Type': 'application/x-tar', 'accept': 'application/json'},
+                                    query_params=query_params if query_params else None,
+                                    response_handler=_parse_build_progress)
+    if context is not None:
+        result['context'] = context.summary()
+    if result.get('error'):
+        raise ConnectorError('Image build failed: {0}'.format(result['error']))
+    return result
+
+
+def _parse_build_progress(response):
+    """Consume the NDJSON build output, keeping only the image ID, warnings, errors and a log tail"""
+    log_tail = deque(maxlen=BUILD_LOG_TAIL)
+    image_id = None
+    error = None
+    warnings = []
+    for message in iter_json_lines(response):
+        if message.get('error') or message.get('errorDetail'):
+            error = message.get('error') or message['errorDetail'].get('message')
+        aux = message.get('aux')
+        if isinstance(aux, dict) and aux.get('ID'):
+            image_id = aux['ID']
+        stream = message.get('stream')
+        if stream:
+            for line in stream.splitlines():
+                line = line.rstrip()
+                if not line:
+                    continue
+                log_tail.append(line)
+                match = re.match(r'^(?:Successfully built ([0-9a-f]+)|(sha256:[0-9a-f]{64}))$', line)
+                if match and not image_id:
+                    image_id = match.group(1) or match.group(2)
+        if message.get('warning'):
+            warnings.append(message['warning'])
+    return {'image_id': image_id, 'error': error, 'warnings': warnings, 'log': list(log_tail)}
 
 
 def search_images(config, params, *args, **kwargs):
@@ -135,63 +299,78 @@ def search_images(config, params, *args, **kwargs):
     query_params = {'term': term}
     if limit:
         query_params['limit'] = limit
-    return invoke_rest_endpoint(config, '/images/search', 'GET', query_params=query_params)
+    shaper = item_shaper(params, 'search_images')
+    return invoke_rest_endpoint(config, '/images/search', 'GET', query_params=query_params,
+                                response_handler=json_array_handler(shaper) if shaper else None)
 
 
 def image_history(config, params, *args, **kwargs):
     validate_required_params(params, ['id'], 'image_history')
     image_id = params.get('id')
-    return invoke_rest_endpoint(config, '/images/{0}/history'.format(image_id), 'GET')
+    shaper = item_shaper(params, 'image_history')
+    return invoke_rest_endpoint(config, '/images/{0}/history'.format(image_id), 'GET',
+                                response_handler=json_array_handler(shaper) if shaper else None)
 
 
 def push_image(config, params, *args, **kwargs):
-    """Push an image to a registry"""
+    """Push an image to a registry, parsing the progress stream like pull_image"""
     validate_required_params(params, ['name'], 'push_image')
     image_name = params.get('name')
     validate_image_name(image_name, 'push_image')
+    wait = validate_boolean_param(params.get('wait', True), 'wait', 'push_image', True)
+    query_params = {'tag': params.get('tag')} if params.get('tag') else None
     
-    # Docker push via POST /images/{name}/push
-    return invoke_rest_endpoint(config, '/images/{0}/push'.format(image_name), 'POST',
-                                headers={'accept': 'application/json'}, use_registry_auth=True)
+    def run(job=None):
+        # Docker push via POST /images/{name}/push
+        return _run_transfer(config, '/images/{0}/push'.format(image_name), query_params, 'push_image',
+                             image_name, job)
+    return _run_or_start(run, wait, 'push', image_name)
 
 
 def load_image(config, params, *args, **kwargs):
     """Load an image from a tar archive.
     
-    Expects a base64-encoded tar archive in the 'image_archive' parameter.
-    This aligns with Docker's POST /images/load API, which expects a tar
-    stream body and returns JSON.
+    The archive is read from 'file_path' (in the FortiSOAR temp directory),
+    from a FortiSOAR attachment in 'attachment_iri', or from base64 text in
+    'image_archive', and streamed in chunks to Docker's POST /images/load
+    API, which expects a tar stream body and returns JSON.
     """
-    validate_required_params(params, ['image_archive'], 'load_image')
-    archive_b64 = params.get('image_archive')
-    if not archive_b64:
-        raise ConnectorError('image_archive (base64-encoded tar) is required for load_image')
-    
-    try:
-        archive_bytes = base64.b64decode(archive_b64)
-    except Exception as e:
-        raise ConnectorError('Invalid base64 archive for load_image: {0}'.format(str(e)))
+    archive_body = build_upload_body(params, 'image_archive', 'load_image')
     
     return invoke_binary_endpoint(
         config,
         '/images/load',
         'POST',
-        body=archive_bytes,
+        body=archive_body,
         headers={'Content-Type': 'application/x-tar', 'accept': 'application/json'},
         expect_json_response=True
     )
 
 
 def save_image(config, params, *args, **kwargs):
-    """Save an image to a tar archive"""
+    """Save one image, or several as a single archive (comma-separated names), to a tar archive"""
     validate_required_params(params, ['name'], 'save_image')
-    image_name = params.get('name')
-    validate_image_name(image_name, 'save_image')
+    names = validate_list_param(params.get('name'), 'name', 'save_image')
+    for image_name in names:
+        validate_image_name(image_name, 'save_image')
+    output_mode = validate_output_mode(params.get('output_mode'), 'save_image')
+    file_name = params.get('file_name') or '{0}.tar'.format(names[0].replace('/', '_').replace(':', '_'))
+    
+    if len(names) > 1:
+        # One archive with shared layers stored once instead of one download per image
+        if not supports_api_feature(config, 'images_get_multiple'):
+            raise ConnectorError('The Docker daemon does not support saving several images at once (API 1.25 or later required)')
+        endpoint, query_params = '/images/get', {'names': tuple(names)}
+    else:
+        endpoint, query_params = '/images/{0}/get'.format(names[0]), None
     
-    # Return base64-encoded tar archive for the image
+    # Return the image tar archive base64-encoded, or streamed to a file/attachment
     return invoke_binary_endpoint(
         config,
-        '/images/{0}/get'.format(image_name),
+        endpoint,
         'GET',
-        headers={'accept': 'application/octet-stream'}
+        headers={'accept': 'application/octet-stream'},
+        query_params=query_params,
+        output_mode=output_mode,
+        file_name=file_name
     )
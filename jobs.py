@@ -0,0 +1,113 @@
+import os
+import json
+import time
+import uuid
+import threading
+import contextvars
+from collections import OrderedDict
+from connectors.core.connector import get_logger, ConnectorError
+from .utils import get_tmp_dir, write_atomically
+from .constants import LOGGER_NAME
+
+logger = get_logger(LOGGER_NAME)
+
+# Background jobs started by "fire and poll" operations (thread-safe, bounded)
+_jobs_lock = threading.Lock()
+_jobs = OrderedDict()
+
+JOB_CACHE_SIZE = 200
+JOB_DIR_NAME = 'docker-connector-jobs'
+# Minimum interval between progress snapshots written for other worker processes (seconds)
+JOB_PERSIST_INTERVAL = 1.0
+
+
+def _job_path(job_id):
+    return os.path.join(get_tmp_dir(), JOB_DIR_NAME, '{0}.json'.format(job_id))
+
+
+class Job(object):
+    """State of one background operation, shared with pollers in memory and through a file in the temp directory"""
+
+    def __init__(self, kind, target):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.target = target
+        self.status = 'running'
+        self.started = time.time()
+        self.finished = None
+        self.progress = None
+        self.result = None
+        self.error = None
+        self._persisted_at = 0.0
+
+    def snapshot(self):
+        now = self.finished or time.time()
+        return {'job_id': self.id, 'kind': self.kind, 'target': self.target, 'status': self.status,
+                'elapsed': round(now - self.started, 3), 'progress': self.progress,
+                'result': self.result, 'error': self.error}
+
+    def update(self, progress):
+        """Record intermediate progress; persisted at most once per JOB_PERSIST_INTERVAL"""
+        self.progress = progress
+        if time.monotonic() - self._persisted_at >= JOB_PERSIST_INTERVAL:
+            self.persist()
+
+    def persist(self):
+        self._persisted_at = time.monotonic()
+        snapshot = self.snapshot()
+        try:
+            write_atomically(_job_path(self.id), lambda f: json.dump(snapshot, f, default=str))
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning('Error persisting job {0}: {1}'.format(self.id, str(e)))
+
+
+def start_job(kind, target, func):
+    """Run func(job) on a daemon thread and return the job; its return value becomes the job result.
+
+    At most JOB_CACHE_SIZE jobs are kept; ConnectorError is raised when all of them are still running.
+    """
+    job = Job(kind, target)
+    with _jobs_lock:
+        # Make room by forgetting the oldest finished jobs; running jobs are never forgotten
+        excess = len(_jobs) + 1 - JOB_CACHE_SIZE
+        evicted = [job_id for job_id, old in _jobs.items() if old.status != 'running'][:max(0, excess)]
+        if len(evicted) < excess:
+            raise ConnectorError('Too many background jobs running (at most {0}); wait for one to finish'.format(
+                JOB_CACHE_SIZE))
+        for old_id in evicted:
+            del _jobs[old_id]
+        _jobs[job.id] = job
+    for old_id in evicted:
+        try:
+            os.remove(_job_path(old_id))
+        except OSError:
+            pass
+
+    def run():
+        try:
+            job.result = func(job)
+            job.status = 'succeeded'
+        except Exception as e:
+            logger.error('Background {0} of {1} failed: {2}'.format(kind, target, str(e)))
+            job.error = str(e)
+            job.status = 'failed'
+        job.finished = time.time()
+        job.persist()
+
+    job.persist()
+    # The job's requests keep the metric labels of the operation that started it
+    threading.Thread(target=contextvars.copy_context().run, args=(run,), name='docker-{0}-{1}'.format(kind, job.id[:8]), daemon=True).start()
+    return job
+
+
+def get_job(job_id):
+    """Return the latest snapshot of a job started in this or another worker process"""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    if job is not None:
+        return job.snapshot()
+    try:
+        with open(_job_path(os.path.basename(str(job_id))), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        raise ConnectorError('Unknown job ID: {0}'.format(job_id))
@@ -0,0 +1,236 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Operation that issues the current Docker API requests; set by DockerConnector.execute
+_current_operation = contextvars.ContextVar('docker_connector_operation', default='unknown')
+
+# Per-thread metric shards: each thread writes only its own shard, so recording takes no lock
+_shards_lock = threading.Lock()
+_shards = []
+_local = threading.local()
+
+METRIC_PREFIX = 'docker_connector_'
+# Upper bounds of the latency histogram buckets (seconds); +Inf is implicit
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# name: (type, label names, help)
+METRICS = {
+    'operation_duration_seconds': ('histogram', ('operation', 'status'),
+                                   'Duration of connector operations'),
+    'request_duration_seconds': ('histogram', ('operation', 'daemon'),
+                                 'Duration of Docker API request attempts until the response headers arrive'),
+    'requests_total': ('counter', ('operation', 'daemon', 'method', 'code'),
+                       'Docker API request attempts by status code (timeout/connection_error/error without a response)'),
+    'retries_total': ('counter', ('operation', 'daemon', 'reason'),
+                      'Docker API request retries'),
+    'rate_limit_wait_seconds_total': ('counter', ('operation', 'daemon'),
+                                      'Time spent waiting for the client-side rate limiter'),
+    'rate_limited_requests_total': ('counter', ('operation', 'daemon'),
+                                    'Requests delayed by the client-side rate limiter'),
+    'bytes_sent_total': ('counter', ('operation', 'daemon'),
+                         'Request body bytes sent to the Docker API'),
+    'bytes_received_total': ('counter', ('operation', 'daemon'),
+                             'Response body bytes received from the Docker API')
+}
+
+
+class _Shard(object):
+    """Metrics recorded by one thread; only the owning thread mutates it"""
+
+    def __init__(self, thread=None):
+        self.thread = thread
+        self.counters = {}
+        # (name, labels) -> [count per bucket (+Inf last), sum]
+        self.histograms = {}
+
+    def add(self, name, labels, value):
+        key = (name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        key = (name, labels)
+        series = self.histograms.get(key)
+        if series is None:
+            series = self.histograms[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+        series[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        series[-1] += value
+
+    def merge(self, counters, histograms):
+        for key, value in counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+        for key, values in histograms.items():
+            series = self.histograms.get(key)
+            if series is None:
+                self.histograms[key] = list(values)
+            else:
+                for i, value in enumerate(values):
+                    series[i] += value
+
+
+# Totals of threads that have exited
+_retired = _Shard()
+
+
+def _retire_dead_shards():
+    """Fold the shards of finished threads into _retired (caller holds _shards_lock)"""
+    alive = []
+    for shard in _shards:
+        if shard.thread.is_alive():
+            alive.append(shard)
+        else:
+            _retired.merge(shard.counters, shard.histograms)
+    _shards[:] = alive
+
+
+def _shard():
+    shard = getattr(_local, 'shard', None)
+    if shard is None:
+        shard = _local.shard = _Shard(threading.current_thread())
+        with _shards_lock:
+            # Short-lived pool threads would otherwise pile up shards
+            _retire_dead_shards()
+            _shards.append(shard)
+    return shard
+
+
+def current_operation():
+    return _current_operation.get()
+
+
+@contextmanager
+def operation_scope(operation):
+    """Attribute the Docker API requests made inside the block to `operation` and time it"""
+    token = _current_operation.set(operation)
+    started = time.monotonic()
+    status = 'error'
+    try:
+        yield
+        status = 'ok'
+    finally:
+        _current_operation.reset(token)
+        _shard().observe('operation_duration_seconds', (operation, status), time.monotonic() - started)
+
+
+def record_request(daemon, method, code, elapsed):
+    shard = _shard()
+    operation = _current_operation.get()
+    shard.add('requests_total', (operation, daemon, method, str(code)), 1)
+    shard.observe('request_duration_seconds', (operation, daemon), elapsed)
+
+
+def record_retry(daemon, reason):
+    _shard().add('retries_total', (_current_operation.get(), daemon, reason), 1)
+
+
+def record_rate_limit_wait(daemon, seconds):
+    shard = _shard()
+    labels = (_current_operation.get(), daemon)
+    shard.add('rate_limited_requests_total', labels, 1)
+    shard.add('rate_limit_wait_seconds_total', labels, seconds)
+
+
+def record_bytes(daemon, sent=0, received=0):
+    shard = _shard()
+    labels = (_current_operation.get(), daemon)
+    if sent:
+        shard.add('bytes_sent_total', labels, sent)
+    if received:
+        shard.add('bytes_received_total', labels, received)
+
+
+def _collect():
+    """Merge all shards into one (counters, histograms) pair"""
+    total = _Shard()
+    with _shards_lock:
+        _retire_dead_shards()
+        shards = [_retired] + list(_shards)
+    for shard in shards:
+        # dict() and list() copies are atomic under the GIL; live threads keep writing to the originals
+        histograms = {key: list(values) for key, values in dict(shard.histograms).items()}
+        total.merge(dict(shard.counters), histograms)
+    return total.counters, total.histograms
+
+
+def _bucket_quantile(buckets, count, q):
+    """Estimate a quantile from histogram buckets by linear interpolation (like histogram_quantile)"""
+    if not count:
+        return None
+    rank = q * count
+    cumulative = 0
+    for i, bucket_count in enumerate(buckets):
+        if cumulative + bucket_count >= rank and bucket_count:
+            if i == len(LATENCY_BUCKETS):
+                return LATENCY_BUCKETS[-1]
+            lower = LATENCY_BUCKETS[i - 1] if i else 0.0
+            return round(lower + (LATENCY_BUCKETS[i] - lower) * (rank - cumulative) / bucket_count, 6)
+        cumulative += bucket_count
+    return LATENCY_BUCKETS[-1]
+
+
+def get_metrics():
+    """Return all recorded series as JSON-friendly dicts; histograms include p50/p99 estimates"""
+    counters, histograms = _collect()
+    series = []
+    for (name, labels), value in sorted(counters.items()):
+        series.append({'name': METRIC_PREFIX + name, 'type': 'counter',
+                       'labels': dict(zip(METRICS[name][1], labels)), 'value': round(value, 6)})
+    for (name, labels), values in sorted(histograms.items()):
+        buckets, total = values[:-1], values[-1]
+        count = sum(buckets)
+        series.append({'name': METRIC_PREFIX + name, 'type': 'histogram',
+                       'labels': dict(zip(METRICS[name][1], labels)),
+                       'count': count, 'sum': round(total, 6),
+                       'p50': _bucket_quantile(buckets, count, 0.5),
+                       'p99': _bucket_quantile(buckets, count, 0.99)})
+    return series
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + (extra or [])
+    return '{' + ','.join('{0}="{1}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+                          for k, v in pairs) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def prometheus_text():
+    """Render all recorded series in the Prometheus text exposition format (version 0.0.4)"""
+    counters, histograms = _collect()
+    lines = []
+    for name, (kind, label_names, help_text) in sorted(METRICS.items()):
+        full_name = METRIC_PREFIX + name
+        lines.append('# HELP {0} {1}'.format(full_name, help_text))
+        lines.append('# TYPE {0} {1}'.format(full_name, kind))
+        if kind == 'counter':
+            for (series_name, labels), value in sorted(counters.items()):
+                if series_name == name:
+                    lines.append('{0}{1} {2}'.format(full_name, _format_labels(label_names, labels),
+                                                     _format_value(value)))
+            continue
+        for (series_name, labels), values in sorted(histograms.items()):
+            if series_name != name:
+                continue
+            cumulative = 0
+            for bound, bucket_count in zip(LATENCY_BUCKETS + ('+Inf',), values[:-1]):
+                cumulative += bucket_count
+                lines.append('{0}_bucket{1} {2}'.format(
+                    full_name, _format_labels(label_names, labels, [('le', bound)]), cumulative))
+            label_text = _format_labels(label_names, labels)
+            lines.append('{0}_sum{1} {2}'.format(full_name, label_text, _format_value(values[-1])))
+            lines.append('{0}_count{1} {2}'.format(full_name, label_text, cumulative))
+    return '\n'.join(lines) + '\n'
+
+
+def reset_metrics():
+    """Drop all recorded series (increments racing with the reset may be lost)"""
+    with _shards_lock:
+        for shard in [_retired] + _shards:
+            shard.counters = {}
+            shard.histograms = {}
@@ -1,5 +1,6 @@
 from connectors.core.connector import get_logger, ConnectorError
-from .utils import invoke_rest_endpoint, validate_required_params, validate_network_name, validate_json_param, validate_boolean_param
+from .utils import invoke_rest_endpoint, validate_required_params, validate_network_name, validate_json_param, validate_boolean_param, json_array_handler
+from .projection import shape_result, item_shaper
 from .constants import LOGGER_NAME
 
 logger = get_logger(LOGGER_NAME)
@@ -10,14 +11,17 @@ def list_networks(config, params, *args, **kwargs):
     # We accept an optional JSON string or object for filters and pass it through.
     filters = validate_json_param(params.get('filters'), 'filters', 'list_networks') if params else None
     query_params = {'filters': filters} if filters else None
-    return invoke_rest_endpoint(config, '/networks', 'GET', query_params=query_params)
+    shaper = item_shaper(params or {}, 'list_networks')
+    return invoke_rest_endpoint(config, '/networks', 'GET', query_params=query_params,
+                                response_handler=json_array_handler(shaper) if shaper else None)
 
 
 def inspect_network(config, params, *args, **kwargs):
     validate_required_params(params, ['id'], 'inspect_network')
     net_id = params.get('id')
     validate_network_name(net_id, 'inspect_network')
-    return invoke_rest_endpoint(config, '/networks/{0}'.format(net_id), 'GET')
+    result = invoke_rest_endpoint(config, '/networks/{0}'.format(net_id), 'GET')
+    return shape_result(result, params, 'inspect_network')
 
 
 def create_network(config, params, *args, **kwargs):
@@ -0,0 +1,179 @@
+import os
+import json
+import time
+import uuid
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
+from connectors.core.connector import get_logger, ConnectorError
+from .utils import get_tmp_dir, validate_positive_integer, daemon_key, config_fingerprint, write_atomically
+from .projection import compile_fields, compile_where
+from .constants import LOGGER_NAME
+
+logger = get_logger(LOGGER_NAME)
+
+# Recent list snapshots served page by page (thread-safe, bounded); files let other worker processes serve them too
+_snapshot_lock = threading.Lock()
+_snapshots = OrderedDict()
+
+SNAPSHOT_CACHE_SIZE = 16
+SNAPSHOT_DIR_NAME = 'docker-connector-pages'
+DEFAULT_SNAPSHOT_TTL = 300
+MAX_PAGE_SIZE = 10000
+# Parameters that only select a page of a snapshot; all others shape the snapshot itself
+PAGE_PARAMS = ('cursor', 'page_size', 'fields')
+
+
+def _snapshot_path(snapshot_id):
+    return os.path.join(get_tmp_dir(), SNAPSHOT_DIR_NAME, '{0}.json'.format(snapshot_id))
+
+
+def _encode_cursor(snapshot_id, offset):
+    return base64.urlsafe_b64encode('{0}:{1}'.format(snapshot_id, offset).encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor, operation_name):
+    try:
+        text = base64.urlsafe_b64decode(str(cursor) + '=' * (-len(str(cursor)) % 4)).decode()
+        snapshot_id, offset = text.split(':')
+        uuid.UUID(hex=snapshot_id)
+        offset = int(offset)
+        if offset < 0:
+            raise ValueError(offset)
+        return snapshot_id, offset
+    except (ValueError, UnicodeDecodeError):
+        raise ConnectorError('Invalid cursor for {0}: {1}'.format(operation_name, cursor))
+
+
+def _sweep_snapshot_files(directory, now):
+    """Remove snapshot files whose TTL has passed (written by any worker process)"""
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(directory, name)
+        try:
+            with open(path, 'r') as f:
+                expires = json.loads(f.readline()).get('expires', 0)
+            if expires < now:
+                os.remove(path)
+        except (OSError, ValueError, AttributeError):
+            continue
+
+
+def _store_snapshot(snapshot):
+    with _snapshot_lock:
+        _snapshots[snapshot['id']] = snapshot
+        while len(_snapshots) > SNAPSHOT_CACHE_SIZE:
+            _snapshots.popitem(last=False)
+    path = _snapshot_path(snapshot['id'])
+    # Header line first, so sweeps read the expiry without loading the items
+    header = {key: value for key, value in snapshot.items() if key != 'items'}
+
+    def write(f):
+        f.write(json.dumps(header) + '\n')
+        json.dump(snapshot['items'], f)
+
+    try:
+        _sweep_snapshot_files(os.path.dirname(path), time.time())
+        write_atomically(path, write)
+    except (OSError, TypeError, ValueError) as e:
+        logger.warning('Error persisting list snapshot {0}: {1}'.format(snapshot['id'], str(e)))
+
+
+def _load_snapshot(snapshot_id):
+    with _snapshot_lock:
+        snapshot = _snapshots.get(snapshot_id)
+    if snapshot is not None:
+        return snapshot
+    try:
+        with open(_snapshot_path(snapshot_id), 'r') as f:
+            snapshot = json.loads(f.readline())
+            snapshot['items'] = json.load(f)
+    except (OSError, ValueError):
+        return None
+    with _snapshot_lock:
+        _snapshots[snapshot_id] = snapshot
+        while len(_snapshots) > SNAPSHOT_CACHE_SIZE:
+            _snapshots.popitem(last=False)
+    return snapshot
+
+
+def _config_binding(config):
+    """Fingerprint of the settings that shape a snapshot: transport, credentials and API version"""
+    return hashlib.sha256('{0}:{1}'.format(config_fingerprint(config), config.get('api_version') or '').encode()).hexdigest()
+
+
+def _query_binding(params):
+    """Canonical form of the listing parameters (filters, all, where, ...) given to this call"""
+    query = {key: value for key, value in params.items() if key not in PAGE_PARAMS and value not in (None, '')}
+    return json.dumps(query, sort_keys=True, default=str)
+
+
+def is_paginated(params):
+    return bool(params.get('page_size') or params.get('cursor'))
+
+
+def paginate(config, params, operation_name, fetch):
+    """Serve a list operation page by page from one snapshot.
+
+    The first call (no cursor) runs fetch() once, applies `where`, orders the
+    items by creation time and ID and keeps them for page_snapshot_ttl seconds;
+    each call returns page_size items and an opaque next_cursor (None on the
+    last page). Calls with a cursor never query the daemon, so pages stay
+    consistent while containers or images come and go. `fields` is applied
+    per page. A cursor is only accepted with the daemon, configuration and
+    listing parameters it was issued for.
+    """
+    page_size = validate_positive_integer(params.get('page_size'), 'page_size', operation_name) or 100
+    if page_size > MAX_PAGE_SIZE:
+        raise ConnectorError('page_size for {0} must be at most {1}'.format(operation_name, MAX_PAGE_SIZE))
+    projection = compile_fields(params.get('fields'), operation_name)
+    # A cursor only pages the daemon and configuration whose snapshot it points to (keyed like the cache)
+    daemon = daemon_key(config)
+    binding = _config_binding(config)
+    query = _query_binding(params)
+    now = time.time()
+
+    cursor = params.get('cursor')
+    if cursor:
+        snapshot_id, offset = _decode_cursor(cursor, operation_name)
+        snapshot = _load_snapshot(snapshot_id)
+        if snapshot is None or snapshot['expires'] < now:
+            raise ConnectorError('Cursor for {0} has expired; start again without a cursor'.format(operation_name))
+        if snapshot['operation'] != operation_name or snapshot['daemon'] != daemon or snapshot.get('config') != binding:
+            raise ConnectorError('Cursor does not belong to {0} on {1}'.format(operation_name, config.get('server_address')))
+        if query != '{}' and query != snapshot.get('query'):
+            # Later pages may repeat the listing parameters, but not change them
+            raise ConnectorError('Cursor for {0} was issued for other parameters; start again without a cursor'.format(
+                operation_name))
+    else:
+        predicate = compile_where(params.get('where'), operation_name)
+        items = fetch()
+        if not isinstance(items, list):
+            raise ConnectorError('Unexpected response for {0}: {1}'.format(operation_name, items))
+        if predicate is not None:
+            items = [item for item in items if predicate(item)]
+        # Stable order: oldest first, ties broken by ID
+        items.sort(key=lambda item: (item.get('Created') or 0, item.get('Id') or ''))
+        ttl = validate_positive_integer(config.get('page_snapshot_ttl'), 'page_snapshot_ttl',
+                                        operation_name) or DEFAULT_SNAPSHOT_TTL
+        snapshot = {'id': uuid.uuid4().hex, 'operation': operation_name, 'daemon': daemon, 'config': binding,
+                    'query': query, 'created': now, 'expires': now + ttl, 'items': items}
+        _store_snapshot(snapshot)
+        offset = 0
+
+    items = snapshot['items']
+    page = items[offset:offset + page_size]
+    next_offset = offset + len(page)
+    return {
+        'items': [projection(item) for item in page] if projection is not None else page,
+        'next_cursor': _encode_cursor(snapshot['id'], next_offset) if next_offset < len(items) else None,
+        'offset': offset,
+        'page_size': page_size,
+        'total': len(items),
+        'snapshot_created': snapshot['created'],
+        'snapshot_expires': snapshot['expires']
+    }
@@ -0,0 +1,128 @@
+import os
+import json
+import time
+import random
+import cProfile
+import pstats
+import threading
+import tracemalloc
+from connectors.core.connector import get_logger
+from .utils import get_tmp_dir, validate_boolean_param
+from .constants import LOGGER_NAME
+
+logger = get_logger(LOGGER_NAME)
+
+# Only one call is profiled at a time: profilers and tracemalloc are process-wide
+_profile_lock = threading.Lock()
+
+PROFILE_DIR_NAME = 'docker-connector-profiles'
+PROFILE_TOP_FUNCTIONS = 25
+PROFILE_TOP_ALLOCATIONS = 15
+# Frames kept per traced allocation; more frames cost more memory and time while tracing
+PROFILE_TRACE_FRAMES = 1
+
+
+def profile_mode(config, params):
+    """'result' when the call asks for profiling, 'file' when it is sampled by profile_sample_rate, else None"""
+    if validate_boolean_param(params.get('profile', False), 'profile', 'profile', False):
+        return 'result'
+    try:
+        rate = float(config.get('profile_sample_rate') or 0)
+    except (TypeError, ValueError):
+        rate = 0
+    if rate > 0 and random.random() < rate:
+        return 'file'
+    return None
+
+
+def _function_label(func):
+    filename, line, name = func
+    if filename == '~':
+        # Built-in functions (e.g. <built-in method _socket.socket.recv_into>)
+        return name
+    return '{0}:{1}({2})'.format(_short_path(filename), line, name)
+
+
+def _short_path(filename):
+    """Path relative to the connector or site-packages, whichever is shorter"""
+    parts = filename.replace('\\', '/').split('/')
+    for marker in ('site-packages', 'dist-packages', 'lib'):
+        if marker in parts:
+            return '/'.join(parts[len(parts) - 1 - parts[::-1].index(marker) + 1:])
+    return '/'.join(parts[-2:])
+
+
+def _summarize(operation, profiler, snapshot, traced, wall, cpu):
+    stats = pstats.Stats(profiler)
+    functions = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_TOP_FUNCTIONS]
+    allocations = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__)
+    )).statistics('lineno')[:PROFILE_TOP_ALLOCATIONS]
+    return {
+        'operation': operation,
+        'wall_seconds': round(wall, 6),
+        'cpu_seconds': round(cpu, 6),
+        # Time not spent on CPU in this thread: network and rate-limit waits, worker threads, locks
+        'wait_seconds': round(max(0.0, wall - cpu), 6),
+        'peak_traced_memory_bytes': traced[1],
+        'top_functions': [{'function': _function_label(func), 'calls': calls,
+                           'total_seconds': round(total, 6), 'cumulative_seconds': round(cumulative, 6)}
+                          for func, (_, calls, total, cumulative, _) in functions],
+        'top_allocations': [{'site': '{0}:{1}'.format(_short_path(stat.traceback[0].filename),
+                                                      stat.traceback[0].lineno),
+                             'size_bytes': stat.size, 'count': stat.count} for stat in allocations]
+    }
+
+
+def _write_profile(summary):
+    directory = os.path.join(get_tmp_dir(), PROFILE_DIR_NAME)
+    path = os.path.join(directory, '{0}-{1}-{2}.json'.format(summary['operation'], time.strftime('%Y%m%dT%H%M%S'),
+                                                             os.urandom(4).hex()))
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(summary, f, indent=2)
+        logger.info('Profile of {0} written to {1}'.format(summary['operation'], path))
+    except OSError as e:
+        logger.warning('Error writing profile of {0}: {1}'.format(summary['operation'], str(e)))
+
+
+def profile_call(operation, mode, func):
+    """Run func() under cProfile and tracemalloc and attach ('result') or write ('file') the summary.
+
+    cProfile sees the calling thread only, so time spent in worker threads
+    (e.g. stats_snapshot) shows up as waiting in the futures; tracemalloc
+    counts allocations of all threads while the call runs.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        logger.info('Another call is being profiled, running {0} without profiling'.format(operation))
+        return func()
+    was_tracing = tracemalloc.is_tracing()
+    try:
+        if was_tracing:
+            tracemalloc.reset_peak()
+        else:
+            tracemalloc.start(PROFILE_TRACE_FRAMES)
+        profiler = cProfile.Profile()
+        started, cpu_started = time.monotonic(), time.thread_time()
+        profiler.enable()
+        try:
+            result = func()
+        finally:
+            profiler.disable()
+            wall, cpu = time.monotonic() - started, time.thread_time() - cpu_started
+            traced = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            if not was_tracing:
+                tracemalloc.stop()
+        summary = _summarize(operation, profiler, snapshot, traced, wall, cpu)
+    finally:
+        _profile_lock.release()
+
+    if mode == 'file':
+        _write_profile(summary)
+        return result
+    if isinstance(result, dict):
+        return dict(result, _profile=summary)
+    return {'result': result, '_profile': summary}
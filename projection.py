@@ -0,0 +1,254 @@
+import re
+from connectors.core.connector import get_logger, ConnectorError
+from .utils import validate_json_param, validate_list_param
+from .constants import LOGGER_NAME
+
+logger = get_logger(LOGGER_NAME)
+
+# One step of a field path: .name, name, [*], [], [0], ['key'] or ["key"]
+PATH_TOKEN_PATTERN = re.compile(r"""\.?([^.\[\]'"]+)|\[\s*(\*|-?\d+|'[^']*'|"[^"]*")?\s*\]""")
+WILDCARD = '*'
+
+# Comparison operators of `where` conditions
+WHERE_OPERATORS = ('eq', 'ne', 'gt', 'gte', 'lt', 'lte', 'in', 'nin', 'regex', 'exists', 'contains')
+
+_MISSING = object()
+
+
+def parse_field_path(path, operation_name):
+    """Split 'State.Status', '$.Mounts[*].Source' or "Config.Labels['com.example.tier']" into path tokens"""
+    text = path.strip()
+    if text.startswith('$'):
+        text = text[1:]
+    tokens = []
+    position = 0
+    while position < len(text):
+        match = PATH_TOKEN_PATTERN.match(text, position)
+        if not match or match.end() == position:
+            raise ConnectorError('Invalid field path for {0}: {1}'.format(operation_name, path))
+        name, bracket = match.groups()
+        if name is not None:
+            tokens.append(name)
+        elif bracket is None or bracket == WILDCARD:
+            tokens.append(WILDCARD)
+        elif bracket[0] in '\'"':
+            tokens.append(bracket[1:-1])
+        else:
+            tokens.append(int(bracket))
+        position = match.end()
+    if not tokens:
+        raise ConnectorError('Invalid field path for {0}: {1}'.format(operation_name, path))
+    return tokens
+
+
+def _merge(a, b):
+    if isinstance(a, dict) and isinstance(b, dict):
+        merged = dict(a)
+        for key, value in b.items():
+            merged[key] = _merge(merged[key], value) if key in merged else value
+        return merged
+    if isinstance(a, list) and isinstance(b, list) and len(a) == len(b):
+        return [_merge(x, y) for x, y in zip(a, b)]
+    return b
+
+
+def _project(trie, value):
+    """Keep the parts of value selected by trie (None selects the whole value); _MISSING when nothing matches"""
+    if trie is None:
+        return value
+    if isinstance(value, dict):
+        projected = {}
+        for key, child in trie.items():
+            if isinstance(key, str) and key != WILDCARD and key in value:
+                part = _project(child, value[key])
+                if part is not _MISSING:
+                    projected[key] = part
+        if WILDCARD in trie:
+            for key, item in value.items():
+                part = _project(trie[WILDCARD], item)
+                if part is not _MISSING:
+                    projected[key] = _merge(projected[key], part) if key in projected else part
+        return projected if projected else _MISSING
+    if isinstance(value, list):
+        if WILDCARD in trie or any(isinstance(key, str) for key in trie):
+            # Wildcards, and plain names (e.g. Mounts.Source), apply to every element
+            names = {key: child for key, child in trie.items() if isinstance(key, str) and key != WILDCARD}
+            items = []
+            for index, item in enumerate(value):
+                part = _project(trie[WILDCARD], item) if WILDCARD in trie else _MISSING
+                for extra in (_project(names, item) if names else _MISSING,
+                              _project(trie[index], item) if index in trie else _MISSING):
+                    if extra is not _MISSING:
+                        part = extra if part is _MISSING else _merge(part, extra)
+                if part is not _MISSING:
+                    items.append(part)
+            return items if items else _MISSING
+        items = [_project(trie[index], value[index]) for index in sorted(trie) if -len(value) <= index < len(value)]
+        items = [item for item in items if item is not _MISSING]
+        return items if items else _MISSING
+    return _MISSING
+
+
+class FieldProjection(object):
+    """Compiled `fields` parameter: a trie of field paths applied to each result document"""
+
+    def __init__(self, paths, operation_name):
+        self.paths = paths
+        self.trie = {}
+        for path in paths:
+            node = self.trie
+            tokens = parse_field_path(path, operation_name)
+            for i, token in enumerate(tokens):
+                if i == len(tokens) - 1:
+                    node[token] = None
+                elif node.get(token, {}) is None:
+                    # A shorter path already selects the whole value
+                    break
+                else:
+                    node = node.setdefault(token, {})
+
+    def __call__(self, document):
+        projected = _project(self.trie, document)
+        return {} if projected is _MISSING else projected
+
+
+def compile_fields(value, operation_name):
+    """Compile `fields` (list, JSON array or comma-separated paths) once per call; None when not given"""
+    paths = validate_list_param(value, 'fields', operation_name)
+    return FieldProjection(paths, operation_name) if paths else None
+
+
+def _values_at(tokens, value):
+    """All values reached by a path; wildcards and lists fan out"""
+    values = [value]
+    for token in tokens:
+        reached = []
+        for current in values:
+            if token == WILDCARD:
+                if isinstance(current, dict):
+                    reached.extend(current.values())
+                elif isinstance(current, list):
+                    reached.extend(current)
+            elif isinstance(token, int):
+                if isinstance(current, list) and -len(current) <= token < len(current):
+                    reached.append(current[token])
+            elif isinstance(current, dict):
+                if token in current:
+                    reached.append(current[token])
+            elif isinstance(current, list):
+                reached.extend(item[token] for item in current if isinstance(item, dict) and token in item)
+        values = reached
+    return values
+
+
+def _compare(operator, values, operand):
+    if operator not in ('exists', 'contains'):
+        # A list attribute (e.g. Names) matches when any of its elements does
+        values = [item for value in values for item in (value if isinstance(value, list) else (value,))]
+    try:
+        if operator == 'eq':
+            return operand in values
+        if operator == 'ne':
+            return operand not in values
+        if operator == 'in':
+            return any(value in operand for value in values)
+        if operator == 'nin':
+            return not any(value in operand for value in values)
+        if operator == 'exists':
+            return bool(values) == bool(operand)
+        if operator == 'regex':
+            return any(isinstance(value, str) and operand.search(value) for value in values)
+        if operator == 'contains':
+            return any(operand in value for value in values if isinstance(value, (list, str, dict)))
+        if operator == 'gt':
+            return any(value > operand for value in values)
+        if operator == 'gte':
+            return any(value >= operand for value in values)
+        if operator == 'lt':
+            return any(value < operand for value in values)
+        if operator == 'lte':
+            return any(value <= operand for value in values)
+    except TypeError:
+        # e.g. comparing a string attribute with a number
+        return False
+    return False
+
+
+def compile_where(value, operation_name):
+    """Compile a `where` object ({"path": value or {"operator": operand}, "or": [...]}) into a predicate"""
+    where = validate_json_param(value or None, 'where', operation_name)
+    if not where:
+        return None
+    if not isinstance(where, dict):
+        raise ConnectorError('Invalid where for {0}: expected a JSON object'.format(operation_name))
+
+    checks = []
+    alternatives = []
+    for path, condition in where.items():
+        if path == 'or':
+            if not isinstance(condition, list) or not condition:
+                raise ConnectorError('Invalid where for {0}: "or" must be a list of conditions'.format(operation_name))
+            alternatives.append([compile_where(branch, operation_name) for branch in condition])
+            continue
+        tokens = parse_field_path(path, operation_name)
+        operators = condition if isinstance(condition, dict) else {'eq': condition}
+        for operator, operand in operators.items():
+            if operator not in WHERE_OPERATORS:
+                raise ConnectorError('Invalid where operator for {0}: {1}. Must be one of: {2}'.format(
+                    operation_name, operator, ', '.join(WHERE_OPERATORS)))
+            if operator == 'regex':
+                try:
+                    operand = re.compile(operand)
+                except (re.error, TypeError) as e:
+                    raise ConnectorError('Invalid where regex for {0}: {1}'.format(operation_name, str(e)))
+            elif operator in ('in', 'nin') and not isinstance(operand, list):
+                raise ConnectorError('Invalid where for {0}: {1} expects a list'.format(operation_name, operator))
+            checks.append((tokens, operator, operand))
+
+    def predicate(document):
+        for tokens, operator, operand in checks:
+            if not _compare(operator, _values_at(tokens, document), operand):
+                return False
+        return all(any(branch is None or branch(document) for branch in branches) for branches in alternatives)
+
+    return predicate
+
+
+def item_shaper(params, operation_name):
+    """Compile `where` and `fields` into one per-item function returning the shaped item, or None to drop it.
+
+    Returns None when neither parameter is given. Used with
+    utils.json_array_handler, items are shaped while the array is decoded.
+    """
+    projection = compile_fields(params.get('fields'), operation_name)
+    predicate = compile_where(params.get('where'), operation_name)
+    if projection is None and predicate is None:
+        return None
+
+    def shape(item):
+        if predicate is not None and not predicate(item):
+            return None
+        return projection(item) if projection is not None else item
+
+    return shape
+
+
+def shape_result(result, params, operation_name, items_key=None):
+    """Apply the `where` and `fields` parameters of a list or inspect operation to its decoded result.
+
+    List results (or result[items_key]) are filtered item by item before
+    projection, so predicates may test attributes that are not returned.
+    """
+    projection = compile_fields(params.get('fields'), operation_name)
+    predicate = compile_where(params.get('where'), operation_name)
+    if projection is None and predicate is None:
+        return result
+    items = result.get(items_key) if items_key and isinstance(result, dict) else result
+    if not isinstance(items, list):
+        # A single document (inspect) or an unexpected body: only project
+        return projection(result) if projection is not None and isinstance(result, dict) else result
+    shaped = [projection(item) if projection is not None else item
+              for item in items if predicate is None or predicate(item)]
+    if items_key and isinstance(result, dict):
+        return dict(result, **{items_key: shaped})
+    return shaped
@@ -0,0 +1,279 @@
+import calendar
+import re
+import time
+import requests
+from connectors.core.connector import get_logger, ConnectorError
+from .constants import LOGGER_NAME
+
+logger = get_logger(LOGGER_NAME)
+
+# Docker raw-stream framing: 8-byte header [stream type, 0, 0, 0, uint32 big-endian payload size]
+FRAME_HEADER_SIZE = 8
+STREAM_TYPES = {0: 'stdin', 1: 'stdout', 2: 'stderr'}
+MULTIPLEXED_CONTENT_TYPE = 'application/vnd.docker.multiplexed-stream'
+# TTY output (API 1.42+) is sent unframed with this type
+RAW_STREAM_CONTENT_TYPE = 'application/vnd.docker.raw-stream'
+READ_CHUNK_SIZE = 64 * 1024
+
+# RFC 3339 timestamps with nanoseconds as prefixed to log lines by timestamps=1
+RFC3339_PATTERN = re.compile(r'^(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})(?:\.(\d+))?(Z|[+-]\d{2}:\d{2})$')
+TIMESTAMP_PREFIX_PATTERN = re.compile(r'(?m)^\d{4}-\d{2}-\d{2}T\S+ ')
+
+# Demux modes accepted by container_logs, attach_container and exec_container
+DEMUX_MODES = {
+    'interleave': (True, True),
+    'separate': (True, True),
+    'stdout only': (True, False),
+    'stderr only': (False, True)
+}
+
+
+class RawStreamDemuxer(object):
+    """Incremental parser for Docker's multiplexed stdout/stderr framing.
+
+    Chunks are walked through memoryviews, so frame payloads are copied once,
+    straight into the output buffer of their stream, and never materialised
+    as separate objects. Non-multiplexed (TTY) output is passed through as
+    stdout. Byte counts are kept per stream, including dropped streams.
+    Output past `max_bytes` or `max_lines` is cut off and `stopped_by` names
+    the bound that was reached.
+    """
+
+    def __init__(self, mode='interleave', multiplexed=None, max_bytes=None, max_lines=None):
+        if mode not in DEMUX_MODES:
+            raise ConnectorError('Invalid demux mode: {0}. Must be one of: {1}'.format(
+                mode, ', '.join(m.title() for m in DEMUX_MODES)))
+        self.mode = mode
+        include_stdout, include_stderr = DEMUX_MODES[mode]
+        self.include = {'stdin': False, 'stdout': include_stdout, 'stderr': include_stderr}
+        self.multiplexed = multiplexed
+        self.max_bytes = max_bytes
+        self.max_lines = max_lines
+        self.stopped_by = None
+        self.byte_counts = {'stdin': 0, 'stdout': 0, 'stderr': 0}
+        self.frames = 0
+        self.lines = 0
+        self.included_bytes = 0
+        self.combined = bytearray()
+        self.outputs = {'stdout': bytearray(), 'stderr': bytearray()}
+        self._header = bytearray()
+        self._pending = 0
+        self._pending_stream = 'stdout'
+
+    def feed(self, chunk):
+        """Consume the next chunk of the response body"""
+        view = memoryview(chunk)
+        if self.multiplexed is None:
+            # Auto-detect: a multiplexed stream starts with a frame header of a known stream type
+            self._header += view
+            if len(self._header) < FRAME_HEADER_SIZE:
+                return
+            probe = bytes(self._header)
+            self._header.clear()
+            self.multiplexed = probe[0] in STREAM_TYPES and probe[1:4] == b'\0\0\0'
+            view = memoryview(probe)
+        if not self.multiplexed:
+            self._emit('stdout', view)
+            return
+
+        pos = 0
+        end = len(view)
+        while pos < end:
+            if self._pending:
+                take = min(self._pending, end - pos)
+                self._emit(self._pending_stream, view[pos:pos + take])
+                self._pending -= take
+                pos += take
+                continue
+            need = FRAME_HEADER_SIZE - len(self._header)
+            self._header += view[pos:pos + need]
+            pos += need
+            if len(self._header) < FRAME_HEADER_SIZE:
+                break
+            self._pending_stream = STREAM_TYPES.get(self._header[0], 'stdout')
+            self._pending = int.from_bytes(self._header[4:8], 'big')
+            self._header.clear()
+            self.frames += 1
+
+    def finish(self):
+        """Flush a short body that was too small to auto-detect"""
+        if self.multiplexed is None:
+            self.multiplexed = False
+            if self._header:
+                self._emit('stdout', memoryview(bytes(self._header)))
+                self._header.clear()
+
+    def _emit(self, stream, view):
+        self.byte_counts[stream] += len(view)
+        if not self.include[stream] or self.stopped_by:
+            return
+        target = self.combined if self.mode == 'interleave' else self.outputs[stream]
+        start = len(target)
+        if self.max_bytes and self.included_bytes + len(view) >= self.max_bytes:
+            view = view[:self.max_bytes - self.included_bytes]
+            self.stopped_by = 'bytes'
+        target += view
+        lines = target.count(b'\n', start)
+        if self.max_lines and self.lines + lines >= self.max_lines:
+            # Keep output up to and including the max_lines-th newline
+            end = start
+            for _ in range(self.max_lines - self.lines):
+                end = target.index(b'\n', end) + 1
+            del target[end:]
+            lines = self.max_lines - self.lines
+            self.stopped_by = 'lines'
+        self.included_bytes += len(target) - start
+        self.lines += lines
+
+    def limit_reached(self):
+        """Return which bound ('bytes' or 'lines') the collected output reached, if any"""
+        return self.stopped_by
+
+    def result(self, encoding='utf-8'):
+        result = {'multiplexed': bool(self.multiplexed), 'frames': self.frames, 'bytes': dict(self.byte_counts)}
+        if self.mode == 'interleave':
+            result['result'] = self.combined.decode(encoding, errors='replace')
+        else:
+            if self.include['stdout']:
+                result['stdout'] = self.outputs['stdout'].decode(encoding, errors='replace')
+            if self.include['stderr']:
+                result['stderr'] = self.outputs['stderr'].decode(encoding, errors='replace')
+        return result
+
+
+def validate_demux_mode(value, operation_name):
+    """Validate the demux mode (Interleave, Separate, Stdout Only, Stderr Only)"""
+    if value is None or value == '':
+        return 'interleave'
+    mode = str(value).strip().lower().replace('_', ' ')
+    if mode not in DEMUX_MODES:
+        raise ConnectorError('Invalid demux mode for {0}: {1}. Must be one of: Interleave, Separate, Stdout Only, Stderr Only'.format(
+            operation_name, value))
+    return mode
+
+
+def is_multiplexed_response(response):
+    """True/False when the Content-Type tells whether the body is framed, None when unknown"""
+    content_type = response.headers.get('Content-Type', '')
+    if content_type.startswith(MULTIPLEXED_CONTENT_TYPE):
+        return True
+    if content_type.startswith(RAW_STREAM_CONTENT_TYPE):
+        return False
+    return None
+
+
+def set_read_timeout(response, seconds):
+    """Bound the next socket read of a streamed response (no-op when its socket is not reachable)"""
+    sock = getattr(getattr(response.raw, 'connection', None), 'sock', None)
+    if sock is not None:
+        sock.settimeout(max(seconds, 0.001))
+
+
+def demux_response_handler(mode='interleave', multiplexed=None, max_bytes=None, max_lines=None,
+                           max_duration=None):
+    """Build a response_handler that demultiplexes a raw-stream response body.
+
+    Output stops at exactly `max_bytes` bytes or `max_lines` lines, or once
+    `max_duration` seconds passed; the result then reports `stopped_by`. With
+    `max_duration` set, each read may only wait for the rest of the window
+    and a read timeout ends the window instead of failing.
+    """
+    def handler(response):
+        framed = multiplexed if multiplexed is not None else is_multiplexed_response(response)
+        demuxer = RawStreamDemuxer(mode, multiplexed=framed, max_bytes=max_bytes, max_lines=max_lines)
+        deadline = time.monotonic() + max_duration if max_duration else None
+        stopped_by = None
+        try:
+            if deadline is not None:
+                set_read_timeout(response, max_duration)
+            for chunk in response.iter_content(chunk_size=READ_CHUNK_SIZE):
+                if chunk:
+                    demuxer.feed(chunk)
+                stopped_by = demuxer.limit_reached()
+                if not stopped_by and deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        stopped_by = 'duration'
+                    else:
+                        set_read_timeout(response, remaining)
+                if stopped_by:
+                    break
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if not max_duration:
+                raise ConnectorError('Error reading stream: {0}'.format(str(e)))
+            # No data before the read timeout: the follow window is over
+            stopped_by = 'duration'
+        demuxer.finish()
+        result = demuxer.result()
+        if stopped_by:
+            result['stopped_by'] = stopped_by
+        return result
+    return handler
+
+
+def rfc3339_to_unix(value):
+    """Convert an RFC 3339 timestamp to (seconds, nanoseconds) since the epoch, keeping full precision"""
+    match = RFC3339_PATTERN.match(value or '')
+    if not match:
+        return None
+    moment, fraction, zone = match.groups()
+    seconds = calendar.timegm(time.strptime(moment, '%Y-%m-%dT%H:%M:%S'))
+    if zone != 'Z':
+        offset = int(zone[1:3]) * 3600 + int(zone[4:6]) * 60
+        seconds -= offset if zone[0] == '+' else -offset
+    nanoseconds = int((fraction or '0')[:9].ljust(9, '0'))
+    return seconds, nanoseconds
+
+
+def _line_time(line):
+    return rfc3339_to_unix(line.split(' ', 1)[0])
+
+
+def _after(moment):
+    """The instant one nanosecond after (seconds, nanoseconds)"""
+    seconds, nanoseconds = moment[0], moment[1] + 1
+    if nanoseconds >= 1000000000:
+        seconds, nanoseconds = seconds + 1, 0
+    return seconds, nanoseconds
+
+
+def next_log_cursor(result):
+    """Return the `since` value of the next poll of a demuxed, timestamped log result.
+
+    The cursor follows the newest complete (newline-terminated) line. A partial
+    last line (the stream stopped mid-frame or at max_bytes) is removed from
+    result and the cursor resumes at its timestamp, so the next poll returns
+    it whole; `since` is inclusive, so complete lines are stepped past by one
+    nanosecond.
+    """
+    newest = None
+    resume = None
+    for key in ('result', 'stdout', 'stderr'):
+        text = result.get(key)
+        if not text:
+            continue
+        complete, _, partial = text.rpartition('\n')
+        last_complete = _line_time(complete.rsplit('\n', 1)[-1]) if complete else None
+        if last_complete and (newest is None or last_complete > newest):
+            newest = last_complete
+        if not partial:
+            continue
+        held = _line_time(partial) or (_after(last_complete) if last_complete else None)
+        if held is None:
+            # Nothing safe to resume from: keep the text and do not move the cursor
+            return None
+        result[key] = text[:len(text) - len(partial)]
+        if resume is None or held < resume:
+            resume = held
+    moment = resume or (_after(newest) if newest else None)
+    if moment is None:
+        return None
+    return '{0}.{1:09d}'.format(*moment)
+
+
+def strip_log_timestamps(result):
+    """Remove timestamp prefixes that were only requested to track the log cursor"""
+    for key in ('result', 'stdout', 'stderr'):
+        if result.get(key):
+            result[key] = TIMESTAMP_PREFIX_PATTERN.sub('', result[key])
+    return result
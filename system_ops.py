@@ -1,9 +1,29 @@
 from connectors.core.connector import get_logger, ConnectorError
-from .utils import invoke_rest_endpoint, validate_required_params, validate_json_param
+from .utils import invoke_rest_endpoint, validate_required_params, validate_json_param, validate_boolean_param, validate_positive_integer, validate_list_param, iter_json_lines, get_cursor, set_cursor, run_concurrently, DEFAULT_MAX_WORKERS, get_cache_stats as get_response_cache_stats, clear_response_cache, get_single_flight_stats, get_rate_limit_stats, get_circuit_breaker_state, get_api_version_info
+from .metrics import get_metrics, prometheus_text, reset_metrics
+from .codec import get_json_backend
+from .streams import set_read_timeout
+from .containers import list_containers
+from .images import list_images
+from .networks import list_networks
+from .volumes import list_volumes
 from .constants import LOGGER_NAME
+import requests
+import time
 
 logger = get_logger(LOGGER_NAME)
 
+# Collection window of system_events when follow=true and no max_duration is given (seconds)
+DEFAULT_EVENTS_DURATION = 10
+
+# Object kinds of inventory_snapshot with their inspect endpoints
+INVENTORY_INSPECT_ENDPOINTS = {
+    'containers': '/containers/{0}/json',
+    'images': '/images/{0}/json',
+    'networks': '/networks/{0}',
+    'volumes': '/volumes/{0}'
+}
+
 
 def get_version(config, params, *args, **kwargs):
     # Use a version-less endpoint for Docker's /version
@@ -19,10 +39,37 @@ def system_df(config, params, *args, **kwargs):
 
 
 def system_events(config, params, *args, **kwargs):
-    """Get system events snapshot with optional filtering"""
-    filters = validate_json_param(params.get('filters'), 'filters', 'system_events')
+    """Get system events with optional filtering.
+    
+    The NDJSON event stream is decoded incrementally. Without follow (and
+    without `until`) the past events up to now are returned; with follow=true
+    live events are collected for at most max_duration seconds. max_events
+    ends collection early, and types/actions are matched while streaming.
+    With incremental=true the last timeNano seen is stored per daemon and used
+    as `since` on the next call, so repeated polls only return new events.
+    """
+    filters = validate_json_param(params.get('filters'), 'filters', 'system_events') or {}
     since = params.get('since')
     until = params.get('until')
+    follow = validate_boolean_param(params.get('follow', False), 'follow', 'system_events', False)
+    max_duration = validate_positive_integer(params.get('max_duration'), 'max_duration', 'system_events')
+    max_events = validate_positive_integer(params.get('max_events'), 'max_events', 'system_events')
+    types = set(t.lower() for t in validate_list_param(params.get('types'), 'types', 'system_events'))
+    actions = tuple(a.lower() for a in validate_list_param(params.get('actions'), 'actions', 'system_events'))
+    incremental = validate_boolean_param(params.get('incremental', False), 'incremental', 'system_events', False)
+    cursor_name = params.get('cursor_name') or 'default'
+    if follow and not max_duration:
+        max_duration = DEFAULT_EVENTS_DURATION
+    
+    if incremental and not since:
+        since = get_cursor(config, 'system_events', cursor_name)
+    if not until and not follow:
+        # A snapshot of the events up to now instead of blocking on the live stream
+        until = '{0:.9f}'.format(time.time())
+    if types and 'type' not in filters:
+        # The daemon filters on exact types; actions are prefix-matched below
+        filters = dict(filters, type=sorted(types))
+    
     query_params = {}
     if filters:
         query_params['filters'] = filters
@@ -30,7 +77,240 @@ def system_events(config, params, *args, **kwargs):
         query_params['since'] = since
     if until:
         query_params['until'] = until
-    return invoke_rest_endpoint(config, '/events', 'GET', query_params=query_params if query_params else None)
+    
+    since_nano = _events_time_nano(since)
+    
+    def collect(response):
+        events = []
+        received = 0
+        last_time_nano = None
+        stopped_by = None
+        deadline = time.monotonic() + max_duration if max_duration else None
+        try:
+            if deadline is not None:
+                # Each read may only wait for the rest of the window, also while no event arrives
+                set_read_timeout(response, max_duration)
+            for event in iter_json_lines(response):
+                received += 1
+                time_nano = event.get('timeNano') or int(event.get('time', 0)) * 1000000000
+                if since_nano and time_nano < since_nano:
+                    continue
+                last_time_nano = max(last_time_nano or 0, time_nano)
+                if _event_matches(event, types, actions):
+                    events.append(event)
+                if max_events and len(events) >= max_events:
+                    stopped_by = 'events'
+                    break
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        stopped_by = 'duration'
+                        break
+                    set_read_timeout(response, remaining)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if not max_duration:
+                raise ConnectorError('Error reading event stream: {0}'.format(str(e)))
+            # No event before the read timeout: the collection window is over
+            stopped_by = 'duration'
+        return {'events': events, 'count': len(events), 'received': received,
+                'last_time_nano': last_time_nano, 'stopped_by': stopped_by}
+    
+    result = invoke_rest_endpoint(config, '/events', 'GET', query_params=query_params if query_params else None,
+                                  timeout=max_duration if follow else None, response_handler=collect)
+    if incremental:
+        cursor = _next_events_cursor(result['last_time_nano'])
+        if cursor:
+            set_cursor(config, 'system_events', cursor_name, cursor)
+        result['next_since'] = cursor or since
+    return result
+
+
+def _events_time_nano(value):
+    """Convert a `since` value in seconds[.nanoseconds] to nanoseconds, None for other formats"""
+    try:
+        seconds, _, fraction = str(value).partition('.')
+        return int(seconds) * 1000000000 + int((fraction or '0')[:9].ljust(9, '0'))
+    except (TypeError, ValueError):
+        return None
+
+
+def _next_events_cursor(last_time_nano):
+    """Return a `since` value just after the newest event seen"""
+    if not last_time_nano:
+        return None
+    # `since` is inclusive, so step one nanosecond past the last event already returned
+    seconds, nanoseconds = divmod(last_time_nano + 1, 1000000000)
+    return '{0}.{1:09d}'.format(seconds, nanoseconds)
+
+
+def _event_matches(event, types, actions):
+    if types and str(event.get('Type', '')).lower() not in types:
+        return False
+    # Actions like "exec_start: sh -c ..." carry details after the action name
+    if actions and not str(event.get('Action', event.get('status', ''))).lower().startswith(actions):
+        return False
+    return True
+
+
+def inventory_snapshot(config, params, *args, **kwargs):
+    """Build a compact host inventory from the four listings fetched concurrently.
+    
+    Containers are cross-referenced in memory by image, network, volume and
+    label, so no per-container inspect is needed. Objects of the kinds in
+    `inspect` (optionally only the IDs/names in `inspect_ids`) are additionally
+    inspected in parallel.
+    """
+    inspect_kinds = [kind.lower() for kind in validate_list_param(params.get('inspect'), 'inspect', 'inventory_snapshot')]
+    for kind in inspect_kinds:
+        if kind not in INVENTORY_INSPECT_ENDPOINTS:
+            raise ConnectorError('Invalid inspect kind for inventory_snapshot: {0}. Must be one of: {1}'.format(
+                kind, ', '.join(INVENTORY_INSPECT_ENDPOINTS)))
+    inspect_ids = set(validate_list_param(params.get('inspect_ids'), 'inspect_ids', 'inventory_snapshot'))
+    max_workers = validate_positive_integer(params.get('max_workers'), 'max_workers', 'inventory_snapshot') or DEFAULT_MAX_WORKERS
+    started = time.monotonic()
+    
+    listings = {
+        'containers': lambda: list_containers(config, {'all': True}),
+        'images': lambda: list_images(config, {}),
+        'networks': lambda: list_networks(config, {}),
+        'volumes': lambda: (list_volumes(config, {}) or {}).get('Volumes') or []
+    }
+    fetched = {}
+    errors = []
+    for outcome in run_concurrently(lambda kind: listings[kind](), list(listings), max_workers):
+        fetched[outcome['item']] = outcome['result'] or []
+        if outcome['error']:
+            errors.append({'kind': outcome['item'], 'error': outcome['error']})
+    
+    inventory = _build_inventory(fetched)
+    
+    if inspect_kinds:
+        targets = []
+        for kind in inspect_kinds:
+            for obj in inventory[kind]:
+                keys = (obj.get('id'), obj.get('name'))
+                if not inspect_ids or inspect_ids.intersection(k for k in keys if k):
+                    targets.append((kind, obj))
+        
+        def inspect(target):
+            kind, obj = target
+            return invoke_rest_endpoint(config, INVENTORY_INSPECT_ENDPOINTS[kind].format(obj.get('id') or obj.get('name')), 'GET')
+        
+        for outcome in run_concurrently(inspect, targets, max_workers):
+            kind, obj = outcome['item']
+            if outcome['error']:
+                errors.append({'kind': kind, 'id': obj.get('id') or obj.get('name'), 'error': outcome['error']})
+            else:
+                obj['inspect'] = outcome['result']
+    
+    inventory['errors'] = errors
+    inventory['elapsed'] = round(time.monotonic() - started, 3)
+    return inventory
+
+
+def _build_inventory(fetched):
+    """Reduce the raw listings to compact records plus image/network/volume/label -> containers indexes"""
+    indexes = {'image': {}, 'network': {}, 'volume': {}, 'label': {}}
+    
+    def add(index, key, container_id):
+        if key:
+            indexes[index].setdefault(key, []).append(container_id)
+    
+    containers = []
+    for c in fetched.get('containers', []):
+        container_id = c.get('Id')
+        networks = sorted(((c.get('NetworkSettings') or {}).get('Networks') or {}).keys())
+        volumes = [m.get('Name') for m in c.get('Mounts') or [] if m.get('Type') == 'volume' and m.get('Name')]
+        labels = c.get('Labels') or {}
+        containers.append({
+            'id': container_id,
+            'name': (c.get('Names') or [''])[0].lstrip('/'),
+            'image': c.get('Image'),
+            'image_id': c.get('ImageID'),
+            'state': c.get('State'),
+            'status': c.get('Status'),
+            'created': c.get('Created'),
+            'networks': networks,
+            'volumes': volumes,
+            'labels': labels
+        })
+        add('image', c.get('ImageID'), container_id)
+        for network in networks:
+            add('network', network, container_id)
+        for volume in volumes:
+            add('volume', volume, container_id)
+        for key, value in labels.items():
+            add('label', '{0}={1}'.format(key, value), container_id)
+    
+    images = [{
+        'id': i.get('Id'),
+        'tags': [tag for tag in i.get('RepoTags') or [] if tag != '<none>:<none>'],
+        'size': i.get('Size'),
+        'created': i.get('Created'),
+        'containers': len(indexes['image'].get(i.get('Id'), []))
+    } for i in fetched.get('images', [])]
+    networks = [{
+        'id': n.get('Id'),
+        'name': n.get('Name'),
+        'driver': n.get('Driver'),
+        'scope': n.get('Scope'),
+        'containers': len(indexes['network'].get(n.get('Name'), []))
+    } for n in fetched.get('networks', [])]
+    volumes = [{
+        'name': v.get('Name'),
+        'driver': v.get('Driver'),
+        'mountpoint': v.get('Mountpoint'),
+        'containers': len(indexes['volume'].get(v.get('Name'), []))
+    } for v in fetched.get('volumes', [])]
+    
+    return {
+        'counts': {'containers': len(containers), 'images': len(images),
+                   'networks': len(networks), 'volumes': len(volumes)},
+        'containers': containers,
+        'images': images,
+        'networks': networks,
+        'volumes': volumes,
+        'indexes': indexes,
+        'unused': {
+            'images': [i['id'] for i in images if not i['containers']],
+            'volumes': [v['name'] for v in volumes if not v['containers']]
+        }
+    }
+
+
+def get_cache_stats(config, params, *args, **kwargs):
+    """Report response cache hit/miss and request coalescing counters per daemon, optionally clearing this daemon's cache"""
+    stats = get_response_cache_stats()
+    if validate_boolean_param(params.get('clear', False), 'clear', 'get_cache_stats', False):
+        clear_response_cache(config)
+    return {'enabled': bool(validate_boolean_param(config.get('response_cache', False), 'response_cache',
+                                                   'get_cache_stats', False)),
+            'daemons': stats,
+            'single_flight': get_single_flight_stats()}
+
+
+def get_connector_metrics(config, params, *args, **kwargs):
+    """Report request latency, status code, retry, rate-limit and byte counters of this worker process.
+
+    format=Prometheus returns the text exposition format for a scraper or
+    pushgateway; JSON also includes the rate limiter, circuit breaker and
+    negotiated API version state. reset=true starts the counters over.
+    """
+    output_format = str(params.get('format') or 'JSON').lower()
+    if output_format not in ('json', 'prometheus'):
+        raise ConnectorError('Invalid format for get_connector_metrics: {0}. Must be JSON or Prometheus'.format(
+            params.get('format')))
+    if output_format == 'prometheus':
+        result = {'content_type': 'text/plain; version=0.0.4', 'metrics': prometheus_text()}
+    else:
+        result = {'metrics': get_metrics(),
+                  'rate_limits': get_rate_limit_stats(),
+                  'circuit_breakers': get_circuit_breaker_state(),
+                  'api_versions': get_api_version_info(),
+                  'json_backend': get_json_backend()}
+    if validate_boolean_param(params.get('reset', False), 'reset', 'get_connector_metrics', False):
+        reset_metrics()
+    return result
 
 
 def system_prune(config, params, *args, **kwargs):
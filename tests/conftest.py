@@ -0,0 +1,140 @@
+"""Fixtures shared by the connector tests.
+
+The tests drive the connector against benchmarks/fake_engine.py over TCP or a
+Unix socket. The connector directory is imported as the package
+`docker_connector`. Outside a FortiSOAR worker the connectors SDK and django
+are not installed; the few names the connector takes from them are then
+provided here so the real connector code runs unchanged.
+"""
+import importlib
+import logging
+import os
+import sys
+import tempfile
+import types
+
+import pytest
+
+CONNECTOR_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = 'docker_connector'
+
+sys.path.insert(0, os.path.join(CONNECTOR_DIR, 'benchmarks'))
+
+
+def _module(name, **attributes):
+    module = types.ModuleType(name)
+    module.__dict__.update(attributes)
+    sys.modules[name] = module
+    return module
+
+
+def _import_string(path):
+    module_path, _, name = path.rpartition('.')
+    try:
+        return getattr(importlib.import_module(module_path), name)
+    except (ValueError, AttributeError) as e:
+        raise ImportError('{0} does not define {1}'.format(module_path, name)) from e
+
+
+def _install_platform_modules():
+    try:
+        import connectors.core.connector  # noqa: F401
+    except ImportError:
+        class ConnectorError(Exception):
+            pass
+
+        class Connector(object):
+            pass
+
+        _module('connectors', __path__=[])
+        _module('connectors.core', __path__=[])
+        _module('connectors.core.connector', Connector=Connector, ConnectorError=ConnectorError,
+                get_logger=logging.getLogger)
+    try:
+        import django.utils.module_loading  # noqa: F401
+    except ImportError:
+        _module('django', __path__=[])
+        _module('django.utils', __path__=[])
+        _module('django.utils.module_loading', import_string=_import_string)
+
+
+def _load_connector():
+    _install_platform_modules()
+    package = types.ModuleType(PACKAGE)
+    package.__path__ = [CONNECTOR_DIR]
+    sys.modules[PACKAGE] = package
+    return importlib.import_module(PACKAGE + '.connector')
+
+
+_load_connector()
+
+from docker_connector import build_context, codec, jobs, metrics, pagination, utils  # noqa: E402
+from docker_connector.connector import DockerConnector  # noqa: E402
+from fake_engine import EngineSettings, start_engine  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(tmp_path, monkeypatch):
+    """Give every test its own temp directory and fresh per-daemon state"""
+    monkeypatch.setattr(tempfile, 'tempdir', str(tmp_path))
+    yield
+    utils.close_transports()
+    for state in (utils._rate_limit_buckets, utils._retry_budgets, utils._circuit_breakers, utils._cursors,
+                  utils._response_caches, utils._flight_stats, utils._api_versions, pagination._snapshots,
+                  jobs._jobs, build_context._context_cache):
+        state.clear()
+    metrics.reset_metrics()
+    codec.use_json_backend('auto')
+
+
+@pytest.fixture
+def connector():
+    return DockerConnector()
+
+
+@pytest.fixture
+def start():
+    """Start fake engines: start(**settings) over TCP, start(unix=True, **settings) on a Unix socket"""
+    servers = []
+    socket_dir = tempfile.mkdtemp(prefix='docker-test-sock-', dir='/tmp')
+
+    def start_server(unix=False, **settings):
+        unix_socket = os.path.join(socket_dir, 'docker{0}.sock'.format(len(servers))) if unix else None
+        server = start_engine(EngineSettings(**settings), unix_socket=unix_socket)
+        servers.append(server)
+        return server
+
+    yield start_server
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+    for name in os.listdir(socket_dir):
+        os.remove(os.path.join(socket_dir, name))
+    os.rmdir(socket_dir)
+
+
+def engine_config(server, **overrides):
+    """Connector config for a fake engine: no rate limit, fast retries, pinned API version"""
+    if isinstance(server.server_address, str):
+        config = {'server_address': server.server_address, 'protocol': 'UNIX'}
+    else:
+        config = {'server_address': '127.0.0.1', 'port': server.server_address[1], 'protocol': 'HTTP'}
+    config.update({'verify_ssl': False, 'api_version': '1.47', 'timeout': 10, 'rate_limit': 0,
+                   'heavy_rate_limit': 0, 'retry_attempts': 3, 'retry_delay': 0.01})
+    config.update(overrides)
+    return config
+
+
+@pytest.fixture
+def engine(start):
+    return start()
+
+
+@pytest.fixture
+def config(engine):
+    return engine_config(engine)
+
+
+@pytest.fixture
+def make_config():
+    return engine_config
@@ -0,0 +1,96 @@
+"""Streamed downloads, streamed uploads and build contexts"""
+import base64
+import hashlib
+import io
+import os
+import tarfile
+import tempfile
+
+import pytest
+
+from docker_connector.build_context import BuildContext
+from docker_connector.connector import ConnectorError
+
+CONTAINER_ID = '{0:064x}'.format(1)
+
+
+def test_export_streams_to_a_file(connector, start, make_config):
+    server = start(binary_size=3 * 1024 * 1024 + 17)
+    result = connector.execute(make_config(server), 'container_export',
+                               {'id': CONTAINER_ID, 'output_mode': 'File'})
+    assert 'content' not in result
+    assert result['size'] == os.path.getsize(result['file_path']) == server.settings.binary_size
+    with open(result['file_path'], 'rb') as f:
+        assert result['sha256'] == hashlib.sha256(f.read()).hexdigest()
+    assert os.path.dirname(result['file_path']) == tempfile.gettempdir()
+
+
+def test_export_base64_matches_the_file_digest(connector, start, make_config):
+    server = start(binary_size=100000)
+    config = make_config(server)
+    encoded = connector.execute(config, 'container_export', {'id': CONTAINER_ID})
+    saved = connector.execute(config, 'container_export', {'id': CONTAINER_ID, 'output_mode': 'File'})
+    assert len(base64.b64decode(encoded['content'])) == encoded['size'] == 100000
+    assert encoded['sha256'] == saved['sha256']
+
+
+def test_download_size_limit(connector, start, make_config):
+    server = start(binary_size=2 * 1024 * 1024)
+    config = make_config(server, max_download_size=1)
+    with pytest.raises(ConnectorError):
+        connector.execute(config, 'container_export', {'id': CONTAINER_ID, 'output_mode': 'File'})
+    assert not [name for name in os.listdir(tempfile.gettempdir()) if name.endswith('.tar')]
+
+
+def test_load_image_streams_a_temp_file(connector, engine, config):
+    path = os.path.join(tempfile.gettempdir(), 'image.tar')
+    with open(path, 'wb') as f:
+        f.write(os.urandom(5 * 1024 * 1024 + 3))
+    result = connector.execute(config, 'load_image', {'file_path': 'image.tar'})
+    assert 'Loaded image' in str(result)
+    assert engine.settings.bytes_received == 5 * 1024 * 1024 + 3
+
+
+def test_upload_paths_stay_in_the_temp_directory(connector, config):
+    with pytest.raises(ConnectorError, match='must be located in'):
+        connector.execute(config, 'load_image', {'file_path': '../../etc/passwd'})
+
+
+def _context(files):
+    context_dir = os.path.join(tempfile.gettempdir(), 'context')
+    for name, content in files.items():
+        path = os.path.join(context_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(content)
+    return context_dir
+
+
+def test_build_context_honours_dockerignore():
+    context_dir = _context({'Dockerfile': 'FROM scratch\n', 'app.py': 'print(1)\n', '.dockerignore': '*.log\nsecrets/\n',
+                            'debug.log': 'x', 'secrets/key': 'x'})
+    archive = b''.join(BuildContext(context_dir))
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        names = set(tar.getnames())
+    assert {'Dockerfile', 'app.py'} <= names
+    assert not {'debug.log', 'secrets/key'} & names
+
+
+def test_unchanged_build_context_is_served_from_the_cache():
+    context_dir = _context({'Dockerfile': 'FROM scratch\n', 'app.py': 'print(1)\n'})
+    first = BuildContext(context_dir)
+    archive = b''.join(first)
+    second = BuildContext(context_dir)
+    assert second.cached and not first.cached
+    assert b''.join(second) == archive
+    with open(os.path.join(context_dir, 'app.py'), 'w') as f:
+        f.write('print(2)\n')
+    assert not BuildContext(context_dir).cached
+
+
+def test_build_image_streams_the_context(connector, engine, config):
+    _context({'Dockerfile': 'FROM scratch\n', 'app.py': 'print(1)\n'})
+    result = connector.execute(config, 'build_image', {'context_path': 'context', 't': 'app:latest'})
+    assert result['context']['files'] == 2
+    assert engine.settings.bytes_received == result['context']['size']
+    assert connector.execute(config, 'build_image', {'context_path': 'context'})['context']['cached']
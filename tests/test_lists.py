@@ -0,0 +1,97 @@
+"""Field projection, filtering, pagination and the JSON backends"""
+import json
+
+import pytest
+
+from docker_connector import codec
+from docker_connector.connector import ConnectorError
+
+
+def test_fields_and_where_shape_list_results(connector, start, make_config):
+    server = start(containers=9)
+    result = connector.execute(make_config(server), 'list_containers', {
+        'fields': 'Id,Names[0],Labels.app', 'where': json.dumps({'Labels.app': 'app-1'})})
+    assert [item['Names'] for item in result] == [['/app-1'], ['/app-4'], ['/app-7']]
+    assert set(result[0]) == {'Id', 'Names', 'Labels'} and result[0]['Labels'] == {'app': 'app-1'}
+
+
+def test_where_operators(connector, start, make_config):
+    server = start(images=10)
+    where = {'Size': {'gte': 50000005}, 'or': [{'RepoTags[*]': {'regex': ':[57]$'}}, {'Created': 1690000009}]}
+    result = connector.execute(make_config(server), 'list_images', {'where': where, 'fields': ['RepoTags']})
+    assert result == [{'RepoTags': ['registry.local/app:5']}, {'RepoTags': ['registry.local/app:7']},
+                      {'RepoTags': ['registry.local/app:9']}]
+
+
+def test_invalid_where_is_rejected(connector, config):
+    with pytest.raises(ConnectorError, match='Invalid where operator'):
+        connector.execute(config, 'list_containers', {'where': {'State': {'like': 'run'}}})
+
+
+def test_pages_cover_one_snapshot(connector, start, make_config):
+    server = start(containers=25)
+    config = make_config(server)
+    page = connector.execute(config, 'list_containers', {'page_size': 10, 'fields': 'Id'})
+    ids = [item['Id'] for item in page['items']]
+    requests = server.settings.requests
+    while page['next_cursor']:
+        page = connector.execute(config, 'list_containers', {'cursor': page['next_cursor'], 'page_size': 10,
+                                                             'fields': 'Id'})
+        ids += [item['Id'] for item in page['items']]
+    assert ids == ['{0:064x}'.format(i) for i in range(1, 26)]
+    assert page['total'] == 25 and page['offset'] == 20
+    assert server.settings.requests == requests
+
+
+def test_cursors_are_bound_to_their_daemon(connector, start, make_config):
+    first, second = start(), start()
+    page = connector.execute(make_config(first), 'list_containers', {'page_size': 5})
+    with pytest.raises(ConnectorError, match='does not belong'):
+        connector.execute(make_config(second), 'list_containers', {'cursor': page['next_cursor']})
+    with pytest.raises(ConnectorError, match='does not belong'):
+        connector.execute(make_config(first), 'list_images', {'cursor': page['next_cursor']})
+    with pytest.raises(ConnectorError, match='Invalid cursor'):
+        connector.execute(make_config(first), 'list_containers', {'cursor': 'garbage'})
+
+
+def test_page_size_is_bounded(connector, config):
+    with pytest.raises(ConnectorError, match='at most'):
+        connector.execute(config, 'list_containers', {'page_size': 100000})
+
+
+@pytest.mark.parametrize('size', [1, 2, 7, 64, 100000])
+def test_iter_json_array_across_chunk_sizes(size):
+    items = [{'Id': 'a' * 70, 'n': 2.5, 'ok': True, 'text': 'é☃ ]'}, [], None, -12, 'x,y']
+    data = json.dumps(items).encode('utf-8')
+    chunks = [data[i:i + size] for i in range(0, len(data), size)]
+    assert list(codec.iter_json_array(chunks)) == items
+
+
+@pytest.mark.parametrize('data', [b'{"a": 1}', b'[1, 2', b'[1 2]', b'[{"a": }]'])
+def test_iter_json_array_rejects_malformed_input(data):
+    with pytest.raises(ValueError):
+        list(codec.iter_json_array([data]))
+
+
+def test_json_backends_round_trip(connector, engine, config):
+    assert codec.use_json_backend('json') == 'json'
+    assert codec.loads(codec.dumps({'a': [1, 2]})) == {'a': [1, 2]}
+    assert len(connector.execute(config, 'list_containers', {})) == 50
+    assert codec.use_json_backend('auto') == ('orjson' if codec.orjson is not None else 'json')
+    assert connector.execute(config, 'get_connector_metrics', {})['json_backend'] == codec.get_json_backend()
+    with pytest.raises(ConnectorError, match='Unknown JSON backend'):
+        codec.use_json_backend('simdjson')
+
+
+def test_cursors_are_bound_to_their_configuration_and_query(connector, engine, make_config):
+    config = make_config(engine)
+    params = {'page_size': 5, 'filters': {'label': ['tier=web']}}
+    cursor = connector.execute(config, 'list_containers', params)['next_cursor']
+    with pytest.raises(ConnectorError, match='does not belong'):
+        connector.execute(dict(config, api_version='1.41'), 'list_containers', {'cursor': cursor})
+    with pytest.raises(ConnectorError, match='does not belong'):
+        connector.execute(dict(config, username='other', password='secret'), 'list_containers', {'cursor': cursor})
+    with pytest.raises(ConnectorError, match='other parameters'):
+        connector.execute(config, 'list_containers', dict(params, cursor=cursor, filters={'label': ['tier=db']}))
+    assert connector.execute(config, 'list_containers', dict(params, cursor=cursor))['offset'] == 5
+    assert connector.execute(config, 'list_containers', {'cursor': cursor, 'page_size': 5})['offset'] == 5
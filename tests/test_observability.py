@@ -0,0 +1,125 @@
+"""Metrics, tracing hooks and per-call profiling"""
+import json
+import os
+import tempfile
+
+import pytest
+
+from docker_connector import profiling, tracing, utils
+from docker_connector.connector import ConnectorError
+
+CONTAINER_ID = '{0:064x}'.format(1)
+
+
+def _series(metrics, name, **labels):
+    return [s for s in metrics if s['name'] == 'docker_connector_' + name
+            and all(s['labels'].get(k) == v for k, v in labels.items())]
+
+
+def test_metrics_count_requests_per_operation(connector, engine, config):
+    for _ in range(3):
+        connector.execute(config, 'inspect_container', {'id': CONTAINER_ID})
+    metrics = connector.execute(config, 'get_connector_metrics', {})['metrics']
+    [requests] = _series(metrics, 'requests_total', operation='inspect_container', method='GET', code='200')
+    assert requests['value'] == 3
+    assert requests['labels']['daemon'] == utils.daemon_key(config)
+    [duration] = _series(metrics, 'operation_duration_seconds', operation='inspect_container', status='ok')
+    assert duration['count'] == 3 and duration['p50'] is not None
+
+
+def test_metrics_count_retries_and_failures(connector, start, make_config):
+    server = start(error_rate=1.0)
+    config = make_config(server, retry_attempts=2)
+    with pytest.raises(ConnectorError):
+        connector.execute(config, 'list_containers', {})
+    metrics = connector.execute(config, 'get_connector_metrics', {})['metrics']
+    assert _series(metrics, 'requests_total', operation='list_containers', code='500')[0]['value'] == 2
+    assert _series(metrics, 'retries_total', operation='list_containers')[0]['value'] == 1
+    assert _series(metrics, 'operation_duration_seconds', operation='list_containers', status='error')
+
+
+def test_prometheus_export_and_reset(connector, engine, config):
+    connector.execute(config, 'ping', {})
+    result = connector.execute(config, 'get_connector_metrics', {'format': 'Prometheus', 'reset': True})
+    text = result['metrics']
+    assert result['content_type'].startswith('text/plain')
+    assert '# TYPE docker_connector_requests_total counter' in text
+    assert 'docker_connector_request_duration_seconds_bucket{operation="ping"' in text
+    assert 'le="+Inf"} 1' in text
+    # Only the metrics call itself was recorded after the reset
+    metrics = connector.execute(config, 'get_connector_metrics', {'format': 'JSON'})['metrics']
+    assert [s['labels']['operation'] for s in metrics] == ['get_connector_metrics']
+
+
+def test_metrics_format_is_validated(connector, config):
+    with pytest.raises(ConnectorError, match='Invalid format'):
+        connector.execute(config, 'get_connector_metrics', {'format': 'xml'})
+
+
+class _RecordingHook(tracing.TraceHook):
+    def __init__(self):
+        self.started = []
+        self.ended = []
+
+    def span_started(self, span):
+        self.started.append(span)
+
+    def span_ended(self, span):
+        self.ended.append(span)
+
+
+@pytest.fixture
+def hook():
+    hook = _RecordingHook()
+    tracing.register_trace_hook(hook)
+    yield hook
+    tracing.unregister_trace_hook(hook)
+
+
+def test_trace_hooks_receive_operation_and_http_spans(connector, engine, config, hook):
+    connector.execute(config, 'inspect_container', {'id': CONTAINER_ID})
+    http, operation = hook.ended
+    assert (operation.kind, operation.name) == ('operation', 'inspect_container')
+    assert (http.kind, http.name) == ('http', 'GET /containers/{id}/json')
+    assert http.trace_id == operation.trace_id and http.parent_id == operation.span_id
+    assert http.attributes['status_code'] == 200
+    assert operation.attributes['http_attempts'] == 1
+    assert len(hook.started) == 2
+
+
+@pytest.mark.parametrize('unix', [False, True])
+def test_operation_span_daemon_matches_metrics_daemon(connector, start, make_config, hook, unix):
+    config = make_config(start(unix=unix))
+    connector.execute(config, 'ping', {})
+    operation = hook.ended[-1]
+    assert operation.kind == 'operation'
+    assert operation.attributes['daemon'] == utils.daemon_key(config)
+
+
+def test_failing_hooks_never_fail_the_operation(connector, engine, config, hook):
+    hook.span_ended = None
+    assert connector.execute(config, 'ping', {}) == {'result': 'OK'}
+
+
+def test_trace_hooks_from_config(connector, engine, config):
+    with pytest.raises(ConnectorError, match='Cannot load trace hook'):
+        connector.execute(dict(config, trace_hooks='no.such.Hook'), 'ping', {})
+    assert connector.execute(dict(config, trace_hooks='log'), 'ping', {}) == {'result': 'OK'}
+
+
+def test_profile_param_returns_a_profile(connector, engine, config):
+    result = connector.execute(config, 'list_containers', {'profile': True})
+    assert len(result['result']) == 50
+    profile = result['_profile']
+    assert profile['operation'] == 'list_containers'
+    assert profile['wall_seconds'] >= profile['cpu_seconds'] >= 0
+    assert profile['top_functions'] and profile['peak_traced_memory_bytes'] > 0
+
+
+def test_sampled_profiles_are_written_to_files(connector, engine, config):
+    result = connector.execute(dict(config, profile_sample_rate=1), 'inspect_container', {'id': CONTAINER_ID})
+    assert '_profile' not in result
+    directory = os.path.join(tempfile.gettempdir(), profiling.PROFILE_DIR_NAME)
+    [name] = os.listdir(directory)
+    with open(os.path.join(directory, name)) as f:
+        assert json.load(f)['operation'] == 'inspect_container'
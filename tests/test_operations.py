@@ -0,0 +1,131 @@
+"""Fleet-wide stats, bulk lifecycle actions, inventory snapshots, fleet fan-out and the fake engine itself"""
+import socket
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from docker_connector import fleet
+from docker_connector.connector import ConnectorError
+from fake_engine import LISTEN_BACKLOG, FakeEngineHandler
+from run_benchmarks import run_operation
+
+
+def test_stats_snapshot_computes_usage_per_container(connector, start, make_config):
+    server = start(containers=6)
+    result = connector.execute(make_config(server), 'stats_snapshot', {'mode': 'Standard', 'max_workers': 3})
+    assert (result['sampled'], result['failed']) == (6, 0)
+    row = result['containers'][0]
+    assert row['name'] == 'app-0'
+    assert row['cpu_percent'] == 40.0
+    assert row['memory_usage'] == 56 << 20 and row['memory_percent'] == pytest.approx(5.47)
+
+
+def test_stats_snapshot_window_reports_rates(connector, start, make_config):
+    server = start(containers=2)
+    result = connector.execute(make_config(server), 'stats_snapshot', {'window': '0.2'})
+    assert result['sampled'] == 2
+    assert {'net_rx_rate', 'block_write_rate'} <= set(result['containers'][0])
+    assert server.settings.requests == 1 + 2 * 2
+
+
+@pytest.mark.parametrize('window', [0, '0', -1, 'nan', 1000, 'soon'])
+def test_stats_snapshot_rejects_bad_windows(connector, config, window):
+    with pytest.raises(ConnectorError, match='window must be'):
+        connector.execute(config, 'stats_snapshot', {'window': window})
+
+
+def test_bulk_action_targets_the_matching_containers(connector, start, make_config):
+    server = start(containers=12)
+    result = connector.execute(make_config(server), 'bulk_container_action',
+                               {'action': 'Restart', 'label': 'tier=web', 't': 1, 'max_workers': 4})
+    assert (result['total'], result['succeeded'], result['failed']) == (12, 12, 0)
+    assert result['items'][0]['name'] == 'app-0'
+    # One listing plus one restart per container
+    assert server.settings.requests == 13
+
+
+def test_bulk_action_reports_failures_per_item(connector, start, make_config):
+    server = start(error_rate=1.0)
+    ids = ['{0:064x}'.format(i) for i in (1, 2)]
+    result = connector.execute(make_config(server, retry_attempts=1, circuit_breaker_threshold=0),
+                               'bulk_container_action', {'action': 'Stop', 'ids': ids})
+    assert (result['total'], result['failed']) == (2, 2)
+    assert all(item['status'] == 'failed' and item['error'] for item in result['items'])
+
+
+def test_bulk_action_refuses_an_unfiltered_host(connector, config):
+    with pytest.raises(ConnectorError, match='Missing required parameters'):
+        connector.execute(config, 'bulk_container_action', {'action': 'Remove'})
+
+
+def test_inventory_snapshot_cross_references_containers(connector, start, make_config):
+    server = start(containers=10, images=8)
+    result = connector.execute(make_config(server), 'inventory_snapshot', {})
+    assert result['counts'] == {'containers': 10, 'images': 8, 'networks': 2, 'volumes': 4}
+    assert len(result['indexes']['label']['tier=web']) == 10
+    assert len(result['indexes']['volume']['data-0']) == 3
+    assert len(result['indexes']['network']['bridge']) == 10
+    assert result['unused']['images'] == ['sha256:{0:064x}'.format(i) for i in range(6, 9)]
+    assert result['errors'] == []
+
+
+def test_inventory_snapshot_inspects_requested_objects(connector, engine, config):
+    result = connector.execute(config, 'inventory_snapshot', {'inspect': 'volumes', 'inspect_ids': 'data-1'})
+    inspected = [volume for volume in result['volumes'] if 'inspect' in volume]
+    assert [volume['name'] for volume in inspected] == ['data-1']
+
+
+@pytest.mark.parametrize('entry, base, protocol', [
+    ('10.0.0.5:2375', {'protocol': 'UNIX'}, 'HTTP'),
+    ('tcp://10.0.0.5:2376', {'protocol': 'UNIX', 'ca_cert_path': '/certs/ca.pem'}, 'HTTPS'),
+    ('10.0.0.5', {'protocol': 'HTTPS'}, 'HTTPS'),
+    ('http://10.0.0.5:2375', {'protocol': 'HTTPS'}, 'HTTP'),
+    ({'server_address': '10.0.0.5'}, {'protocol': 'UNIX'}, 'HTTP'),
+    ('unix:///var/run/docker.sock', {'protocol': 'HTTPS'}, 'UNIX'),
+])
+def test_fleet_hosts_get_a_protocol(entry, base, protocol):
+    [(label, overrides)] = fleet._parse_hosts([entry], base)
+    assert overrides['protocol'] == protocol
+
+
+def test_fleet_hosts_are_deduplicated():
+    hosts = fleet._parse_hosts('a:2375, a:2375\nb:2375', {})
+    assert [label for label, _ in hosts] == ['a:2375', 'b:2375']
+
+
+def test_fleet_execute_runs_on_every_host(connector, start, make_config):
+    servers = [start(containers=3), start(containers=5)]
+    config = make_config(servers[0])
+    hosts = ['127.0.0.1:{0}'.format(server.server_address[1]) for server in servers] + ['127.0.0.1:1']
+    result = connector.execute(dict(config, retry_attempts=1), 'fleet_execute',
+                               {'operation': 'list_containers', 'hosts': ','.join(hosts)})
+    assert (result['total'], result['succeeded'], result['failed']) == (3, 2, 1)
+    assert [len(result['hosts'][host]['result']) for host in hosts[:2]] == [3, 5]
+    assert 'Cannot connect' in result['hosts'][hosts[2]]['error']
+
+
+def test_fleet_execute_rejects_itself(connector, config):
+    with pytest.raises(ConnectorError, match='Unsupported operation'):
+        connector.execute(config, 'fleet_execute', {'operation': 'fleet_execute', 'hosts': 'a'})
+
+
+def test_fake_engine_disables_nagle_and_accepts_bursts(engine):
+    assert FakeEngineHandler.disable_nagle_algorithm
+    assert engine.request_queue_size == LISTEN_BACKLOG
+
+    def ping(_):
+        with socket.create_connection(engine.server_address, timeout=10) as sock:
+            sock.sendall(b'GET /_ping HTTP/1.1\r\nHost: docker\r\nConnection: close\r\n\r\n')
+            return sock.recv(64)
+
+    with ThreadPoolExecutor(max_workers=64) as executor:
+        replies = list(executor.map(ping, range(64)))
+    assert all(reply.startswith(b'HTTP/1.1 200') for reply in replies)
+
+
+@pytest.mark.parametrize('unix', [False, True])
+def test_benchmark_runs_operations_concurrently(connector, start, make_config, unix):
+    server = start(unix=unix)
+    row = run_operation(connector, make_config(server), 'list_containers', {'all': True}, 24, 8, False)
+    assert (row['calls'], row['errors']) == (24, 0)
+    assert row['p99_ms'] >= row['p50_ms'] > 0
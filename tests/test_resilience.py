@@ -0,0 +1,74 @@
+"""Token-bucket rate limiting, retries with backoff and the per-daemon circuit breaker"""
+import time
+
+import pytest
+
+from docker_connector import utils
+from docker_connector.connector import ConnectorError
+
+
+def test_token_bucket_queues_callers_behind_the_burst():
+    bucket = utils._TokenBucket(2)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    # The third request waits for a token refilled at 2 per minute
+    assert bucket.reserve() == pytest.approx(30.0, abs=0.1)
+    assert (bucket.requests, bucket.throttled) == (3, 1)
+
+
+def test_rate_limits_are_kept_per_daemon_and_operation_class(engine, make_config):
+    config = make_config(engine, rate_limit=1, heavy_rate_limit=1)
+    other = dict(config, server_address='localhost')
+    assert utils._apply_rate_limit(config, '/containers/json') == 0.0
+    assert utils._apply_rate_limit(config, '/images/create') == 0.0
+    assert utils._apply_rate_limit(other, '/containers/json') == 0.0
+    stats = {(s['daemon'], s['operation_class']): s for s in utils.get_rate_limit_stats()}
+    assert len(stats) == 3
+    assert stats[(utils.daemon_key(config), 'heavy')]['throttled'] == 0
+
+
+def test_server_errors_are_retried(connector, start, make_config):
+    server = start(error_rate=1.0)
+    config = make_config(server, retry_attempts=3)
+    with pytest.raises(ConnectorError, match='internal error'):
+        connector.execute(config, 'list_containers', {})
+    assert server.settings.requests == 3
+
+
+def test_circuit_breaker_opens_and_fails_fast(connector, start, make_config):
+    server = start(error_rate=1.0)
+    config = make_config(server, retry_attempts=1, circuit_breaker_threshold=3, circuit_breaker_reset=60)
+    for _ in range(3):
+        with pytest.raises(ConnectorError):
+            connector.execute(config, 'list_containers', {})
+    assert utils.get_circuit_breaker_state(config)['state'] == 'open'
+    requests = server.settings.requests
+    with pytest.raises(ConnectorError, match='Circuit breaker open'):
+        connector.execute(config, 'list_containers', {})
+    assert server.settings.requests == requests
+
+
+def test_circuit_breaker_closes_after_a_successful_probe(connector, start, make_config):
+    server = start(error_rate=1.0)
+    config = make_config(server, retry_attempts=1, circuit_breaker_threshold=1, circuit_breaker_reset=0.01)
+    with pytest.raises(ConnectorError):
+        connector.execute(config, 'list_containers', {})
+    assert utils.get_circuit_breaker_state(config)['state'] == 'open'
+    server.settings.error_rate = 0.0
+    time.sleep(0.05)
+    assert len(connector.execute(config, 'list_containers', {})) == 50
+    assert utils.get_circuit_breaker_state(config)['state'] == 'closed'
+
+
+def test_unexpected_errors_are_not_retried(connector, engine, config, monkeypatch):
+    calls = []
+
+    def request(*args, **kwargs):
+        calls.append(kwargs['url'])
+        raise ValueError('unexpected')
+
+    monkeypatch.setattr(utils._get_transport(config).session, 'request', request)
+    with pytest.raises(ConnectorError, match='unexpected'):
+        connector.execute(config, 'list_containers', {})
+    assert len(calls) == 1
+    assert utils.get_circuit_breaker_state(config)['consecutive_failures'] == 0
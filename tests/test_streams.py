@@ -0,0 +1,219 @@
+"""Raw-stream demultiplexing, bounded logs with cursors, event streams and pull progress"""
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from docker_connector import jobs, streams, utils
+from docker_connector.connector import ConnectorError
+
+CONTAINER_ID = '{0:064x}'.format(1)
+
+
+def _frame(stream, payload):
+    return struct.pack('>BxxxI', stream, len(payload)) + payload
+
+
+def test_demuxer_reassembles_frames_split_anywhere():
+    body = _frame(1, b'out 1\n') + _frame(2, b'err 1\n') + _frame(1, b'out 2\n')
+    demuxer = streams.RawStreamDemuxer('separate')
+    for i in range(len(body)):
+        demuxer.feed(body[i:i + 1])
+    demuxer.finish()
+    result = demuxer.result()
+    assert result['multiplexed'] and result['frames'] == 3
+    assert (result['stdout'], result['stderr']) == ('out 1\nout 2\n', 'err 1\n')
+    assert result['bytes'] == {'stdin': 0, 'stdout': 12, 'stderr': 6}
+
+
+def test_demuxer_passes_tty_output_through():
+    demuxer = streams.RawStreamDemuxer('interleave')
+    demuxer.feed(b'plain ')
+    demuxer.feed(b'tty output\n')
+    demuxer.finish()
+    assert demuxer.result()['result'] == 'plain tty output\n'
+    assert not demuxer.result()['multiplexed']
+
+
+def test_demuxer_drops_unselected_streams():
+    demuxer = streams.RawStreamDemuxer('stderr only', multiplexed=True)
+    demuxer.feed(_frame(1, b'out\n') + _frame(2, b'err\n'))
+    assert demuxer.result() == {'multiplexed': True, 'frames': 2, 'stderr': 'err\n',
+                                'bytes': {'stdin': 0, 'stdout': 4, 'stderr': 4}}
+
+
+@pytest.mark.parametrize('content_type, expected', [
+    ('application/vnd.docker.multiplexed-stream', True),
+    ('application/vnd.docker.raw-stream', False),
+    ('text/plain', None),
+])
+def test_content_type_tells_whether_a_stream_is_framed(content_type, expected):
+    response = requests.Response()
+    response.headers['Content-Type'] = content_type
+    assert streams.is_multiplexed_response(response) is expected
+
+
+def test_container_logs_are_demultiplexed(connector, start, make_config):
+    server = start(log_lines=8)
+    result = connector.execute(make_config(server), 'container_logs',
+                               {'id': CONTAINER_ID, 'stderr': True, 'demux': 'Separate'})
+    assert result['stdout'].count('\n') == 6 and result['stderr'].count('\n') == 2
+    assert 'line 0 of' in result['stderr']
+
+
+@pytest.mark.parametrize('limit, expected', [({'max_lines': 3}, 'lines'), ({'max_bytes': 100}, 'bytes')])
+def test_log_limits_are_exact(connector, start, make_config, limit, expected):
+    server = start(log_lines=5000)
+    params = dict(limit, id=CONTAINER_ID, stderr=True, timestamps=True)
+    result = connector.execute(make_config(server), 'container_logs', params)
+    assert result['stopped_by'] == expected
+    if expected == 'lines':
+        assert result['result'].count('\n') == 3 and result['result'].endswith('\n')
+    else:
+        assert len(result['result'].encode('utf-8')) == 100
+
+
+class _StallingHandler(BaseHTTPRequestHandler):
+    """Sends the server's (delay, chunk) pairs, then holds the follow stream open without data"""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', self.server.content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        self.wfile.flush()
+        for delay, chunk in self.server.chunks:
+            if self.server.release.wait(delay):
+                return
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+            self.wfile.flush()
+        self.server.release.wait(10)
+
+
+@pytest.fixture
+def stalling():
+    """Start servers that answer every GET with a stream that stalls after the given chunks"""
+    servers = []
+
+    def start_server(content_type, chunks=()):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _StallingHandler)
+        server.daemon_threads = True
+        server.content_type = content_type
+        server.chunks = chunks
+        server.release = threading.Event()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start_server
+    for server in servers:
+        server.release.set()
+        server.shutdown()
+        server.server_close()
+
+
+def test_follow_stops_after_max_duration(connector, make_config, stalling):
+    server = stalling(streams.MULTIPLEXED_CONTENT_TYPE, [(0, _frame(1, b'2024-01-01T00:00:00.000000001Z first\n'))])
+    started = time.monotonic()
+    result = connector.execute(make_config(server), 'container_logs',
+                               {'id': CONTAINER_ID, 'follow': True, 'max_duration': 1})
+    assert time.monotonic() - started < 3
+    assert result['stopped_by'] == 'duration'
+    assert result['result'].endswith('first\n')
+
+
+def test_next_log_cursor_resumes_at_a_partial_line():
+    result = {'result': '2024-01-01T00:00:00.000000005Z done\n2024-01-01T00:00:00.000000007Z cut o'}
+    assert streams.next_log_cursor(result) == '1704067200.000000007'
+    assert result['result'] == '2024-01-01T00:00:00.000000005Z done\n'
+
+
+def test_next_log_cursor_steps_past_the_last_complete_line():
+    result = {'stdout': '2024-01-01T00:00:00.999999999Z a\n', 'stderr': '2024-01-01T00:00:00.000000001Z b\n'}
+    assert streams.next_log_cursor(result) == '1704067201.000000000'
+
+
+def test_incremental_logs_persist_the_cursor(connector, start, make_config):
+    server = start(log_lines=4)
+    config = make_config(server)
+    result = connector.execute(config, 'container_logs', {'id': CONTAINER_ID, 'stderr': True, 'incremental': True})
+    assert result['next_since'] == '1704067200.000000004'
+    assert not result['result'].startswith('2024-')
+    assert utils.get_cursor(config, 'container_logs', CONTAINER_ID) == result['next_since']
+
+
+def test_incremental_events_return_only_new_events(connector, start, make_config):
+    server = start(events=30)
+    config = make_config(server)
+    first = connector.execute(config, 'system_events', {'since': '1700000000', 'incremental': True})
+    assert first['count'] == 30
+    assert first['next_since'] == '1700000029.000000001'
+    second = connector.execute(config, 'system_events', {'incremental': True})
+    assert (second['received'], second['count']) == (30, 0)
+
+
+def test_events_are_filtered_while_streaming(connector, engine, config):
+    result = connector.execute(config, 'system_events', {'since': '1700000000', 'actions': 'exec_start',
+                                                         'max_events': 5})
+    assert result['count'] == 5 and result['stopped_by'] == 'events'
+    assert all(event['Action'].startswith('exec_start') for event in result['events'])
+
+
+@pytest.mark.parametrize('chunks', [[], [(0.6, b'{"Type": "container", "Action": "start", "time": 1700000000}\n')]])
+def test_follow_events_stop_at_max_duration_on_a_quiet_daemon(connector, make_config, stalling, chunks):
+    server = stalling('application/json', chunks)
+    started = time.monotonic()
+    result = connector.execute(make_config(server), 'system_events', {'follow': True, 'max_duration': 1})
+    # One window, not a window plus a full read timeout after the last event
+    assert time.monotonic() - started < 1.4
+    assert (result['count'], result['stopped_by']) == (len(chunks), 'duration')
+
+
+def test_pull_progress_is_reduced_to_layer_state(connector, start, make_config):
+    server = start(pull_layers=3)
+    result = connector.execute(make_config(server), 'pull_image', {'fromImage': 'registry.local/app'})
+    assert result['digest'] == 'sha256:' + 'd' * 64
+    assert result['layers_completed'] == 3
+    assert result['transferred_bytes'] == result['total_bytes'] == 3 * 10485760
+    assert [layer['status'] for layer in result['layers']] == ['Pull complete'] * 3
+
+
+def test_background_pull_is_reported_as_a_job(connector, engine, config):
+    job = connector.execute(config, 'pull_image', {'fromImage': 'registry.local/app', 'wait': False})
+    for _ in range(100):
+        state = connector.execute(config, 'get_image_job', {'job_id': job['job_id']})
+        if state['status'] != 'running':
+            break
+        time.sleep(0.05)
+    assert state['status'] == 'succeeded'
+    assert state['result']['layers_completed'] == 5
+
+
+def test_unknown_job_is_an_error(connector, config):
+    with pytest.raises(ConnectorError):
+        connector.execute(config, 'get_image_job', {'job_id': 'missing'})
+
+
+def test_job_store_forgets_finished_jobs_first(monkeypatch):
+    monkeypatch.setattr(jobs, 'JOB_CACHE_SIZE', 3)
+    release = threading.Event()
+    running = jobs.start_job('pull', 'a', lambda job: release.wait(10))
+    finished = [jobs.start_job('pull', name, lambda job: name) for name in ('b', 'c')]
+    for job in finished:
+        while job.status == 'running':
+            time.sleep(0.01)
+    newer = jobs.start_job('pull', 'd', lambda job: release.wait(10))
+    # The oldest finished job made room; the older running job and the order of the rest are kept
+    assert list(jobs._jobs) == [running.id, finished[1].id, newer.id]
+    jobs.start_job('pull', 'e', lambda job: release.wait(10))
+    with pytest.raises(ConnectorError, match='Too many background jobs'):
+        jobs.start_job('pull', 'f', lambda job: 'f')
+    assert len(jobs._jobs) == 3
+    release.set()
@@ -0,0 +1,144 @@
+"""Pooled transports, Unix sockets, the response cache, single-flight and API version negotiation"""
+import socket
+import threading
+import time
+
+import pytest
+
+from docker_connector import utils
+from docker_connector.connector import ConnectorError
+
+CONTAINER_ID = '{0:064x}'.format(1)
+
+
+def test_requests_reuse_one_pooled_connection(connector, engine, config):
+    for _ in range(5):
+        connector.execute(config, 'inspect_container', {'id': CONTAINER_ID})
+    assert engine.settings.requests == 5
+    assert engine.settings.connections == 1
+
+
+def test_transports_are_keyed_by_config(config):
+    same = utils._get_transport(dict(config))
+    assert utils._get_transport(config) is same
+    assert utils._get_transport(dict(config, username='other', password='secret')) is not same
+
+
+def test_unix_socket_transport(connector, start, make_config):
+    server = start(unix=True, containers=3)
+    config = make_config(server)
+    assert len(connector.execute(config, 'list_containers', {'all': True})) == 3
+    assert connector.execute(config, 'ping', {}) == {'result': 'OK'}
+    assert utils.daemon_key(config) == server.server_address
+
+
+def test_response_cache_serves_repeated_gets(connector, engine, config):
+    config = dict(config, response_cache=True)
+    first = connector.execute(config, 'list_containers', {})
+    requests = engine.settings.requests
+    assert connector.execute(config, 'list_containers', {}) == first
+    assert engine.settings.requests == requests
+
+
+def test_response_cache_is_keyed_by_credentials(connector, engine, config):
+    config = dict(config, response_cache=True, username='alice', password='secret')
+    connector.execute(config, 'list_containers', {})
+    requests = engine.settings.requests
+    connector.execute(dict(config, username='bob'), 'list_containers', {})
+    assert engine.settings.requests == requests + 1
+
+
+def test_writes_invalidate_cached_answers(connector, engine, config):
+    config = dict(config, response_cache=True)
+    bob = dict(config, username='bob', password='secret')
+    connector.execute(config, 'list_containers', {})
+    connector.execute(bob, 'list_containers', {})
+    connector.execute(config, 'start_container', {'id': CONTAINER_ID})
+    requests = engine.settings.requests
+    connector.execute(config, 'list_containers', {})
+    connector.execute(bob, 'list_containers', {})
+    assert engine.settings.requests == requests + 2
+
+
+def test_identical_concurrent_gets_share_one_request(connector, start, make_config):
+    server = start(latency_ms=200)
+    config = make_config(server)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(connector.execute(config, 'list_containers', {})))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 8 and all(result == results[0] for result in results)
+    assert server.settings.requests < 8
+    stats = utils.get_single_flight_stats()[0]
+    assert stats['deduplicated'] == 8 - stats['calls']
+
+
+def test_api_version_is_negotiated_once_per_daemon(connector, engine, config):
+    config = dict(config, api_version='Auto')
+    connector.execute(config, 'ping', {})
+    connector.execute(config, 'list_containers', {})
+    [info] = utils.get_api_version_info(config)
+    assert info['negotiated'] == 'v1.47'
+    assert info['engine_version'] == '27.3.1'
+    assert engine.settings.requests == 3
+
+
+def _unused_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def test_failed_negotiation_does_not_count_against_the_breaker(connector, make_config):
+    port = _unused_port()
+    config = {'server_address': '127.0.0.1', 'port': port, 'protocol': 'HTTP', 'api_version': 'Auto',
+              'rate_limit': 0, 'retry_attempts': 2, 'retry_delay': 0.01, 'circuit_breaker_threshold': 10}
+    with pytest.raises(ConnectorError, match='Cannot connect'):
+        connector.execute(config, 'list_containers', {})
+    # One failure per attempt of the operation's own request, none for /version
+    assert utils.get_circuit_breaker_state(config)['consecutive_failures'] == 2
+    assert utils.get_api_version_info(config)[0]['negotiated'] is None
+
+
+def test_concurrent_cold_calls_negotiate_once(connector, start, make_config):
+    server = start(latency_ms=100)
+    config = make_config(server, api_version='Auto')
+    operations = ['list_containers', 'list_images', 'get_info', 'system_df'] * 2
+    threads = [threading.Thread(target=connector.execute, args=(config, operation, {})) for operation in operations]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert server.settings.routes['/version'] == 1
+    assert utils.get_api_version_info(config)[0]['negotiated'] == 'v1.47'
+
+
+def test_fetches_overlapping_a_write_are_not_cached():
+    cache = utils._ResponseCache(10)
+    generation = cache.current_generation('containers')
+    # A write to the family lands while the GET is still in flight
+    cache.invalidate(('containers', 'system'))
+    cache.put('key', 'containers', 60, b'[]', generation)
+    assert cache.get('key') is None
+    cache.put('key', 'containers', 60, b'[]', cache.current_generation('containers'))
+    assert cache.get('key') == b'[]'
+
+
+def test_gets_after_a_write_do_not_join_an_older_flight(config):
+    key = (utils.daemon_key(config), 'fingerprint', '/containers/json', ())
+    release = threading.Event()
+    results = []
+    leader = threading.Thread(target=lambda: results.append(
+        utils._single_flight(key, 'containers', lambda: release.wait(10) and 'before')))
+    leader.start()
+    while not utils._flights:
+        time.sleep(0.001)
+    utils._invalidate_response_cache(config, '/containers/{0}/start'.format(CONTAINER_ID), 'POST')
+    # Read-your-writes: a fresh request instead of the one started before the write
+    assert utils._single_flight(key, 'containers', lambda: 'after') == 'after'
+    release.set()
+    leader.join()
+    assert results == ['before'] and not utils._flights
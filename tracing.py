@@ -0,0 +1,212 @@
+import json
+import os
+import re
+import threading
+import time
+import contextvars
+from contextlib import contextmanager
+from django.utils.module_loading import import_string
+from connectors.core.connector import get_logger, ConnectorError
+from .constants import LOGGER_NAME
+
+logger = get_logger(LOGGER_NAME)
+
+# Span of the operation running in this context; None when no hook is active
+_current_span = contextvars.ContextVar('docker_connector_span', default=None)
+
+# Hooks registered in code apply to every operation; trace_hooks in the config add more per call
+_hooks_lock = threading.Lock()
+_registered_hooks = ()
+_configured_hooks = {}
+
+# Aliases usable in the trace_hooks config instead of a dotted path
+BUILTIN_HOOKS = {'log': 'LoggingTraceHook'}
+
+# Path segments that are fixed parts of the API rather than object IDs
+STATIC_PATH_SEGMENTS = {'json', 'create', 'prune', 'load', 'get', 'search', 'build', 'events', 'version', 'info',
+                        'df', 'system', 'auth', '_ping', 'commit', 'exec', 'distribution'}
+IMAGE_ACTIONS = ('json', 'history', 'push', 'tag', 'get')
+ID_COLLECTIONS = {'containers': '{id}', 'networks': '{id}', 'volumes': '{name}', 'exec': '{id}',
+                  'plugins': '{name}', 'services': '{id}', 'nodes': '{id}', 'tasks': '{id}', 'secrets': '{id}',
+                  'configs': '{id}'}
+API_VERSION_SEGMENT = re.compile(r'^v\d+\.\d+$')
+
+
+class TraceHook(object):
+    """Receives spans around each connector operation and each HTTP attempt; override what you need.
+
+    Callbacks run synchronously on the calling thread, so they should be quick;
+    an exception raised by a hook is logged and never fails the operation.
+    """
+
+    def span_started(self, span):
+        pass
+
+    def span_ended(self, span):
+        pass
+
+
+class LoggingTraceHook(TraceHook):
+    """Log every finished span as one JSON line (trace_hooks: log)"""
+
+    def span_ended(self, span):
+        logger.info('trace {0}'.format(json.dumps(span.to_dict(), default=str)))
+
+
+class Span(object):
+    """One traced unit of work: kind 'operation' (an execute call) or 'http' (one request attempt)"""
+
+    def __init__(self, kind, name, hooks, parent=None, attributes=None):
+        self.kind = kind
+        self.name = name
+        self.hooks = hooks
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.attributes = attributes or {}
+        self.start_time = time.time()
+        self.duration = None
+        self.error = None
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, **values):
+        """Add to numeric attributes; safe to call from the worker threads of one operation"""
+        with self._lock:
+            for key, value in values.items():
+                self.attributes[key] = self.attributes.get(key, 0) + value
+
+    def to_dict(self):
+        return {'kind': self.kind, 'name': self.name, 'trace_id': self.trace_id, 'span_id': self.span_id,
+                'parent_id': self.parent_id, 'start_time': self.start_time,
+                'duration': None if self.duration is None else round(self.duration, 6),
+                'error': self.error, 'attributes': dict(self.attributes)}
+
+    def _notify(self, callback):
+        for hook in self.hooks:
+            try:
+                getattr(hook, callback)(self)
+            except Exception as e:
+                logger.warning('Trace hook {0}.{1} failed: {2}'.format(type(hook).__name__, callback, str(e)))
+
+    def start(self):
+        self._notify('span_started')
+        return self
+
+    def end(self, error=None):
+        self.duration = time.monotonic() - self._started
+        if error is not None:
+            self.error = str(error)
+        self._notify('span_ended')
+
+
+def register_trace_hook(hook):
+    """Send the spans of every operation in this process to hook"""
+    global _registered_hooks
+    with _hooks_lock:
+        if hook not in _registered_hooks:
+            _registered_hooks = _registered_hooks + (hook,)
+
+
+def unregister_trace_hook(hook):
+    global _registered_hooks
+    with _hooks_lock:
+        _registered_hooks = tuple(h for h in _registered_hooks if h is not hook)
+
+
+def _load_hook(path):
+    path = BUILTIN_HOOKS.get(path.lower(), path)
+    target = globals()[path] if path in globals() else import_string(path)
+    hook = target() if isinstance(target, type) else target
+    if not (hasattr(hook, 'span_started') and hasattr(hook, 'span_ended')):
+        raise ConnectorError('Trace hook {0} must provide span_started and span_ended'.format(path))
+    return hook
+
+
+def _hooks_for(config):
+    """Registered hooks plus the ones named in config trace_hooks (loaded once per distinct setting)"""
+    setting = config.get('trace_hooks') if config else None
+    if not setting:
+        return _registered_hooks
+    hooks = _configured_hooks.get(setting)
+    if hooks is None:
+        try:
+            hooks = tuple(_load_hook(path.strip()) for path in re.split(r'[,\n]', setting) if path.strip())
+        except ImportError as e:
+            raise ConnectorError('Cannot load trace hook from trace_hooks "{0}": {1}'.format(setting, str(e)))
+        with _hooks_lock:
+            hooks = _configured_hooks.setdefault(setting, hooks)
+    return _registered_hooks + hooks
+
+
+def endpoint_template(endpoint):
+    """Endpoint with object IDs and image names replaced by placeholders, e.g. /containers/{id}/json"""
+    parts = [part for part in endpoint.split('?', 1)[0].split('/') if part]
+    if parts and API_VERSION_SEGMENT.match(parts[0]):
+        parts = parts[1:]
+    if len(parts) < 2 or parts[1] in STATIC_PATH_SEGMENTS:
+        return '/' + '/'.join(parts)
+    if parts[0] == 'images':
+        # Image names may contain slashes: everything up to the action is the name
+        if len(parts) > 2 and parts[-1] in IMAGE_ACTIONS:
+            return '/images/{name}/' + parts[-1]
+        return '/images/{name}'
+    if parts[0] in ID_COLLECTIONS:
+        return '/'.join(['', parts[0], ID_COLLECTIONS[parts[0]]] + parts[2:])
+    return '/' + '/'.join(parts)
+
+
+@contextmanager
+def operation_span(config, operation):
+    """Trace an operation when any hook is active; yields the span, or None at almost no cost otherwise"""
+    hooks = _hooks_for(config)
+    if not hooks:
+        yield None
+        return
+    from .utils import daemon_key
+
+    daemon = daemon_key(config) if config else None
+    span = Span('operation', operation, hooks, parent=_current_span.get(),
+                attributes={'operation': operation, 'daemon': daemon, 'http_attempts': 0, 'retries': 0,
+                            'network_seconds': 0.0, 'rate_limit_wait_seconds': 0.0,
+                            'bytes_sent': 0, 'bytes_received': 0}).start()
+    token = _current_span.set(span)
+    error = None
+    try:
+        yield span
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end(error)
+
+
+def start_http_span(daemon, method, endpoint, attempt, rate_limit_wait=0.0):
+    """Open the span of one HTTP attempt inside the current operation span (None when not tracing)"""
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    return Span('http', '{0} {1}'.format(method, endpoint_template(endpoint)), parent.hooks, parent=parent,
+                attributes={'operation': parent.name, 'daemon': daemon, 'method': method,
+                            'endpoint': endpoint_template(endpoint), 'attempt': attempt,
+                            'rate_limit_wait_seconds': rate_limit_wait}).start()
+
+
+def end_http_span(span, status_code=None, error=None, bytes_sent=0, bytes_received=0, retrying=False):
+    """Close an HTTP attempt span and roll its timings up into the operation span"""
+    span.attributes.update({'status_code': status_code, 'bytes_sent': bytes_sent, 'bytes_received': bytes_received,
+                            'retrying': retrying})
+    span.end(error)
+    parent = _current_span.get()
+    if parent is not None:
+        parent.add(http_attempts=1, retries=1 if span.attributes['attempt'] > 1 else 0,
+                   network_seconds=span.duration, bytes_sent=bytes_sent,
+                   rate_limit_wait_seconds=span.attributes['rate_limit_wait_seconds'])
+
+
+def add_received_bytes(count):
+    """Count response body bytes on the operation span once the body has been read (for streams, after the HTTP span)"""
+    parent = _current_span.get()
+    if parent is not None and count:
+        parent.add(bytes_received=count)
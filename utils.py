@@ -1,19 +1,151 @@
 import requests
 import json
 import base64
+import binascii
 import time
 import os
 import re
+import hashlib
+import random
+import socket
+import tempfile
 import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
 from urllib.parse import urlencode
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
 from connectors.core.connector import get_logger, ConnectorError
 from .constants import LOGGER_NAME
+from .metrics import record_request, record_retry, record_rate_limit_wait, record_bytes
+from .tracing import start_http_span, end_http_span, add_received_bytes
+from .codec import loads as decode_json, dumps as encode_json, iter_json_array
 
 logger = get_logger(LOGGER_NAME)
 
-# Rate limiting storage (thread-safe)
+# Rate limiting storage: one token bucket per (daemon, operation class) (thread-safe)
 _rate_limit_lock = threading.Lock()
-_request_times = []
+_rate_limit_buckets = {}
+
+# Endpoints that move large payloads or keep the daemon busy get their own, smaller budget
+HEAVY_ENDPOINT_PATTERN = re.compile(r'^/(?:build|commit|images/(?:create|load|get)|.+/(?:export|get|push|prune|archive))$')
+
+# Retry budgets and circuit breakers, one per daemon (thread-safe)
+_resilience_lock = threading.Lock()
+_retry_budgets = {}
+_circuit_breakers = {}
+
+RETRY_BUDGET_CAP = 10.0  # retries a daemon may bank for bursts of failures
+DEFAULT_RETRY_MAX_DELAY = 30
+DEFAULT_RETRY_BUDGET_RATIO = 0.2
+DEFAULT_CIRCUIT_BREAKER_THRESHOLD = 5
+DEFAULT_CIRCUIT_BREAKER_RESET = 30
+
+# Binary downloads are read in chunks of this size
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+OUTPUT_MODES = ('base64', 'file', 'attachment')
+# Binary uploads are streamed in chunks of this size (base64 input is decoded per chunk)
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Chunk size of incrementally decoded JSON array responses
+DECODE_CHUNK_SIZE = 64 * 1024
+
+# Incremental-read cursors (e.g. last log timestamp per container), mirrored to the temp directory
+_cursor_lock = threading.Lock()
+_cursors = OrderedDict()
+CURSOR_CACHE_SIZE = 10000
+CURSOR_DIR_NAME = 'docker-connector-cursors'
+
+# Opt-in response cache for idempotent GETs, one LRU per daemon (thread-safe)
+_response_cache_lock = threading.Lock()
+_response_caches = {}
+
+DEFAULT_CACHE_TTL = 5
+DEFAULT_CACHE_SIZE = 256
+# Near-static endpoints keep their answers longer unless overridden by cache_ttls
+DEFAULT_CACHE_TTLS = {'version': 300, 'info': 30}
+# Live or streaming data is never cached
+UNCACHEABLE_ENDPOINT_PATTERN = re.compile(r'^/(?:_ping|events|.+/(?:stats|logs|top|wait|attach|export|get|archive))$')
+# Resource families whose cached answers a write to a family may change; unknown families clear the daemon cache
+CACHE_INVALIDATES = {
+    'containers': ('containers', 'networks', 'volumes', 'info', 'system'),
+    'exec': ('exec', 'containers'),
+    'images': ('images', 'info', 'system'),
+    'build': ('images', 'info', 'system'),
+    'commit': ('images', 'containers', 'info', 'system'),
+    'networks': ('networks', 'containers'),
+    'volumes': ('volumes', 'containers', 'system'),
+    'auth': ()
+}
+
+# Identical concurrent GETs in flight, keyed by daemon, config and URL (thread-safe)
+_flight_lock = threading.Lock()
+_flights = {}
+_flight_stats = {}
+
+# API versions negotiated through the version-less /version, one entry per daemon (thread-safe)
+_api_version_lock = threading.Lock()
+_api_versions = {}
+# One negotiation at a time per daemon; callers arriving meanwhile wait for its result
+_api_version_negotiations = {}
+
+DEFAULT_API_VERSION = 'v1.44'
+# Highest API version this connector speaks; the daemon's ApiVersion caps it
+MAX_API_VERSION = '1.52'
+# Seconds before retrying negotiation with a daemon whose /version failed
+API_VERSION_RETRY_INTERVAL = 30
+API_VERSION_TOO_NEW_PATTERN = re.compile(r'client version \S+ is too new', re.IGNORECASE)
+# Minimum API version of optional endpoint variants
+API_FEATURES = {
+    'stats_one_shot': '1.41',
+    'images_get_multiple': '1.25',
+    'image_pull_platform': '1.32',
+    'container_stop_signal': '1.42'
+}
+
+# Default parallelism of operations that fan out over many containers, images or daemons
+DEFAULT_MAX_WORKERS = 10
+
+# Pooled keep-alive transports keyed by connector config fingerprint (thread-safe)
+_transport_lock = threading.Lock()
+_transports = {}
+_last_transport_sweep = [0.0]
+
+# Config keys that affect connection setup; a change in any of them builds a new transport
+TRANSPORT_CONFIG_KEYS = ('server_address', 'port', 'protocol', 'verify_ssl', 'cert_path', 'key_path',
+                         'ca_cert_path', 'username', 'password', 'access_token', 'registry_username',
+                         'registry_password', 'registry_server', 'pool_maxsize')
+DEFAULT_POOL_MAXSIZE = 10
+TRANSPORT_IDLE_TTL = 300  # seconds before an unused transport is closed
+TRANSPORT_SWEEP_INTERVAL = 60
+
+# URL prefix used for requests sent over a local Docker socket (protocol 'unix')
+UNIX_SOCKET_URL_PREFIX = 'http+docker://localhost'
+
+
+def _get_int_config(config, key, default):
+    """Read an integer config value that may arrive as a string from the UI"""
+    value = config.get(key)
+    if value is None or value == '':
+        return default
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        logger.warning('Invalid value for {0}: {1}, using default {2}'.format(key, value, default))
+        return default
+
+
+def _get_float_config(config, key, default):
+    """Read a numeric config value that may arrive as a string from the UI"""
+    value = config.get(key)
+    if value is None or value == '':
+        return default
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        logger.warning('Invalid value for {0}: {1}, using default {2}'.format(key, value, default))
+        return default
 
 
 def _build_auth(config):
@@ -51,7 +183,6 @@ def _build_url(config, endpoint, query_params=None, use_api_version=True):
         server_address = config.get('server_address')
         port = config.get('port', '2376')
         protocol = config.get('protocol', 'https')
-        api_version = config.get('api_version', 'v1.44')
         
         if not server_address:
             raise ConnectorError('Missing required parameter: server_address')
@@ -59,13 +190,20 @@ def _build_url(config, endpoint, query_params=None, use_api_version=True):
             endpoint = '/' + endpoint
         
         # Add API version to endpoint unless explicitly disabled
-        if use_api_version and not endpoint.startswith('/' + api_version):
-            endpoint = '/' + api_version + endpoint
+        if use_api_version:
+            api_version = get_api_version(config)
+            # None while the daemon is unreachable: the unversioned path lets the request fail on its own
+            if api_version and not endpoint.startswith('/' + api_version):
+                endpoint = '/' + api_version + endpoint
         
-        url = '{protocol}://{server_address}:{port}{endpoint}'.format(protocol=protocol.lower(),
-                                                                      server_address=server_address,
-                                                                      port=port,
-                                                                      endpoint=endpoint)
+        if protocol.lower() == 'unix':
+            # server_address is the socket path; the unix adapter connects to it directly
+            url = UNIX_SOCKET_URL_PREFIX + endpoint
+        else:
+            url = '{protocol}://{server_address}:{port}{endpoint}'.format(protocol=protocol.lower(),
+                                                                          server_address=server_address,
+                                                                          port=port,
+                                                                          endpoint=endpoint)
         if query_params:
             # Process query params - JSON parameters must be serialized as JSON strings
             processed_params = {}
@@ -76,7 +214,7 @@ def _build_url(config, endpoint, query_params=None, use_api_version=True):
                         processed_params[k] = v
                     # If value is dict or list, serialize as JSON string
                     elif isinstance(v, (dict, list)):
-                        processed_params[k] = json.dumps(v)
+                        processed_params[k] = encode_json(v)
                     else:
                         processed_params[k] = v
             
@@ -89,26 +227,226 @@ def _build_url(config, endpoint, query_params=None, use_api_version=True):
         raise ConnectorError('Error building URL: {0}'.format(str(e)))
 
 
-def _apply_rate_limit(config):
-    """Apply rate limiting based on configuration (thread-safe)"""
-    rate_limit = config.get('rate_limit', 60)  # requests per minute
-    if rate_limit <= 0:
-        return
+def _parse_api_version(value):
+    """'v1.44' or '1.44' -> (1, 44); None when unparsable"""
+    match = re.match(r'^v?(\d+)\.(\d+)$', str(value or '').strip())
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def _pinned_api_version(config):
+    """The API version set in the config, or None for automatic negotiation"""
+    configured = str(config.get('api_version') or '').strip()
+    if not configured or configured.lower() == 'auto':
+        return None
+    return configured if configured.startswith('v') else 'v' + configured
+
+
+def get_api_version(config):
+    """API version prefix (e.g. 'v1.44') for requests to the configured daemon.
     
+    A version set in the config is used as is. Otherwise the daemon's
+    version-less /version is asked once and the highest version both sides
+    support is cached per daemon. None (unversioned paths) while the daemon
+    cannot be reached.
+    """
+    pinned = _pinned_api_version(config)
+    if pinned:
+        return pinned
+    daemon = daemon_key(config)
+    entry = _api_versions.get(daemon)
+    if _needs_negotiation(entry):
+        with _api_version_lock:
+            negotiation_lock = _api_version_negotiations.setdefault(daemon, threading.Lock())
+        with negotiation_lock:
+            entry = _api_versions.get(daemon)
+            if _needs_negotiation(entry):
+                entry = _negotiate_api_version(config, daemon)
+    return entry['negotiated']
+
+
+def _needs_negotiation(entry):
+    return entry is None or (entry.get('failed') and time.monotonic() - entry['fetched'] >= API_VERSION_RETRY_INTERVAL)
+
+
+def _negotiate_api_version(config, daemon):
+    """Ask /version once, without retries, rate limiting or circuit breaker accounting.
+
+    Only the operation's own request counts against the daemon, so an
+    unreachable daemon costs one failure and one retry sequence per operation.
+    """
+    fetched = time.monotonic()
+    _, breaker = _get_resilience_state(daemon)
+    if breaker.state != 'closed':
+        # The operation's request fails fast on the open breaker (or probes it)
+        return {'negotiated': None, 'api_version': None, 'min_api_version': None, 'engine_version': None,
+                'failed': True, 'fetched': fetched}
+    try:
+        transport = _get_transport(config)
+        response = transport.session.request(method='GET', url=_build_url(config, '/version', use_api_version=False),
+                                             headers=dict(transport.auth_headers, accept='application/json'),
+                                             timeout=min(_get_float_config(config, 'timeout', 60), 10))
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+        logger.warning('API version negotiation with {0} failed, using unversioned paths: {1}'.format(daemon, str(e)))
+        entry = {'negotiated': None, 'api_version': None, 'min_api_version': None, 'engine_version': None,
+                 'failed': True, 'fetched': fetched}
+        with _api_version_lock:
+            _api_versions[daemon] = entry
+        return entry
+    try:
+        if not response.ok:
+            raise ConnectorError('HTTP {0} from /version'.format(response.status_code))
+        version = _decode_json_body(response.content)
+        daemon_max = _parse_api_version(version.get('ApiVersion'))
+        if daemon_max is None:
+            raise ConnectorError('no ApiVersion in /version response')
+        negotiated = min(daemon_max, _parse_api_version(MAX_API_VERSION))
+        daemon_min = _parse_api_version(version.get('MinAPIVersion'))
+        if daemon_min and negotiated < daemon_min:
+            logger.warning('Docker daemon {0} requires API version {1}.{2} or later'.format(daemon, *daemon_min))
+        entry = {'negotiated': 'v{0}.{1}'.format(*negotiated), 'api_version': version.get('ApiVersion'),
+                 'min_api_version': version.get('MinAPIVersion'), 'engine_version': version.get('Version'),
+                 'failed': False, 'fetched': fetched}
+        logger.info('Negotiated Docker API {0} with {1}'.format(entry['negotiated'], daemon))
+    except Exception as e:
+        logger.warning('API version negotiation with {0} failed, using {1}: {2}'.format(
+            daemon, DEFAULT_API_VERSION, str(e)))
+        entry = {'negotiated': DEFAULT_API_VERSION, 'api_version': None, 'min_api_version': None,
+                 'engine_version': None, 'failed': True, 'fetched': fetched}
+    with _api_version_lock:
+        _api_versions[daemon] = entry
+    return entry
+
+
+def _api_version_reachable(daemon):
+    """The daemon answered: drop a negotiation that failed to connect, so the next request negotiates"""
+    entry = _api_versions.get(daemon)
+    if entry is not None and entry['negotiated'] is None:
+        with _api_version_lock:
+            if _api_versions.get(daemon) is entry:
+                del _api_versions[daemon]
+
+
+def _forget_api_version(config):
+    """Drop the negotiated version so the next request negotiates again (e.g. after a daemon downgrade)"""
+    if _pinned_api_version(config):
+        return False
+    with _api_version_lock:
+        return _api_versions.pop(daemon_key(config), None) is not None
+
+
+def supports_api_feature(config, feature):
+    """True when the API version used with this daemon supports an optional endpoint variant from API_FEATURES"""
+    api_version = _parse_api_version(get_api_version(config))
+    return api_version is not None and api_version >= _parse_api_version(API_FEATURES[feature])
+
+
+def get_api_version_info(config=None):
+    """Return the negotiated API versions per daemon, or for the configured daemon"""
+    with _api_version_lock:
+        entries = dict(_api_versions)
+    if config is not None:
+        entries = {daemon: entry for daemon, entry in entries.items() if daemon == daemon_key(config)}
+    return [{'daemon': daemon, 'negotiated': entry['negotiated'], 'api_version': entry['api_version'],
+             'min_api_version': entry['min_api_version'], 'engine_version': entry['engine_version'],
+             'failed': entry['failed']} for daemon, entry in entries.items()]
+
+
+class _ApiVersionTooNew(ConnectorError):
+    """The daemon rejected the negotiated API version as too new"""
+
+
+def daemon_key(config):
+    """Identify a daemon by its address (socket path for unix, host:port otherwise)"""
+    server_address = config.get('server_address')
+    if str(config.get('protocol', 'https')).lower() == 'unix':
+        return server_address
+    return '{0}:{1}'.format(server_address, config.get('port', '2376'))
+
+
+def _operation_class(endpoint):
+    """Classify an endpoint as 'heavy' (pull/build/export/prune...) or 'standard'"""
+    path = endpoint.split('?', 1)[0]
+    if not path.startswith('/'):
+        path = '/' + path
+    return 'heavy' if HEAVY_ENDPOINT_PATTERN.match(path) else 'standard'
+
+
+class _TokenBucket(object):
+    """Token bucket allowing `rate` requests per minute with bursts up to `rate`"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.capacity = float(rate)
+        self.tokens = float(rate)
+        self.fill_rate = rate / 60.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        # Counters reported through get_rate_limit_stats()
+        self.requests = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+
+    def reserve(self):
+        """Take one token and return how many seconds the caller must wait for it (O(1))"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+            self.updated = now
+            self.requests += 1
+            # Tokens may go negative: later callers queue behind earlier reservations
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            wait_time = -self.tokens / self.fill_rate
+            self.throttled += 1
+            self.wait_seconds += wait_time
+            return wait_time
+
+
+def _get_rate_limit_bucket(daemon, op_class, rate):
+    key = (daemon, op_class)
+    bucket = _rate_limit_buckets.get(key)
+    if bucket is not None and bucket.rate == rate:
+        return bucket
     with _rate_limit_lock:
-        current_time = time.time()
-        # Remove requests older than 1 minute
-        global _request_times
-        _request_times = [t for t in _request_times if current_time - t < 60]
-        
-        # If we're at the rate limit, wait
-        if len(_request_times) >= rate_limit:
-            sleep_time = 60 - (current_time - _request_times[0])
-            if sleep_time > 0:
-                logger.info('Rate limit reached, sleeping for {0:.2f} seconds'.format(sleep_time))
-                time.sleep(sleep_time)
-        
-        _request_times.append(current_time)
+        bucket = _rate_limit_buckets.get(key)
+        if bucket is None or bucket.rate != rate:
+            bucket = _TokenBucket(rate)
+            _rate_limit_buckets[key] = bucket
+        return bucket
+
+
+def get_rate_limit_stats():
+    """Return rate limiter counters per daemon and operation class"""
+    with _rate_limit_lock:
+        buckets = list(_rate_limit_buckets.items())
+    return [{'daemon': daemon, 'operation_class': op_class, 'rate_limit': bucket.rate,
+             'requests': bucket.requests, 'throttled': bucket.throttled,
+             'wait_seconds': round(bucket.wait_seconds, 3)}
+            for (daemon, op_class), bucket in buckets]
+
+
+def _apply_rate_limit(config, endpoint='/'):
+    """Apply per-daemon, per-operation-class rate limiting (thread-safe).
+
+    Throttled callers sleep outside of any lock, so one busy daemon or class
+    never stalls requests to another. Returns the time spent waiting.
+    """
+    op_class = _operation_class(endpoint)
+    rate_limit = _get_int_config(config, 'rate_limit', 60)  # requests per minute
+    if op_class == 'heavy':
+        rate_limit = _get_int_config(config, 'heavy_rate_limit', rate_limit)
+    if rate_limit <= 0:
+        return 0.0
+
+    daemon = daemon_key(config)
+    wait_time = _get_rate_limit_bucket(daemon, op_class, rate_limit).reserve()
+    if wait_time > 0:
+        logger.info('Rate limit reached for {0} ({1}), sleeping for {2:.2f} seconds'.format(
+            daemon, op_class, wait_time))
+        record_rate_limit_wait(daemon, wait_time)
+        time.sleep(wait_time)
+    return wait_time
 
 
 def _build_ssl_context(config):
@@ -145,246 +483,1075 @@ def _build_ssl_context(config):
     return verify, cert
 
 
+class _UnixSocketConnection(HTTPConnection):
+    """HTTP connection over an AF_UNIX stream socket"""
+
+    def __init__(self, socket_path, timeout=60):
+        super(_UnixSocketConnection, self).__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def _new_conn(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+
+class _UnixSocketConnectionPool(HTTPConnectionPool):
+    """Keep-alive connection pool bound to a single Docker socket path"""
+
+    def __init__(self, socket_path, maxsize=DEFAULT_POOL_MAXSIZE):
+        super(_UnixSocketConnectionPool, self).__init__('localhost', maxsize=maxsize)
+        self.socket_path = socket_path
+
+    def _new_conn(self):
+        self.num_connections += 1
+        return _UnixSocketConnection(self.socket_path, timeout=self.timeout.connect_timeout)
+
+
+class _UnixSocketAdapter(HTTPAdapter):
+    """Transport adapter that sends every request to a local Docker socket"""
+
+    def __init__(self, socket_path, pool_maxsize=DEFAULT_POOL_MAXSIZE):
+        self.socket_path = socket_path
+        self.unix_pool = _UnixSocketConnectionPool(socket_path, maxsize=pool_maxsize)
+        super(_UnixSocketAdapter, self).__init__(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=0)
+
+    def get_connection(self, url, proxies=None):
+        return self.unix_pool
+
+    def get_connection_with_tls_context(self, request, verify, proxies=None, cert=None):
+        return self.unix_pool
+
+    def request_url(self, request, proxies):
+        # The pool is bound to the socket, so only the path and query are sent
+        return request.path_url
+
+    def close(self):
+        self.unix_pool.close()
+        super(_UnixSocketAdapter, self).close()
+
+
+class _Transport(object):
+    """Keep-alive session for one daemon with prebuilt auth headers and TLS settings"""
+
+    def __init__(self, config):
+        self.auth, self.auth_headers = _build_auth(config)
+        self.registry_headers = _build_registry_auth(config)
+        self.is_unix = str(config.get('protocol', 'https')).lower() == 'unix'
+        pool_maxsize = max(1, _get_int_config(config, 'pool_maxsize', DEFAULT_POOL_MAXSIZE))
+
+        self.session = requests.Session()
+        self.session.auth = self.auth
+        if self.is_unix:
+            # Local socket: no TLS, no proxies
+            self.verify, self.cert = False, None
+            self.session.trust_env = False
+            self.session.mount(UNIX_SOCKET_URL_PREFIX, _UnixSocketAdapter(config.get('server_address'), pool_maxsize))
+        else:
+            self.verify, self.cert = _build_ssl_context(config)
+            self.session.verify = self.verify
+            self.session.cert = self.cert
+            # Retries are handled by the invoke functions, not by urllib3
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=0)
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
+        self.last_used = time.monotonic()
+
+    def close(self):
+        try:
+            self.session.close()
+        except Exception as e:
+            logger.warning('Error closing transport session: {0}'.format(str(e)))
+
+
+def config_fingerprint(config):
+    material = json.dumps([str(config.get(key)) for key in TRANSPORT_CONFIG_KEYS])
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+def _get_transport(config):
+    """Return the pooled transport for this config, building it on first use (thread-safe)"""
+    key = config_fingerprint(config)
+    now = time.monotonic()
+    stale = []
+    with _transport_lock:
+        transport = _transports.get(key)
+        if transport is None:
+            transport = _Transport(config)
+            _transports[key] = transport
+        transport.last_used = now
+
+        # Evict transports that have not been used for a while
+        if now - _last_transport_sweep[0] >= TRANSPORT_SWEEP_INTERVAL:
+            _last_transport_sweep[0] = now
+            for other_key, other in list(_transports.items()):
+                if other is not transport and now - other.last_used > TRANSPORT_IDLE_TTL:
+                    stale.append(_transports.pop(other_key))
+
+    for old in stale:
+        old.close()
+    return transport
+
+
+def close_transports():
+    """Close all pooled transports (e.g. on connector shutdown or config reload)"""
+    with _transport_lock:
+        transports = list(_transports.values())
+        _transports.clear()
+    for transport in transports:
+        transport.close()
+
+
+def _backoff_delay(config, attempt):
+    """Exponential backoff with full jitter: uniform(0, min(max_delay, retry_delay * 2 ** attempt))"""
+    retry_delay = _get_float_config(config, 'retry_delay', 1)
+    max_delay = _get_float_config(config, 'retry_max_delay', DEFAULT_RETRY_MAX_DELAY)
+    return random.uniform(0, min(max_delay, retry_delay * (2 ** attempt)))
+
+
+class _RetryBudget(object):
+    """Retry allowance shared by all requests to one daemon.
+
+    Every request earns `ratio` retries and every retry spends one, so retries
+    stay a bounded fraction of traffic when a daemon keeps failing.
+    """
+
+    def __init__(self):
+        self.tokens = RETRY_BUDGET_CAP
+        self.lock = threading.Lock()
+
+    def deposit(self, ratio):
+        with self.lock:
+            self.tokens = min(RETRY_BUDGET_CAP, self.tokens + ratio)
+
+    def withdraw(self):
+        with self.lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class _CircuitBreaker(object):
+    """Per-daemon circuit breaker: closed -> open after repeated failures -> half_open probe -> closed"""
+
+    def __init__(self, daemon):
+        self.daemon = daemon
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.reset_timeout = DEFAULT_CIRCUIT_BREAKER_RESET
+        self.lock = threading.Lock()
+
+    def before_request(self, config, transport):
+        """Raise ConnectorError while open; let one caller probe /_ping once the reset timeout passed"""
+        if self.state == 'closed':
+            return
+        with self.lock:
+            if self.state == 'closed':
+                return
+            elapsed = time.monotonic() - self.opened_at
+            probe = self.state == 'open' and elapsed >= self.reset_timeout
+            if probe:
+                self.state = 'half_open'
+        if not probe:
+            raise ConnectorError('Circuit breaker open for Docker daemon {0}: failing fast, retry in {1:.1f} seconds'.format(
+                self.daemon, max(0.0, self.reset_timeout - elapsed)))
+
+        if _probe_daemon(config, transport):
+            logger.info('Circuit breaker for {0} closed after successful probe'.format(self.daemon))
+            self.record_success()
+        else:
+            self._open(config)
+            raise ConnectorError('Circuit breaker open for Docker daemon {0}: probe to /_ping failed'.format(
+                self.daemon))
+
+    def record_success(self):
+        if self.state == 'closed' and self.failures == 0:
+            return
+        with self.lock:
+            self.state = 'closed'
+            self.failures = 0
+
+    def record_failure(self, config):
+        threshold = _get_int_config(config, 'circuit_breaker_threshold', DEFAULT_CIRCUIT_BREAKER_THRESHOLD)
+        with self.lock:
+            self.failures += 1
+            trip = threshold > 0 and self.state == 'closed' and self.failures >= threshold
+        if trip:
+            logger.warning('Circuit breaker for {0} opened after {1} consecutive failures'.format(
+                self.daemon, self.failures))
+            self._open(config)
+
+    def _open(self, config):
+        with self.lock:
+            self.state = 'open'
+            self.opened_at = time.monotonic()
+            self.reset_timeout = _get_float_config(config, 'circuit_breaker_reset', DEFAULT_CIRCUIT_BREAKER_RESET)
+
+    def snapshot(self):
+        with self.lock:
+            retry_in = 0.0
+            if self.state == 'open':
+                retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+            return {'daemon': self.daemon, 'state': self.state, 'consecutive_failures': self.failures,
+                    'retry_in_seconds': round(retry_in, 1)}
+
+
+def _get_resilience_state(daemon):
+    """Return the (retry budget, circuit breaker) pair for a daemon"""
+    budget = _retry_budgets.get(daemon)
+    breaker = _circuit_breakers.get(daemon)
+    if budget is not None and breaker is not None:
+        return budget, breaker
+    with _resilience_lock:
+        budget = _retry_budgets.setdefault(daemon, _RetryBudget())
+        breaker = _circuit_breakers.setdefault(daemon, _CircuitBreaker(daemon))
+        return budget, breaker
+
+
+def get_circuit_breaker_state(config=None):
+    """Return circuit breaker state for the configured daemon, or for all known daemons"""
+    if config:
+        _, breaker = _get_resilience_state(daemon_key(config))
+        return breaker.snapshot()
+    with _resilience_lock:
+        breakers = list(_circuit_breakers.values())
+    return [breaker.snapshot() for breaker in breakers]
+
+
+def _probe_daemon(config, transport):
+    """Half-open probe: single GET /_ping without retries or rate limiting"""
+    try:
+        url = _build_url(config, '/_ping', use_api_version=False)
+        timeout = min(_get_float_config(config, 'timeout', 60), 10)
+        response = transport.session.request(method='GET', url=url, headers=dict(transport.auth_headers),
+                                             timeout=timeout)
+        return response.ok
+    except Exception as e:
+        logger.warning('Circuit breaker probe to {0} failed: {1}'.format(daemon_key(config), str(e)))
+        return False
+
+
+def _should_retry(budget, daemon, attempt, retry_attempts):
+    """Return True when another attempt is allowed by the attempt count and the shared retry budget"""
+    if attempt >= retry_attempts - 1:
+        return False
+    if not budget.withdraw():
+        logger.warning('Retry budget exhausted for {0}, not retrying'.format(daemon))
+        return False
+    return True
+
+
+def _counting_body(body, sent):
+    """Iterate a stream body, adding the size of each chunk to sent[0]"""
+    for chunk in body:
+        sent[0] += len(chunk)
+        yield chunk
+
+
+def _record_received(config, response):
+    """Count the body bytes read from a response, once, when the caller is done with it; returns the count"""
+    if getattr(response, '_received_recorded', False):
+        return 0
+    response._received_recorded = True
+    try:
+        received = response.raw.tell()
+    except Exception:
+        return 0
+    record_bytes(daemon_key(config), received=received)
+    add_received_bytes(received)
+    return received
+
+
+def _send_with_retries(config, transport, endpoint, method, url, payload, headers, timeout,
+                       log_label='endpoint', stream=False, rate_limit_wait=0.0):
+    """Send a request with backoff retries, the shared retry budget and the daemon circuit breaker"""
+    retry_attempts = max(1, _get_int_config(config, 'retry_attempts', 3))
+    daemon = daemon_key(config)
+    budget, breaker = _get_resilience_state(daemon)
+    budget.deposit(_get_float_config(config, 'retry_budget_ratio', DEFAULT_RETRY_BUDGET_RATIO))
+    response = None
+
+    for attempt in range(retry_attempts):
+        breaker.before_request(config, transport)
+        sent = [len(payload) if isinstance(payload, (bytes, bytearray, str)) else 0]
+        data = _counting_body(payload, sent) if _is_stream_body(payload) else payload
+        span = start_http_span(daemon, method, endpoint, attempt + 1, rate_limit_wait if attempt == 0 else 0.0)
+        started = time.monotonic()
+        try:
+            response = transport.session.request(method=method, url=url, data=data,
+                                                 headers=headers, timeout=timeout, stream=stream)
+        except requests.exceptions.Timeout:
+            record_request(daemon, method, 'timeout', time.monotonic() - started)
+            record_bytes(daemon, sent=sent[0])
+            breaker.record_failure(config)
+            retry = _should_retry(budget, daemon, attempt, retry_attempts)
+            if span is not None:
+                end_http_span(span, error='timeout', bytes_sent=sent[0], retrying=retry)
+            if retry:
+                record_retry(daemon, 'timeout')
+                delay = _backoff_delay(config, attempt)
+                logger.warning('Timeout connecting to {0}, retrying in {1:.2f} seconds (attempt {2}/{3})'.format(
+                    endpoint, delay, attempt + 1, retry_attempts))
+                time.sleep(delay)
+                continue
+            logger.error('Timeout connecting to {0}'.format(endpoint))
+            raise ConnectorError('Timeout connecting to Docker API: {0}'.format(endpoint))
+        except requests.exceptions.ConnectionError:
+            record_request(daemon, method, 'connection_error', time.monotonic() - started)
+            record_bytes(daemon, sent=sent[0])
+            breaker.record_failure(config)
+            retry = _should_retry(budget, daemon, attempt, retry_attempts)
+            if span is not None:
+                end_http_span(span, error='connection error', bytes_sent=sent[0], retrying=retry)
+            if retry:
+                record_retry(daemon, 'connection_error')
+                delay = _backoff_delay(config, attempt)
+                logger.warning('Connection error to {0}, retrying in {1:.2f} seconds (attempt {2}/{3})'.format(
+                    endpoint, delay, attempt + 1, retry_attempts))
+                time.sleep(delay)
+                continue
+            logger.error('Connection error to {0}'.format(endpoint))
+            raise ConnectorError('Cannot connect to Docker API: {0}'.format(endpoint))
+        except ConnectorError as e:
+            # Raised while producing the request body (e.g. invalid upload data); retrying won't help
+            if span is not None:
+                end_http_span(span, error=e, bytes_sent=sent[0])
+            raise
+        except Exception as e:
+            # Not a transport failure (e.g. an invalid URL or header): retrying won't help and the daemon is not at fault
+            record_request(daemon, method, 'error', time.monotonic() - started)
+            record_bytes(daemon, sent=sent[0])
+            if span is not None:
+                end_http_span(span, error=e, bytes_sent=sent[0])
+            logger.exception('Error invoking {0}: {1}'.format(log_label, endpoint))
+            raise ConnectorError('Error invoking {0}: {1}'.format(endpoint, str(e)))
+
+        record_request(daemon, method, response.status_code, time.monotonic() - started)
+        record_bytes(daemon, sent=sent[0])
+        received = _record_received(config, response) if not stream else 0
+
+        # Only server errors count against the daemon; 4xx means it is healthy
+        if response.status_code >= 500:
+            breaker.record_failure(config)
+        else:
+            breaker.record_success()
+            _api_version_reachable(daemon)
+
+        # Success or client error (4xx): don't retry; server errors (5xx) retry if attempts and budget allow
+        retry = response.status_code >= 500 and _should_retry(budget, daemon, attempt, retry_attempts)
+        if span is not None:
+            end_http_span(span, status_code=response.status_code, bytes_sent=sent[0], bytes_received=received,
+                          retrying=retry)
+        if not retry:
+            break
+        record_retry(daemon, 'server_error')
+        delay = _backoff_delay(config, attempt)
+        logger.warning('Server error {0}, retrying in {1:.2f} seconds (attempt {2}/{3})'.format(
+            response.status_code, delay, attempt + 1, retry_attempts))
+        response.close()
+        time.sleep(delay)
+
+    if response is None:
+        raise ConnectorError('No response received from Docker API after {0} attempts'.format(retry_attempts))
+    return response
+
+
+def _endpoint_family(endpoint):
+    """Resource family of an endpoint, e.g. 'containers' for /containers/{id}/json"""
+    return endpoint.split('?', 1)[0].lstrip('/').split('/', 1)[0]
+
+
+class _ResponseCache(object):
+    """TTL + LRU cache of successful GET response bodies of one daemon, keyed by (config fingerprint, URL)"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Bumped by invalidate(); a fetch that overlapped a write must not store what it read
+        self.generation = 0
+        self.family_generations = {}
+
+    def current_generation(self, family):
+        """Token taken before a fetch and handed back to put()"""
+        with self.lock:
+            return self.generation, self.family_generations.get(family, 0)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, family, ttl, content, generation):
+        with self.lock:
+            if generation != (self.generation, self.family_generations.get(family, 0)):
+                return
+            self.entries[key] = (time.monotonic() + ttl, family, content)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, families=None):
+        """Drop the entries of the given families (all entries when None)"""
+        with self.lock:
+            if families is None:
+                self.generation += 1
+            else:
+                for family in families:
+                    self.family_generations[family] = self.family_generations.get(family, 0) + 1
+            stale = [key for key, entry in self.entries.items() if families is None or entry[1] in families]
+            for key in stale:
+                del self.entries[key]
+            self.invalidations += len(stale)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {'entries': len(self.entries), 'max_entries': self.max_entries, 'hits': self.hits,
+                    'misses': self.misses, 'hit_ratio': round(self.hits / float(lookups), 3) if lookups else None,
+                    'evictions': self.evictions, 'invalidations': self.invalidations}
+
+
+def _cache_ttl(config, endpoint):
+    """TTL in seconds for caching GET `endpoint` with this config, 0 when not cached"""
+    if not config.get('response_cache') or str(config.get('response_cache')).lower() in ('false', '0'):
+        return 0
+    path = endpoint.split('?', 1)[0]
+    if UNCACHEABLE_ENDPOINT_PATTERN.match(path):
+        return 0
+    family = _endpoint_family(path)
+    overrides = config.get('cache_ttls') or {}
+    if isinstance(overrides, str):
+        try:
+            overrides = json.loads(overrides)
+        except ValueError:
+            logger.warning('Invalid JSON for cache_ttls, using default TTLs')
+            overrides = {}
+    # Path prefixes (e.g. "/containers/json") win over families (e.g. "containers")
+    for prefix in sorted((key for key in overrides if key.startswith('/')), key=len, reverse=True):
+        if path.startswith(prefix):
+            return float(overrides[prefix])
+    if family in overrides:
+        return float(overrides[family])
+    return float(DEFAULT_CACHE_TTLS.get(family, _get_float_config(config, 'cache_ttl', DEFAULT_CACHE_TTL)))
+
+
+def _get_response_cache(config):
+    daemon = daemon_key(config)
+    max_entries = max(1, _get_int_config(config, 'cache_size', DEFAULT_CACHE_SIZE))
+    cache = _response_caches.get(daemon)
+    if cache is not None:
+        cache.max_entries = max_entries
+        return cache
+    with _response_cache_lock:
+        return _response_caches.setdefault(daemon, _ResponseCache(max_entries))
+
+
+def _invalidate_response_cache(config, endpoint, method):
+    """Write-through invalidation: drop cached answers a non-GET request may have changed"""
+    if method in ('GET', 'HEAD'):
+        return
+    families = CACHE_INVALIDATES.get(_endpoint_family(endpoint))
+    if families == ():
+        return
+    daemon = daemon_key(config)
+    # Callers after this write must not join a GET that may have been answered before it
+    _detach_flights(daemon, families)
+    cache = _response_caches.get(daemon)
+    if cache is not None:
+        cache.invalidate(families)
+
+
+def _decode_json_body(content):
+    """Decode a JSON response body, falling back to {'result': text} like for plain-text endpoints"""
+    try:
+        return decode_json(content)
+    except ValueError:
+        return {'result': content.decode('utf-8', errors='replace')}
+
+
+def get_cache_stats():
+    """Return response cache counters per daemon"""
+    with _response_cache_lock:
+        caches = list(_response_caches.items())
+    return [dict(daemon=daemon, **cache.stats()) for daemon, cache in caches]
+
+
+def clear_response_cache(config=None):
+    """Drop cached responses of the configured daemon, or of all daemons"""
+    with _response_cache_lock:
+        caches = list(_response_caches.values()) if config is None else \
+            [c for c in [_response_caches.get(daemon_key(config))] if c is not None]
+    for cache in caches:
+        cache.invalidate()
+
+
+class _Flight(object):
+    """One in-flight request shared by every concurrent caller with the same key"""
+
+    def __init__(self, family):
+        self.family = family
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _single_flight_enabled(config):
+    value = config.get('single_flight', True)
+    return value is None or value == '' or str(value).lower() not in ('false', '0', 'no', 'off')
+
+
+def _single_flight(key, family, func):
+    """Run func() once for concurrent callers with the same key; followers wait for and share its result"""
+    daemon = key[0]
+    with _flight_lock:
+        stats = _flight_stats.setdefault(daemon, {'calls': 0, 'deduplicated': 0})
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _Flight(family)
+            _flights[key] = flight
+            stats['calls'] += 1
+        else:
+            stats['deduplicated'] += 1
+    
+    if not leader:
+        flight.done.wait()
+        if isinstance(flight.error, ConnectorError):
+            # Same error type for every caller (e.g. so followers also retry after a version renegotiation)
+            raise type(flight.error)(str(flight.error))
+        if flight.error is not None:
+            raise ConnectorError(str(flight.error))
+        return flight.result
+    
+    try:
+        flight.result = func()
+        return flight.result
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _flight_lock:
+            if _flights.get(key) is flight:
+                del _flights[key]
+        flight.done.set()
+
+
+def _detach_flights(daemon, families=None):
+    """Let later callers start their own request instead of joining flights of the given families"""
+    with _flight_lock:
+        stale = [key for key, flight in _flights.items()
+                 if key[0] == daemon and (families is None or flight.family in families)]
+        for key in stale:
+            del _flights[key]
+
+
+def get_single_flight_stats():
+    """Return per-daemon counts of coalesced GET calls and of callers that shared another caller's call"""
+    with _flight_lock:
+        return [dict(daemon=daemon, in_flight=sum(1 for key in _flights if key[0] == daemon), **stats)
+                for daemon, stats in _flight_stats.items()]
+
+
 def invoke_rest_endpoint(config, endpoint, method='GET', data=None, headers=None,
                          query_params=None, timeout=None, use_registry_auth=False,
-                         use_api_version=True):
+                         use_api_version=True, response_handler=None):
+    """
+    Invoke a Docker API endpoint and return its decoded JSON (or {'result': text}).
+    When `response_handler` is given, the response is streamed and the handler is
+    called with the successful response to consume it incrementally.
+    """
+    try:
+        return _invoke_rest_endpoint(config, endpoint, method, data, headers, query_params, timeout,
+                                     use_registry_auth, use_api_version, response_handler)
+    except _ApiVersionTooNew:
+        # The daemon changed since negotiation; the version was re-negotiated, so retry once
+        return _invoke_rest_endpoint(config, endpoint, method, data, headers, query_params, timeout,
+                                     use_registry_auth, use_api_version, response_handler)
+
+
+def _invoke_rest_endpoint(config, endpoint, method, data, headers, query_params, timeout,
+                          use_registry_auth, use_api_version, response_handler):
+    cache = None
+    cache_key = None
+    cache_ttl = 0
+    cache_generation = None
+    flight_key = None
+    try:
+        url = _build_url(config, endpoint, query_params, use_api_version=use_api_version)
+        if method == 'GET' and response_handler is None and not use_registry_auth:
+            # Serve idempotent GETs from the opt-in response cache before spending a rate-limit token
+            cache_ttl = _cache_ttl(config, endpoint)
+            if cache_ttl > 0:
+                cache = _get_response_cache(config)
+                # Configs with other credentials or TLS settings may be answered differently by the same daemon
+                cache_key = (config_fingerprint(config), url)
+                content = cache.get(cache_key)
+                if content is not None:
+                    return _decode_json_body(content)
+                cache_generation = cache.current_generation(_endpoint_family(endpoint))
+            if _single_flight_enabled(config):
+                flight_key = (daemon_key(config), config_fingerprint(config), url,
+                              tuple(sorted((headers or {}).items())))
+    except Exception as e:
+        logger.error('Error in invoke_rest_endpoint setup: {0}'.format(str(e)))
+        raise ConnectorError('Error setting up request: {0}'.format(str(e)))
+    
+    if flight_key is not None:
+        # Identical concurrent GETs share one in-flight call; each caller decodes its own copy
+        content = _single_flight(flight_key, _endpoint_family(endpoint), lambda: _send_rest_request(
+            config, endpoint, method, url, data, headers, timeout, use_registry_auth).content)
+        if cache is not None:
+            cache.put(cache_key, _endpoint_family(endpoint), cache_ttl, content, cache_generation)
+        return _decode_json_body(content)
+    
+    response = _send_rest_request(config, endpoint, method, url, data, headers, timeout, use_registry_auth,
+                                  stream=response_handler is not None)
+    if response_handler is not None:
+        try:
+            return response_handler(response)
+        finally:
+            _record_received(config, response)
+            response.close()
+    
+    if cache is not None:
+        cache.put(cache_key, _endpoint_family(endpoint), cache_ttl, response.content, cache_generation)
+        return _decode_json_body(response.content)
+    # Some Docker endpoints return plain text, others json
+    return _decode_json_body(response.content)
+
+
+def _send_rest_request(config, endpoint, method, url, data, headers, timeout, use_registry_auth, stream=False):
+    """Send a JSON API request and return the successful response, raising ConnectorError otherwise"""
     try:
         # Apply rate limiting
-        _apply_rate_limit(config)
+        rate_limit_wait = _apply_rate_limit(config, endpoint)
         
         timeout = timeout or config.get('timeout', 60)
         default_headers = {'accept': 'application/json'}
-        auth, auth_headers = _build_auth(config)
+        # Pooled session with prebuilt auth and SSL settings
+        transport = _get_transport(config)
+        auth_headers = dict(transport.auth_headers)
         
         if headers is None:
             headers = {}
         
         # Add registry authentication if needed
         if use_registry_auth:
-            registry_headers = _build_registry_auth(config)
-            auth_headers.update(registry_headers)
+            auth_headers.update(transport.registry_headers)
         
         # Merge headers with precedence to explicit headers
         merged_headers = {**default_headers, **auth_headers, **headers}
-
-        # Build SSL context
-        verify, cert = _build_ssl_context(config)
-        
-        url = _build_url(config, endpoint, query_params, use_api_version=use_api_version)
     except Exception as e:
         logger.error('Error in invoke_rest_endpoint setup: {0}'.format(str(e)))
         raise ConnectorError('Error setting up request: {0}'.format(str(e)))
     
-    # Retry logic
-    retry_attempts = config.get('retry_attempts', 3)
-    retry_delay = config.get('retry_delay', 1)
-    response = None
+    payload = None
+    if data is not None:
+        payload = encode_json(data)
+        if 'content-type' not in {k.lower() for k in merged_headers.keys()}:
+            merged_headers['Content-Type'] = 'application/json'
+
+    try:
+        response = _send_with_retries(config, transport, endpoint, method, url, payload, merged_headers, timeout,
+                                      stream=stream, rate_limit_wait=rate_limit_wait)
+    finally:
+        _invalidate_response_cache(config, endpoint, method)
+
+    if response.ok:
+        return response
     
-    for attempt in range(retry_attempts):
+    content = response.text
+    _record_received(config, response)
+    logger.error('HTTP {0}: {1}'.format(response.status_code, content))
+    
+    # Specific error handling based on HTTP status codes
+    if response.status_code == 400:
+        if API_VERSION_TOO_NEW_PATTERN.search(content) and _forget_api_version(config):
+            raise _ApiVersionTooNew('Bad Request: {0}'.format(content))
+        raise ConnectorError('Bad Request: {0}'.format(content))
+    elif response.status_code == 401:
+        raise ConnectorError('Unauthorized: Check your authentication credentials')
+    elif response.status_code == 403:
+        raise ConnectorError('Forbidden: Insufficient permissions for this operation')
+    elif response.status_code == 404:
+        raise ConnectorError('Resource not found: {0}'.format(endpoint))
+    elif response.status_code == 409:
+        raise ConnectorError('Conflict: {0}'.format(content))
+    elif response.status_code == 500:
+        raise ConnectorError('Docker Engine internal error: {0}'.format(content))
+    elif response.status_code == 503:
+        raise ConnectorError('Docker Engine unavailable: {0}'.format(content))
+    else:
+        raise ConnectorError('HTTP {0}: {1}'.format(response.status_code, content))
+
+
+def get_tmp_dir():
+    """FortiSOAR temp directory (TMP_FILE_ROOT) with a fallback to the system temp directory"""
+    try:
+        from django.conf import settings
+        return getattr(settings, 'TMP_FILE_ROOT', None) or tempfile.gettempdir()
+    except Exception:
+        return tempfile.gettempdir()
+
+
+def write_atomically(path, write):
+    """Create path through write(file) on a temporary sibling that then replaces it.
+
+    Readers in other worker processes see the old file or the new one, never
+    a partial write. Errors propagate after the temporary file is removed.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = '{0}.{1}.{2}.tmp'.format(path, os.getpid(), threading.get_ident())
+    try:
+        with open(tmp_path, 'w') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
         try:
-            payload = None
-            if data is not None:
-                payload = json.dumps(data)
-                if 'content-type' not in {k.lower() for k in merged_headers.keys()}:
-                    merged_headers['Content-Type'] = 'application/json'
-            
-            response = requests.request(method=method, url=url, auth=auth, verify=verify, cert=cert,
-                                        data=payload, headers=merged_headers, timeout=timeout)
-            
-            # If successful, break out of retry loop
-            if response.ok:
-                break
-                
-            # If it's a client error (4xx), don't retry
-            if 400 <= response.status_code < 500:
-                break
-                
-            # For server errors (5xx), retry if we have attempts left
-            if attempt < retry_attempts - 1:
-                logger.warning('Server error {0}, retrying in {1} seconds (attempt {2}/{3})'.format(
-                    response.status_code, retry_delay, attempt + 1, retry_attempts))
-                time.sleep(retry_delay)
-                continue
-                
-        except requests.exceptions.Timeout:
-            if attempt < retry_attempts - 1:
-                logger.warning('Timeout connecting to {0}, retrying in {1} seconds (attempt {2}/{3})'.format(
-                    endpoint, retry_delay, attempt + 1, retry_attempts))
-                time.sleep(retry_delay)
-                continue
-            else:
-                logger.error('Timeout connecting to {0}'.format(endpoint))
-                raise ConnectorError('Timeout connecting to Docker API: {0}'.format(endpoint))
-        except requests.exceptions.ConnectionError:
-            if attempt < retry_attempts - 1:
-                logger.warning('Connection error to {0}, retrying in {1} seconds (attempt {2}/{3})'.format(
-                    endpoint, retry_delay, attempt + 1, retry_attempts))
-                time.sleep(retry_delay)
-                continue
-            else:
-                logger.error('Connection error to {0}'.format(endpoint))
-                raise ConnectorError('Cannot connect to Docker API: {0}'.format(endpoint))
-        except Exception as e:
-            logger.exception('Error invoking endpoint: {0}'.format(endpoint))
-            if attempt == retry_attempts - 1:
-                raise ConnectorError('Error invoking {0}: {1}'.format(endpoint, str(e)))
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _iter_download(response, endpoint, max_size):
+    """Yield the response body in chunks, failing once it grows beyond max_size bytes (0 = unlimited)"""
+    content_length = response.headers.get('Content-Length')
+    if max_size and content_length and content_length.isdigit() and int(content_length) > max_size:
+        raise ConnectorError('Response from {0} is {1} bytes, exceeding the maximum download size of {2} bytes'.format(
+            endpoint, content_length, max_size))
+    received = 0
+    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+        if not chunk:
             continue
+        received += len(chunk)
+        if max_size and received > max_size:
+            raise ConnectorError('Response from {0} exceeds the maximum download size of {1} bytes'.format(
+                endpoint, max_size))
+        yield chunk
 
-    if response is None:
-        raise ConnectorError('No response received from Docker API after {0} attempts'.format(retry_attempts))
 
-    if response.ok:
-        # Some Docker endpoints return plain text, others json
+def iter_json_lines(response):
+    """Incrementally decode a newline-delimited JSON (NDJSON) response body, one object at a time"""
+    for line in response.iter_lines(chunk_size=8192):
+        line = line.strip()
+        if not line:
+            continue
         try:
-            return response.json()
+            yield decode_json(line)
         except ValueError:
-            return {'result': response.text}
-    else:
-        content = response.text
-        logger.error('HTTP {0}: {1}'.format(response.status_code, content))
-        
-        # Specific error handling based on HTTP status codes
-        if response.status_code == 400:
-            raise ConnectorError('Bad Request: {0}'.format(content))
-        elif response.status_code == 401:
-            raise ConnectorError('Unauthorized: Check your authentication credentials')
-        elif response.status_code == 403:
-            raise ConnectorError('Forbidden: Insufficient permissions for this operation')
-        elif response.status_code == 404:
-            raise ConnectorError('Resource not found: {0}'.format(endpoint))
-        elif response.status_code == 409:
-            raise ConnectorError('Conflict: {0}'.format(content))
-        elif response.status_code == 500:
-            raise ConnectorError('Docker Engine internal error: {0}'.format(content))
-        elif response.status_code == 503:
-            raise ConnectorError('Docker Engine unavailable: {0}'.format(content))
-        else:
-            raise ConnectorError('HTTP {0}: {1}'.format(response.status_code, content))
+            logger.warning('Skipping malformed JSON line in streamed response: {0}'.format(line[:200]))
+
+
+def json_array_handler(transform):
+    """Response handler that decodes a JSON array incrementally and keeps transform(item) unless it is None"""
+    def handler(response):
+        items = []
+        try:
+            for item in iter_json_array(response.iter_content(chunk_size=DECODE_CHUNK_SIZE)):
+                item = transform(item)
+                if item is not None:
+                    items.append(item)
+        except ValueError as e:
+            raise ConnectorError('Invalid JSON array in Docker API response: {0}'.format(str(e)))
+        return items
+    return handler
+
+
+def _upload_attachment(file_path, name):
+    """Upload a file from the FortiSOAR temp directory as an attachment"""
+    try:
+        from connectors.cyops_utilities.builtins import upload_file_to_cyops
+    except ImportError:
+        raise ConnectorError('Attachment output requires the FortiSOAR cyops_utilities connector')
+    return upload_file_to_cyops(file_path=os.path.basename(file_path), filename=name, name=name,
+                                create_attachment=True)
+
+
+def _save_download(response, endpoint, max_size, output_mode, file_name=None):
+    """Stream the response body to a temp file (or attachment) and return a reference with size and SHA-256"""
+    file_name = os.path.basename(file_name or '') or 'docker-download.tar'
+    fd, file_path = tempfile.mkstemp(prefix='docker-', suffix='-' + file_name, dir=get_tmp_dir())
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as output:
+            for chunk in _iter_download(response, endpoint, max_size):
+                output.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+    except Exception:
+        os.remove(file_path)
+        raise
+
+    result = {
+        'file_path': file_path,
+        'file_name': file_name,
+        'content_type': response.headers.get('Content-Type', 'application/octet-stream'),
+        'status_code': response.status_code,
+        'size': size,
+        'sha256': digest.hexdigest()
+    }
+    if output_mode == 'attachment':
+        try:
+            result['attachment'] = _upload_attachment(file_path, file_name)
+        finally:
+            os.remove(file_path)
+        del result['file_path']
+    return result
+
+
+class _UploadBody(object):
+    """Re-iterable request body streamed from a file or decoded from base64 text chunk by chunk.
+
+    Having no length, requests sends it with chunked transfer encoding; being
+    re-iterable, it can be replayed when a request is retried.
+    """
+
+    def __init__(self, file_path=None, base64_data=None, remove_after=False, operation_name='upload'):
+        self.file_path = file_path
+        self.base64_data = base64_data
+        self.remove_after = remove_after
+        self.operation_name = operation_name
+
+    def __iter__(self):
+        if self.file_path:
+            return self._iter_file()
+        return self._iter_base64()
+
+    def _iter_file(self):
+        with open(self.file_path, 'rb') as source:
+            while True:
+                chunk = source.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+    def _iter_base64(self):
+        leftover = ''
+        step = UPLOAD_CHUNK_SIZE // 3 * 4
+        try:
+            for start in range(0, len(self.base64_data), step):
+                text = leftover + re.sub(r'[^A-Za-z0-9+/=]', '', self.base64_data[start:start + step])
+                # Only decode complete 4-character quanta; carry the rest to the next chunk
+                cut = len(text) - len(text) % 4
+                leftover = text[cut:]
+                if cut:
+                    yield base64.b64decode(text[:cut])
+            if leftover:
+                yield base64.b64decode(leftover)
+        except (binascii.Error, ValueError) as e:
+            raise ConnectorError('Invalid base64 archive for {0}: {1}'.format(self.operation_name, str(e)))
+
+    def close(self):
+        if self.remove_after and self.file_path:
+            try:
+                os.remove(self.file_path)
+            except OSError as e:
+                logger.warning('Error removing temp file {0}: {1}'.format(self.file_path, str(e)))
+
+
+def resolve_tmp_path(path, operation_name, param_name='file_path', directory=False):
+    """Resolve a file (or directory) name or path inside the FortiSOAR temp directory"""
+    tmp_dir = os.path.realpath(get_tmp_dir())
+    resolved = os.path.realpath(os.path.join(tmp_dir, path))
+    if os.path.commonpath([tmp_dir, resolved]) != tmp_dir:
+        raise ConnectorError('{0} for {1} must be located in {2}'.format(param_name, operation_name, tmp_dir))
+    if directory and not os.path.isdir(resolved):
+        raise ConnectorError('Directory not found for {0}: {1}'.format(operation_name, path))
+    if not directory and not os.path.isfile(resolved):
+        raise ConnectorError('File not found for {0}: {1}'.format(operation_name, path))
+    return resolved
+
+
+def _download_attachment(attachment_iri, operation_name):
+    """Download a FortiSOAR attachment/file IRI into the temp directory and return its path"""
+    try:
+        from connectors.cyops_utilities.builtins import download_file_from_cyops
+    except ImportError:
+        raise ConnectorError('Attachment input requires the FortiSOAR cyops_utilities connector')
+    try:
+        result = download_file_from_cyops(attachment_iri)
+    except Exception as e:
+        raise ConnectorError('Error downloading attachment {0} for {1}: {2}'.format(
+            attachment_iri, operation_name, str(e)))
+    return os.path.join(get_tmp_dir(), result.get('cyops_file_path'))
+
+
+def _cursor_path(key):
+    name = hashlib.sha256(json.dumps(key).encode('utf-8')).hexdigest()
+    return os.path.join(get_tmp_dir(), CURSOR_DIR_NAME, name)
+
+
+def get_cursor(config, kind, name):
+    """Return the stored cursor of `kind` for `name` on the configured daemon, or None"""
+    key = [kind, daemon_key(config), name]
+    # The file is authoritative (shared by worker processes); memory covers an unwritable temp dir
+    try:
+        with open(_cursor_path(key), 'r') as f:
+            return f.read().strip() or None
+    except OSError:
+        with _cursor_lock:
+            return _cursors.get(tuple(key))
+
+
+def set_cursor(config, kind, name, value):
+    """Store a cursor in memory and on disk so other worker processes pick it up"""
+    key = [kind, daemon_key(config), name]
+    with _cursor_lock:
+        _cursors[tuple(key)] = value
+        _cursors.move_to_end(tuple(key))
+        while len(_cursors) > CURSOR_CACHE_SIZE:
+            _cursors.popitem(last=False)
+    try:
+        write_atomically(_cursor_path(key), lambda f: f.write(str(value)))
+    except OSError as e:
+        logger.warning('Error persisting {0} cursor for {1}: {2}'.format(kind, name, str(e)))
+
+
+def _is_stream_body(body):
+    """Stream bodies are iterables of bytes chunks other than plain containers (e.g. _UploadBody)"""
+    return hasattr(body, '__iter__') and not isinstance(body, (str, bytes, bytearray, dict, list, tuple))
+
+
+def build_upload_body(params, base64_key, operation_name):
+    """Build a streaming upload body from `file_path`, `attachment_iri` or base64 text in `base64_key`"""
+    file_path = params.get('file_path')
+    attachment_iri = params.get('attachment_iri')
+    base64_data = params.get(base64_key)
+    if file_path:
+        return _UploadBody(file_path=resolve_tmp_path(file_path, operation_name), operation_name=operation_name)
+    if attachment_iri:
+        return _UploadBody(file_path=_download_attachment(attachment_iri, operation_name), remove_after=True,
+                           operation_name=operation_name)
+    if base64_data:
+        return _UploadBody(base64_data=base64_data, operation_name=operation_name)
+    raise ConnectorError('One of {0} (base64-encoded tar), file_path or attachment_iri is required for {1}'.format(
+        base64_key, operation_name))
 
 
 def invoke_binary_endpoint(config, endpoint, method='GET', body=None, headers=None,
                            query_params=None, timeout=None, use_registry_auth=False,
-                           use_api_version=True, expect_json_response=False):
+                           use_api_version=True, expect_json_response=False, output_mode='base64',
+                           file_name=None, response_handler=None):
     """
     Invoke a Docker API endpoint that sends or receives binary data (e.g., tar streams).
-    - For upload-style endpoints (e.g., copy_to_container, images/load), pass binary bytes in `body`.
-    - For download-style endpoints (e.g., container_export, images/get), the response content is
-      returned as base64-encoded data in a JSON object.
+    - For upload-style endpoints (e.g., copy_to_container, images/load), pass binary bytes in `body`,
+      or a body from build_upload_body() to stream it with chunked transfer encoding.
+    - For download-style endpoints (e.g., container_export, images/get), the response is streamed
+      in chunks and, depending on `output_mode`, returned as base64-encoded data in a JSON object
+      ('base64'), written to a temp file ('file') or uploaded as a FortiSOAR attachment
+      ('attachment'). Size and SHA-256 are computed on the fly and the configured
+      max_download_size (MB) is enforced.
+    - For streaming responses (e.g., NDJSON build progress), pass `response_handler`; it is called
+      with the successful streamed response and its return value is returned.
     """
     try:
         # Apply rate limiting
-        _apply_rate_limit(config)
+        rate_limit_wait = _apply_rate_limit(config, endpoint)
 
         timeout = timeout or config.get('timeout', 60)
         default_headers = {}
-        auth, auth_headers = _build_auth(config)
+        # Pooled session with prebuilt auth and SSL settings
+        transport = _get_transport(config)
+        auth_headers = dict(transport.auth_headers)
 
         if headers is None:
             headers = {}
 
         # Add registry authentication if needed
         if use_registry_auth:
-            registry_headers = _build_registry_auth(config)
-            auth_headers.update(registry_headers)
+            auth_headers.update(transport.registry_headers)
 
         # Merge headers with precedence to explicit headers
         merged_headers = {**default_headers, **auth_headers, **headers}
 
-        # Build SSL context
-        verify, cert = _build_ssl_context(config)
-
         url = _build_url(config, endpoint, query_params, use_api_version=use_api_version)
     except Exception as e:
         logger.error('Error in invoke_binary_endpoint setup: {0}'.format(str(e)))
         raise ConnectorError('Error setting up binary request: {0}'.format(str(e)))
 
-    # Retry logic (mirrors invoke_rest_endpoint)
-    retry_attempts = config.get('retry_attempts', 3)
-    retry_delay = config.get('retry_delay', 1)
-    response = None
+    payload = None
+    if body is not None:
+        # Expect bytes/bytearray or a re-iterable stream body (sent chunked); strings are encoded as UTF-8
+        if isinstance(body, (bytes, bytearray)) or _is_stream_body(body):
+            payload = body
+        elif isinstance(body, str):
+            payload = body.encode('utf-8')
+        else:
+            # Fallback: JSON-encode dict-like payloads if provided
+            try:
+                payload = encode_json(body).encode('utf-8')
+                if 'content-type' not in {k.lower() for k in merged_headers.keys()}:
+                    merged_headers['Content-Type'] = 'application/json'
+            except Exception:
+                raise ConnectorError('Invalid binary payload type for endpoint {0}'.format(endpoint))
 
-    for attempt in range(retry_attempts):
+    try:
+        response = _send_with_retries(config, transport, endpoint, method, url, payload, merged_headers, timeout,
+                                      log_label='binary endpoint', stream=True, rate_limit_wait=rate_limit_wait)
+    finally:
+        _invalidate_response_cache(config, endpoint, method)
+        if _is_stream_body(payload) and hasattr(payload, 'close'):
+            payload.close()
+
+    if response.ok:
         try:
-            payload = None
-            if body is not None:
-                # Expect bytes/bytearray for binary payload; strings are encoded as UTF-8
-                if isinstance(body, (bytes, bytearray)):
-                    payload = body
-                elif isinstance(body, str):
-                    payload = body.encode('utf-8')
-                else:
-                    # Fallback: JSON-encode dict-like payloads if provided
-                    try:
-                        payload = json.dumps(body).encode('utf-8')
-                        if 'content-type' not in {k.lower() for k in merged_headers.keys()}:
-                            merged_headers['Content-Type'] = 'application/json'
-                    except Exception:
-                        raise ConnectorError('Invalid binary payload type for endpoint {0}'.format(endpoint))
-
-            response = requests.request(method=method, url=url, auth=auth, verify=verify, cert=cert,
-                                        data=payload, headers=merged_headers, timeout=timeout)
-
-            # If successful, break out of retry loop
-            if response.ok:
-                break
-
-            # If it's a client error (4xx), don't retry
-            if 400 <= response.status_code < 500:
-                break
-
-            # For server errors (5xx), retry if we have attempts left
-            if attempt < retry_attempts - 1:
-                logger.warning('Server error {0}, retrying in {1} seconds (attempt {2}/{3})'.format(
-                    response.status_code, retry_delay, attempt + 1, retry_attempts))
-                time.sleep(retry_delay)
-                continue
+            if response_handler is not None:
+                return response_handler(response)
 
-        except requests.exceptions.Timeout:
-            if attempt < retry_attempts - 1:
-                logger.warning('Timeout connecting to {0}, retrying in {1} seconds (attempt {2}/{3})'.format(
-                    endpoint, retry_delay, attempt + 1, retry_attempts))
-                time.sleep(retry_delay)
-                continue
-            else:
-                logger.error('Timeout connecting to {0}'.format(endpoint))
-                raise ConnectorError('Timeout connecting to Docker API: {0}'.format(endpoint))
-        except requests.exceptions.ConnectionError:
-            if attempt < retry_attempts - 1:
-                logger.warning('Connection error to {0}, retrying in {1} seconds (attempt {2}/{3})'.format(
-                    endpoint, retry_delay, attempt + 1, retry_attempts))
-                time.sleep(retry_delay)
-                continue
-            else:
-                logger.error('Connection error to {0}'.format(endpoint))
-                raise ConnectorError('Cannot connect to Docker API: {0}'.format(endpoint))
-        except Exception as e:
-            logger.exception('Error invoking binary endpoint: {0}'.format(endpoint))
-            if attempt == retry_attempts - 1:
-                raise ConnectorError('Error invoking {0}: {1}'.format(endpoint, str(e)))
-            continue
+            if expect_json_response:
+                return _decode_json_body(response.content)
 
-    if response is None:
-        raise ConnectorError('No response received from Docker API after {0} attempts'.format(retry_attempts))
+            max_size = _get_int_config(config, 'max_download_size', 0) * 1024 * 1024
+            if output_mode in ('file', 'attachment'):
+                return _save_download(response, endpoint, max_size, output_mode, file_name)
 
-    if response.ok:
-        if expect_json_response:
-            try:
-                return response.json()
-            except ValueError:
-                return {'result': response.text}
-
-        # Return base64-encoded content for FortiSOAR-friendly handling
-        content_b64 = base64.b64encode(response.content).decode()
-        return {
-            'content': content_b64,
-            'content_type': response.headers.get('Content-Type', 'application/octet-stream'),
-            'status_code': response.status_code
-        }
+            # Return base64-encoded content for FortiSOAR-friendly handling
+            content = bytearray()
+            digest = hashlib.sha256()
+            for chunk in _iter_download(response, endpoint, max_size):
+                content += chunk
+                digest.update(chunk)
+            return {
+                'content': base64.b64encode(content).decode(),
+                'content_type': response.headers.get('Content-Type', 'application/octet-stream'),
+                'status_code': response.status_code,
+                'size': len(content),
+                'sha256': digest.hexdigest()
+            }
+        finally:
+            _record_received(config, response)
+            response.close()
     else:
         content = response.text
+        _record_received(config, response)
         logger.error('HTTP {0} (binary): {1}'.format(response.status_code, content))
 
         if response.status_code == 400:
+            if API_VERSION_TOO_NEW_PATTERN.search(content):
+                # Renegotiate on the next request; the body of this one may not be replayable
+                _forget_api_version(config)
             raise ConnectorError('Bad Request (binary): {0}'.format(content))
         elif response.status_code == 401:
             raise ConnectorError('Unauthorized (binary): Check your authentication credentials')
@@ -402,6 +1569,34 @@ def invoke_binary_endpoint(config, endpoint, method='GET', body=None, headers=No
             raise ConnectorError('HTTP {0} (binary): {1}'.format(response.status_code, content))
 
 
+def run_concurrently(func, items, max_workers=DEFAULT_MAX_WORKERS):
+    """Call func(item) for every item on a bounded thread pool.
+
+    Returns one dict per item, in input order, with the item, its result or
+    error message and the elapsed time; a failing item never fails the batch.
+    """
+    items = list(items)
+
+    def call(item):
+        started = time.monotonic()
+        try:
+            return {'item': item, 'result': func(item), 'error': None,
+                    'elapsed': round(time.monotonic() - started, 3)}
+        except Exception as e:
+            return {'item': item, 'result': None, 'error': str(e),
+                    'elapsed': round(time.monotonic() - started, 3)}
+
+    if not items:
+        return []
+    workers = max(1, min(int(max_workers or DEFAULT_MAX_WORKERS), len(items)))
+    if workers == 1:
+        return [call(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Each call runs in a copy of the caller's context so its requests keep the operation's metric labels
+        futures = [executor.submit(contextvars.copy_context().run, call, item) for item in items]
+        return [future.result() for future in futures]
+
+
 def validate_required_params(params, required_fields, operation_name):
     """Validate that all required parameters are present and not empty"""
     missing_fields = []
@@ -510,3 +1705,29 @@ def validate_boolean_param(value, param_name, operation_name, default=False):
         return value.lower() in ('true', '1', 'yes', 'on')
     
     return bool(value)
+
+
+def validate_output_mode(value, operation_name):
+    """Validate the output mode of a binary download (Base64, File or Attachment)"""
+    if value is None or value == '':
+        return 'base64'
+    mode = str(value).strip().lower()
+    if mode not in OUTPUT_MODES:
+        raise ConnectorError('Invalid output mode for {0}: {1}. Must be one of: Base64, File, Attachment'.format(
+            operation_name, value))
+    return mode
+
+
+def validate_list_param(value, param_name, operation_name):
+    """Validate a list parameter given as a list, a JSON array or a comma-separated string"""
+    if value is None or value == '' or value == []:
+        return []
+    if isinstance(value, str):
+        value = value.strip()
+        if value.startswith('['):
+            value = validate_json_param(value, param_name, operation_name)
+        else:
+            return [item.strip() for item in value.split(',') if item.strip()]
+    if not isinstance(value, (list, tuple)):
+        raise ConnectorError('{0} must be a list for {1}'.format(param_name, operation_name))
+    return [str(item).strip() for item in value if str(item).strip()]
@@ -1,5 +1,6 @@
 from connectors.core.connector import get_logger, ConnectorError
 from .utils import invoke_rest_endpoint, validate_required_params, validate_volume_name, validate_json_param, validate_boolean_param
+from .projection import shape_result
 from .constants import LOGGER_NAME
 
 logger = get_logger(LOGGER_NAME)
@@ -10,14 +11,17 @@ def list_volumes(config, params, *args, **kwargs):
     # We accept an optional JSON string or object for filters and pass it through.
     filters = validate_json_param(params.get('filters'), 'filters', 'list_volumes') if params else None
     query_params = {'filters': filters} if filters else None
-    return invoke_rest_endpoint(config, '/volumes', 'GET', query_params=query_params)
+    result = invoke_rest_endpoint(config, '/volumes', 'GET', query_params=query_params)
+    # Volumes come wrapped as {"Volumes": [...], "Warnings": [...]}
+    return shape_result(result, params or {}, 'list_volumes', items_key='Volumes')
 
 
 def inspect_volume(config, params, *args, **kwargs):
     validate_required_params(params, ['name'], 'inspect_volume')
     name = params.get('name')
     validate_volume_name(name, 'inspect_volume')
-    return invoke_rest_endpoint(config, '/volumes/{0}'.format(name), 'GET')
+    result = invoke_rest_endpoint(config, '/volumes/{0}'.format(name), 'GET')
+    return shape_result(result, params, 'inspect_volume')
 
 
 def create_volume(config, params, *args, **kwargs):